@@ -0,0 +1,27 @@
+"""
+Admin endpoint protection
+
+Admin endpoints (/admin/...) need the ADMIN_TOKEN secret in an
+X-Admin-Token header. Without ADMIN_TOKEN they don't exist (404).
+"""
+
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app import config
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    """Constant-time check of a presented token against ADMIN_TOKEN"""
+    token = config.ADMIN_TOKEN
+    return bool(token) and candidate is not None and hmac.compare_digest(candidate.encode(), token.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """FastAPI dependency for admin endpoints"""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_matches(x_admin_token):
+        raise HTTPException(status_code=403, detail={"error": "Admin token required", "error_type": "forbidden"})
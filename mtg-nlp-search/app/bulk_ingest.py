@@ -0,0 +1,187 @@
+"""
+Streaming ingestion of Scryfall bulk data
+
+The bulk files are one huge JSON array (100+ MB uncompressed), so instead of
+json.load() we decode one card at a time from a (gzip) byte stream. Memory
+stays bounded by the read buffer plus the largest single card.
+"""
+
+import codecs
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+from app.config import SCRYFALL_API_URL
+from app.scryfall import scryfall_get
+
+BULK_DATA_URL = f"{SCRYFALL_API_URL}/bulk-data/oracle-cards"
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+_decoder = json.JSONDecoder()
+
+class _PeekedStream:
+    """File-like wrapper that replays bytes already read while sniffing the format"""
+
+    def __init__(self, head: bytes, stream: BinaryIO):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            head, self._head = self._head, b""
+            if size is None or size < 0:
+                return head + self._stream.read()
+            return head + self._stream.read(max(size - len(head), 0))
+        return self._stream.read(size)
+
+class ProgressStream:
+    """File-like wrapper that counts the bytes read, to report load progress"""
+
+    def __init__(self, stream: BinaryIO, total_size: Optional[int] = None, updated_at: Optional[str] = None):
+        self._stream = stream
+        self.total_size = total_size
+        self.updated_at = updated_at  # bulk-data updated_at, when the file was looked up
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Share of the source read so far, or None when its size is unknown"""
+        if not self.total_size:
+            return None
+        return min(self.bytes_read / self.total_size, 1.0)
+
+def maybe_gunzip(stream: BinaryIO) -> BinaryIO:
+    """Transparently decompress the stream if it is gzip data"""
+    head = stream.read(2)
+    stream = _PeekedStream(head, stream)
+    if head == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+def iter_json_array(stream: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time
+
+    Reads `chunk_size` bytes at a time and decodes each complete element with
+    JSONDecoder.raw_decode; a partial element at the end of the buffer waits
+    for the next chunk.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators up to the next element
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char in " \t\r\n,":
+                pos += 1
+            elif not started:
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, found {char!r}")
+                started = True
+                pos += 1
+            elif char == "]":
+                return
+            else:
+                try:
+                    element, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break  # incomplete element, read more
+                pos = end
+                yield element
+
+        if eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+
+        # Drop what has been consumed, then append the next chunk
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer += utf8.decode(b"", final=True)
+        else:
+            buffer += utf8.decode(chunk)
+
+def _front_face(card: dict) -> dict:
+    faces = card.get("card_faces")
+    return faces[0] if faces and "type_line" in faces[0] else card
+
+def is_commander_eligible(card: dict) -> bool:
+    """Legal in commander and either a legendary creature or able to be your commander"""
+    if card.get("legalities", {}).get("commander") != "legal":
+        return False
+
+    front = _front_face(card)
+    type_line = front.get("type_line") or card.get("type_line", "")
+    if "Legendary" in type_line and "Creature" in type_line:
+        return True
+
+    texts = [card.get("oracle_text", "")] + [face.get("oracle_text", "") for face in card.get("card_faces", [])]
+    return any("can be your commander" in (text or "") for text in texts)
+
+def ingest_commanders(stream: BinaryIO, on_card: Callable[[dict], None], chunk_size: int = 1 << 16) -> int:
+    """
+    Stream a bulk-data array and call `on_card` for every commander-eligible card
+
+    Returns the number of cards scanned. Non-eligible cards are dropped as
+    soon as they are decoded.
+    """
+    scanned = 0
+    for card in iter_json_array(maybe_gunzip(stream), chunk_size):
+        scanned += 1
+        if isinstance(card, dict) and is_commander_eligible(card):
+            on_card(card)
+    return scanned
+
+def fetch_bulk_metadata(timeout: float = 30.0, caller: str = "commander_loader") -> dict:
+    """Scryfall's description of the current oracle-cards file (download_uri, size, updated_at)"""
+    response = scryfall_get(caller, BULK_DATA_URL, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+@contextmanager
+def open_bulk_stream(source: Optional[str] = None, timeout: float = 30.0):
+    """
+    Open a bulk-data byte stream
+
+    `source` may be a local file path, a download URL, or None to look up the
+    current oracle-cards file through Scryfall's bulk-data API. The stream is
+    a ProgressStream; its size is known for files, bulk-data lookups and
+    responses without Content-Encoding.
+    """
+    if source and not source.startswith(("http://", "https://")):
+        with open(source, "rb") as f:
+            yield ProgressStream(f, os.path.getsize(source))
+        return
+
+    total_size = None
+    updated_at = None
+    if source is None:
+        meta = fetch_bulk_metadata(timeout)
+        source = meta["download_uri"]
+        total_size = meta.get("size")  # uncompressed bytes
+        updated_at = meta.get("updated_at")
+
+    with scryfall_get("commander_loader", source, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        if total_size is None and not response.headers.get("Content-Encoding"):
+            total_size = int(response.headers.get("Content-Length") or 0) or None
+        # Undo Content-Encoding: gzip on the fly; a .json.gz body is handled by maybe_gunzip
+        response.raw.decode_content = True
+        yield ProgressStream(response.raw, total_size, updated_at)
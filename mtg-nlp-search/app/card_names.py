@@ -1,61 +1,307 @@
 """
 Card names cache for lookahead functionality
 """
-import requests
-from typing import List, Optional
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from heapq import nsmallest
+from itertools import count
+from typing import FrozenSet, List, Optional, Tuple
 import logging
 
+from app.bulk_ingest import fetch_bulk_metadata
+from app.config import CARD_NAMES_SNAPSHOT, SCRYFALL_API_URL
+from app.scryfall import scryfall_get
+from app.storage import atomic_write_bytes
+from app.typeahead import typeahead_sessions
+
 logger = logging.getLogger(__name__)
 
+# Sorts after any real card name character, used to close a prefix range
+_PREFIX_END = "\U0010ffff"
+
+@dataclass(frozen=True)
+class CatalogDownload:
+    """Pre-serialized catalog served by /card-names/all, built once per catalog load"""
+    body: bytes          # JSON, same shape as Scryfall's /catalog/card-names
+    gzipped: bytes
+    etag: str            # strong validator derived from the catalog contents
+    
+    @property
+    def gzip_etag(self) -> str:
+        """Validator of the gzipped body (a strong validator differs per content-coding)"""
+        return self.etag[:-1] + '-gzip"'
+
+@dataclass(frozen=True, eq=False)
+class CardNameCatalog:
+    """
+    One immutable version of the card-name catalog and its lookup structures
+    
+    Built off to the side and published with a single reference swap; a
+    reader that takes `card_names_cache.catalog` once sees one consistent
+    version for as long as it holds it. None of the lists may be modified.
+    """
+    version: int                   # 0 = nothing loaded yet
+    card_names: List[str]
+    # Prefix index: lowercase names in sorted order, and their catalog positions
+    sorted_keys: List[str]
+    sorted_positions: List[int]
+    name_set: FrozenSet[str]
+    download: Optional[CatalogDownload]
+    fetched_at: Optional[float] = None   # epoch seconds of the Scryfall fetch behind this catalog
+    source_signal: Optional[str] = None  # cheap freshness marker recorded with the last refresh
+    
+    @property
+    def loaded(self) -> bool:
+        return self.version > 0
+    
+    def prefix_range(self, query_lower: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        """Return the [lo, hi) slice of the sorted index whose names start with query_lower"""
+        if hi is None:
+            hi = len(self.sorted_keys)
+        start = bisect_left(self.sorted_keys, query_lower, lo, hi)
+        end = bisect_left(self.sorted_keys, query_lower + _PREFIX_END, start, hi)
+        return start, end
+
+_EMPTY_CATALOG = CardNameCatalog(0, [], [], [], frozenset(), None)
+
+# Bump when the snapshot layout changes; older snapshots are ignored
+SNAPSHOT_VERSION = 1
+
 class CardNamesCache:
-    def __init__(self):
-        self.card_names: List[str] = []
-        self.loaded = False
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.catalog = _EMPTY_CATALOG  # current version; replaced whole, never mutated
+        self._versions = count(1)
+        self._publish_lock = threading.Lock()  # serializes writers; readers never take it
+        self.snapshot_path = snapshot_path
+    
+    # Shortcuts to the current catalog; code that reads more than one of these
+    # should take `self.catalog` once instead
+    @property
+    def card_names(self) -> List[str]:
+        return self.catalog.card_names
+    
+    @property
+    def download(self) -> Optional[CatalogDownload]:
+        return self.catalog.download
+    
+    @property
+    def loaded(self) -> bool:
+        return self.catalog.loaded
+    
+    @property
+    def fetched_at(self) -> Optional[float]:
+        return self.catalog.fetched_at
+    
+    @property
+    def source_signal(self) -> Optional[str]:
+        return self.catalog.source_signal
+        
+    @property
+    def complete(self) -> bool:
+        return self.loaded
+    
+    def fetch_source_signal(self) -> str:
+        """
+        Cheaply check whether Scryfall's card data moved on
+        
+        Uses the oracle-cards bulk file's updated_at (one small request), which
+        changes whenever new cards are added. Raises on network or HTTP errors.
+        """
+        return f"bulk:{fetch_bulk_metadata(timeout=10, caller='catalog')['updated_at']}"
+    
+    def load_card_names(self, source_signal: Optional[str] = None) -> bool:
+        """Fetch card names from Scryfall (synchronous); True on success, changed or not"""
+        return self.reload(source_signal) != "failed"
+    
+    def reload(self, source_signal: Optional[str] = None) -> str:
+        """
+        Fetch card names from Scryfall, publishing them if they changed
+        
+        The new catalog only replaces the current one if its size or contents
+        changed; on failure whatever is already loaded (e.g. the disk snapshot)
+        stays. `source_signal` is recorded as the freshness marker on success;
+        without one (the startup load) it is fetched first, so the first
+        scheduled refresh can tell whether anything changed since. Returns
+        "reloaded", "unchanged" or "failed".
+        """
+        if source_signal is None:
+            try:
+                source_signal = self.fetch_source_signal()
+            except Exception as e:
+                # Recorded as unknown, so the next refresh reloads
+                logger.warning("⚠️  Could not fetch the card data signal: %s", e)
         
-    def load_card_names(self):
-        """Load card names from Scryfall API on startup (synchronous)"""
         try:
             logger.info("Loading card names from Scryfall...")
-            response = requests.get("https://api.scryfall.com/catalog/card-names", timeout=30)
+            response = scryfall_get("catalog", f"{SCRYFALL_API_URL}/catalog/card-names", timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
-                self.card_names = data.get('data', [])
-                self.loaded = True
+                card_names = data.get('data', [])
+                fetched_at = time.time()
+                
+                current = self.card_names
+                if self.loaded and len(card_names) == len(current) and card_names == current:
+                    logger.info(f"Card names unchanged ({len(card_names)} cards), keeping current catalog")
+                    self._confirm_card_names(fetched_at, source_signal)
+                    self._save_snapshot_meta()
+                    return "unchanged"
+                
+                self._set_card_names(card_names, fetched_at=fetched_at, source_signal=source_signal)
                 logger.info(f"Loaded {len(self.card_names)} card names successfully")
+                self.save_snapshot()
+                return "reloaded"
             else:
                 logger.error(f"Failed to load card names: HTTP {response.status_code}")
                 
         except Exception as e:
             logger.error(f"Error loading card names: {e}")
-            # Set empty list as fallback
-            self.card_names = []
-            self.loaded = False
+        
+        return "failed"
     
-    def search_card_names(self, query: str, limit: int = 10) -> List[str]:
+    def load_snapshot(self) -> bool:
+        """Load the catalog saved by a previous run; takes milliseconds, no network"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        
+        try:
+            start_time = time.time()
+            with open(self.snapshot_path, "rb") as f:
+                gzipped = f.read()
+            body = gzip.decompress(gzipped)
+            card_names = json.loads(body)["data"]
+            
+            meta = {}
+            if os.path.exists(self._meta_path()):
+                with open(self._meta_path(), "rb") as f:
+                    meta = json.loads(f.read())
+            if meta.get("version") != SNAPSHOT_VERSION:
+                logger.warning(f"Ignoring card names snapshot with version {meta.get('version')}")
+                return False
+            
+            # The snapshot is the /card-names/all payload, so reuse it rather than recompress
+            self._set_card_names(card_names, body=body, gzipped=gzipped,
+                                 fetched_at=meta.get("fetched_at"), source_signal=meta.get("source_signal"))
+            logger.info(f"Loaded {len(card_names)} card names from snapshot in {(time.time() - start_time) * 1000:.1f}ms")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error loading card names snapshot: {e}")
+            return False
+    
+    def save_snapshot(self) -> bool:
+        """Persist the current catalog for the next startup"""
+        catalog = self.catalog
+        if not self.snapshot_path or catalog.download is None:
+            return False
+        
+        try:
+            atomic_write_bytes(self.snapshot_path, catalog.download.gzipped)
+            self._save_snapshot_meta(catalog)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving card names snapshot: {e}")
+            return False
+    
+    def _meta_path(self) -> str:
+        return self.snapshot_path + ".meta.json"
+    
+    def _save_snapshot_meta(self, catalog: Optional[CardNameCatalog] = None):
+        """Record when the snapshot's contents were last confirmed against Scryfall"""
+        catalog = catalog or self.catalog
+        if not self.snapshot_path or catalog.download is None:
+            return
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "fetched_at": catalog.fetched_at,
+            "source_signal": catalog.source_signal,
+            "etag": catalog.download.etag,
+            "count": len(catalog.card_names)
+        }
+        try:
+            atomic_write_bytes(self._meta_path(), json.dumps(meta).encode("utf-8"))
+        except Exception as e:
+            logger.error(f"Error saving card names snapshot metadata: {e}")
+    
+    def _set_card_names(self, card_names: List[str], body: Optional[bytes] = None, gzipped: Optional[bytes] = None,
+                        fetched_at: Optional[float] = None, source_signal: Optional[str] = None):
+        """Build a new catalog version with its prefix index and freshness, then publish it"""
+        lowered = [name.lower() for name in card_names]
+        positions = sorted(range(len(card_names)), key=lowered.__getitem__)
+        sorted_keys = [lowered[i] for i in positions]
+        download = self._build_download(card_names, body, gzipped)
+        
+        with self._publish_lock:
+            self.catalog = CardNameCatalog(
+                version=next(self._versions),
+                card_names=card_names,
+                sorted_keys=sorted_keys,
+                sorted_positions=positions,
+                name_set=frozenset(card_names),
+                download=download,
+                fetched_at=fetched_at,
+                source_signal=source_signal
+            )
+    
+    def _confirm_card_names(self, fetched_at: float, source_signal: Optional[str]):
+        """Publish the current catalog again with new freshness; same version, so caches stay valid"""
+        with self._publish_lock:
+            self.catalog = replace(self.catalog, fetched_at=fetched_at, source_signal=source_signal)
+    
+    @staticmethod
+    def _build_download(card_names: List[str], body: Optional[bytes] = None, gzipped: Optional[bytes] = None) -> CatalogDownload:
+        """Serialize and compress the catalog for client-side autocomplete"""
+        if body is None:
+            body = json.dumps(
+                {"object": "catalog", "total_values": len(card_names), "data": card_names},
+                separators=(",", ":"),
+                ensure_ascii=False
+            ).encode("utf-8")
+        if gzipped is None:
+            # mtime=0 keeps the compressed bytes identical for identical catalogs
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return CatalogDownload(body=body, gzipped=gzipped, etag=etag)
+    
+    def search_card_names(self, query: str, limit: int = 10, session: Optional[str] = None) -> List[str]:
         """
         Search for card names that start with the query string
-        Returns up to 'limit' matches
+        Returns up to 'limit' matches, in catalog order
+        
+        When a session token is given and the query extends that session's
+        previous query, only the previous candidate range is searched.
         """
         if not self.loaded or not query:
             return []
             
         query_lower = query.lower()
-        matches = []
+        catalog = self.catalog
+        lo, hi = 0, len(catalog.sorted_keys)
+        
+        if session:
+            previous = typeahead_sessions.get(("card-names", session), catalog.card_names)
+            if previous and query_lower.startswith(previous[0]):
+                lo, hi = previous[1]
+        
+        lo, hi = catalog.prefix_range(query_lower, lo, hi)
+        
+        if session:
+            typeahead_sessions.put(("card-names", session), catalog.card_names, query_lower, (lo, hi))
         
-        for name in self.card_names:
-            if name.lower().startswith(query_lower):
-                matches.append(name)
-                if len(matches) >= limit:
-                    break
-                    
-        return matches
+        positions = nsmallest(limit, catalog.sorted_positions[lo:hi])
+        return [catalog.card_names[i] for i in positions]
     
     def is_exact_card_name(self, query: str) -> bool:
         """Check if the query is an exact card name match"""
         if not self.loaded:
             return False
-        return query in self.card_names
+        return query in self.catalog.name_set
 
 # Global instance
-card_names_cache = CardNamesCache()
+card_names_cache = CardNamesCache(snapshot_path=CARD_NAMES_SNAPSHOT)
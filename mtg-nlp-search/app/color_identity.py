@@ -0,0 +1,74 @@
+"""
+Color identities as 5-bit masks (W=1, U=2, B=4, R=8, G=16)
+
+A commander's identity fits in one of 32 buckets, so "identity within
+Esper" or "exactly four colors" only touches the matching buckets instead
+of comparing strings like 'WUBG' for every commander.
+"""
+
+from typing import Iterator
+
+from app.nlp import COLOR_MAP, GUILD_COLORS, SHARD_COLORS, WEDGE_COLORS
+
+COLOR_ORDER = "WUBRG"
+COLOR_BITS = {color: 1 << i for i, color in enumerate(COLOR_ORDER)}
+ALL_COLORS = (1 << len(COLOR_ORDER)) - 1
+BUCKET_COUNT = ALL_COLORS + 1
+
+_COLORLESS_WORDS = {"c", "colorless"}
+_NAMED_IDENTITIES = dict(GUILD_COLORS, **SHARD_COLORS, **WEDGE_COLORS)
+
+
+def identity_mask(color_identity: str) -> int:
+    """'WUBG' -> mask; unknown characters are ignored"""
+    mask = 0
+    for color in color_identity:
+        mask |= COLOR_BITS.get(color, 0)
+    return mask
+
+
+def mask_colors(mask: int) -> str:
+    """Mask -> color letters in WUBRG order ('' for colorless)"""
+    return "".join(color for color in COLOR_ORDER if mask & COLOR_BITS[color])
+
+
+def parse_identity(value: str) -> int:
+    """
+    Parse a user-supplied identity into a mask
+
+    Accepts color letters ('wub'), 'c'/'colorless', color words ('white'),
+    guild, shard and wedge names ('esper'), or several of these separated by
+    commas or spaces. Raises ValueError for anything else.
+    """
+    mask = 0
+    parts = value.lower().replace(",", " ").split()
+    if not parts:
+        raise ValueError("empty color identity")
+
+    for part in parts:
+        if part in _COLORLESS_WORDS:
+            continue
+        if part in _NAMED_IDENTITIES:
+            mask |= identity_mask(_NAMED_IDENTITIES[part])
+        elif part in COLOR_MAP:
+            mask |= COLOR_BITS[COLOR_MAP[part]]
+        elif all(letter.upper() in COLOR_BITS for letter in part):
+            mask |= identity_mask(part.upper())
+        else:
+            raise ValueError(f"unknown color identity: {part!r}")
+    return mask
+
+
+def submasks(mask: int) -> Iterator[int]:
+    """Every mask whose colors are all within `mask`, including 0 (colorless)"""
+    sub = mask
+    while True:
+        yield sub
+        if sub == 0:
+            return
+        sub = (sub - 1) & mask
+
+
+def masks_with_color_count(count: int) -> Iterator[int]:
+    """Every mask with exactly `count` colors"""
+    return (mask for mask in range(BUCKET_COUNT) if bin(mask).count("1") == count)
@@ -0,0 +1,172 @@
+"""
+Compact in-memory commander records, plus an on-disk store for the full
+Scryfall card JSON that is only read when a single commander is requested
+"""
+
+import json
+import os
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from app.storage import atomic_open, atomic_write_bytes
+
+# Card fields kept per commander (the rest of the Scryfall card JSON is dropped)
+SLIM_CARD_FIELDS = (
+    "id", "name", "mana_cost", "cmc", "type_line", "oracle_text",
+    "colors", "color_identity", "image_uris", "scryfall_uri", "edhrec_rank"
+)
+
+# Image sizes kept from image_uris
+SLIM_IMAGE_SIZES = ("small", "normal", "art_crop")
+
+class CardStoreError(Exception):
+    """Writing the full-card store failed (a disk problem, not a bad card)"""
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+class CommanderRecord:
+    """
+    The slim fields of one commander card
+
+    Uses __slots__ and interned strings for the repetitive values (type
+    lines, mana costs, color strings), so a record is a few hundred bytes
+    instead of the 5-8 KB of a full Scryfall card dict.
+    """
+    __slots__ = (
+        "id", "name", "mana_cost", "cmc", "type_line", "oracle_text",
+        "colors", "color_identity", "image_uris", "scryfall_uri", "edhrec_rank"
+    )
+
+    def __init__(self, card: dict):
+        self.id = card.get("id")
+        self.name = _intern(card.get("name"))
+        self.mana_cost = _intern(card.get("mana_cost"))
+        self.cmc = card.get("cmc")
+        self.type_line = _intern(card.get("type_line"))
+        self.oracle_text = card.get("oracle_text")
+        # Color lists are stored as interned strings ('WUBG'); None when the card has no such field
+        self.colors = _intern("".join(card["colors"])) if card.get("colors") is not None else None
+        self.color_identity = _intern("".join(card["color_identity"])) if card.get("color_identity") is not None else None
+        images = card.get("image_uris")
+        self.image_uris = (
+            tuple((size, url) for size, url in images.items() if size in SLIM_IMAGE_SIZES)
+            if images is not None else None
+        )
+        self.scryfall_uri = card.get("scryfall_uri")
+        self.edhrec_rank = card.get("edhrec_rank")
+
+    def to_dict(self) -> dict:
+        """The slim card as a Scryfall-shaped dict (missing fields are omitted)"""
+        card = {}
+        for field in SLIM_CARD_FIELDS:
+            value = getattr(self, field)
+            if value is None:
+                continue
+            if field in ("colors", "color_identity"):
+                value = list(value)
+            elif field == "image_uris":
+                value = dict(value)
+            card[field] = value
+        return card
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CommanderRecord):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __repr__(self) -> str:
+        return f"CommanderRecord({self.name!r}, {self.color_identity!r})"
+
+class FullCardStore:
+    """
+    Full Scryfall card JSON kept on disk, one card per line
+
+    Only the byte offsets live in memory; a card is read back (one seek and
+    one json.loads) when it is asked for. Without a path the full cards are
+    kept in memory instead, so /commanders/{name} still returns them.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._offsets: Dict[str, Tuple[int, int]] = {}  # name key -> (offset, length)
+        self._cards: Dict[str, dict] = {}  # name key -> full card, when there is no path
+
+    def _index_path(self) -> str:
+        return self.path + ".idx.json"
+
+    def write(self, cards: Dict[str, dict]) -> bool:
+        """Replace the store with these cards (name key -> full card)"""
+        with self.writer() as add:
+            for name_key, card in cards.items():
+                add(name_key, card)
+        return True
+
+    @contextmanager
+    def writer(self):
+        """
+        Replace the store one card at a time: yields add(name_key, card)
+
+        Cards go straight to disk, so a streaming loader never holds them all.
+        The new store replaces the old one when the block exits cleanly.
+        Without a path, cards are collected in memory.
+        """
+        if not self.path:
+            cards: Dict[str, dict] = {}
+            yield cards.__setitem__
+            self._cards = cards
+            return
+
+        offsets = {}
+        position = 0
+        with atomic_open(self.path) as f:
+            def add(name_key: str, card: dict):
+                nonlocal position
+                line = json.dumps(card, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+                try:
+                    f.write(line)
+                except OSError as e:
+                    raise CardStoreError(f"writing {self.path}: {e}") from e
+                offsets[name_key] = (position, len(line))
+                position += len(line)
+
+            yield add
+
+        atomic_write_bytes(self._index_path(), json.dumps(offsets).encode("utf-8"))
+        self._offsets = offsets
+
+    def load_index(self) -> bool:
+        """Pick up the store written by a previous run"""
+        if not self.path or not os.path.exists(self.path) or not os.path.exists(self._index_path()):
+            return False
+        with open(self._index_path(), "rb") as f:
+            self._offsets = {key: tuple(entry) for key, entry in json.loads(f.read()).items()}
+        return True
+
+    def get(self, name_key: str) -> Optional[dict]:
+        """Read one full card, or None if it isn't stored"""
+        if not self.path:
+            return self._cards.get(name_key)
+        entry = self._offsets.get(name_key)
+        if entry is None:
+            return None
+
+        offset, length = entry
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                card = json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+
+        # The store may have been rewritten since our offsets were taken
+        if card.get("name", "").lower() != name_key:
+            return None
+        return card
+
+    def __len__(self) -> int:
+        return len(self._offsets) if self.path else len(self._cards)
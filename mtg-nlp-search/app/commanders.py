@@ -3,99 +3,404 @@ Commander database management - generates and caches commander data at startup
 """
 
 import requests
+import gzip
 import json
+import os
+import re
+import sys
+import threading
 import time
-from typing import Dict, Optional, List, Tuple
-from functools import lru_cache
+from itertools import chain, count
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, List, Tuple
+
+from app.bulk_ingest import fetch_bulk_metadata, ingest_commanders, open_bulk_stream
+from app.color_identity import BUCKET_COUNT, identity_mask, mask_colors, masks_with_color_count, submasks
+from app.commander_records import CardStoreError, CommanderRecord, FullCardStore, SLIM_CARD_FIELDS
+from app.config import COMMANDERS_SNAPSHOT, COMMANDER_CARDS_STORE, COMMANDER_SOURCE, SCRYFALL_API_URL
+from app.scryfall import rate_limit, scryfall_get
+from app.storage import atomic_write_bytes
+from app.typeahead import typeahead_sessions
+
+# Bump when the snapshot layout or SLIM_CARD_FIELDS change; older snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+# While nothing complete is loaded, the bulk loader publishes its partial table
+# every this many new commanders (the paged loader publishes after every page)
+PARTIAL_PUBLISH_EVERY = 250
+
+# Scryfall search used by the paged loader
+COMMANDER_QUERY = "legal:commander type:legendary type:creature"
+
+class _KeepCurrentTable(Exception):
+    """Abandons a load (and the card store it was writing) in favour of the loaded table"""
+
+# Name lookups memoized per table version
+COLORS_MEMO_SIZE = 1000
+
+_WORDS = re.compile(r'\w+')
+
+_COLOR_NAMES = {
+    'W': 'White',
+    'U': 'Blue', 
+    'B': 'Black',
+    'R': 'Red',
+    'G': 'Green'
+}
+
+def _format_colors(color_identity: str) -> str:
+    """Format color identity for display"""
+    if not color_identity:
+        return "Colorless"
+    
+    return "/".join(_COLOR_NAMES[c] for c in color_identity)
+
+class CommanderTable:
+    """
+    One immutable version of the commander table
+    
+    Tables are built off to the side and published with a single reference
+    swap. A reader takes `commander_db.table` once and sees one consistent
+    version for as long as it holds it; name lookups are memoized on the
+    table itself, so they are keyed by version and die with it.
+    
+    Commanders are also bucketed by color-identity mask (32 buckets, each
+    sorted by name) with precomputed counts, for identity queries, and
+    indexed by the first word of their name for finding names in a prompt.
+    """
+    
+    __slots__ = ("version", "commanders", "commander_cards", "coverage", "fetched_at", "source_signal", "_colors_memo",
+                 "buckets", "bucket_counts", "_first_words", "_unindexed")
+    
+    def __init__(self, version: int, commanders: Dict[str, str], commander_cards: Dict[str, CommanderRecord], coverage: float = 1.0,
+                 fetched_at: Optional[float] = None, source_signal: Optional[str] = None):
+        self.version = version  # 0 = nothing loaded yet
+        self.commanders: Mapping[str, str] = MappingProxyType(commanders)  # name -> color_identity
+        self.commander_cards: Mapping[str, CommanderRecord] = MappingProxyType(commander_cards)  # name -> slim card record
+        self.coverage = coverage  # fraction of the source behind this table (1.0 = complete)
+        self.fetched_at = fetched_at  # epoch seconds of the Scryfall load behind this table
+        self.source_signal = source_signal  # cheap freshness marker of the source behind this table
+        self._colors_memo: Dict[str, Optional[str]] = {}
+        
+        buckets: List[List[str]] = [[] for _ in range(BUCKET_COUNT)]
+        for name_key, colors in commanders.items():
+            buckets[identity_mask(colors)].append(name_key)
+        self.buckets: Tuple[Tuple[str, ...], ...] = tuple(tuple(sorted(bucket)) for bucket in buckets)
+        self.bucket_counts: Tuple[int, ...] = tuple(len(bucket) for bucket in self.buckets)
+        
+        first_words: Dict[str, List[Tuple[int, str]]] = {}
+        unindexed: List[Tuple[int, str]] = []
+        for position, name_key in enumerate(commanders):
+            first = _WORDS.match(name_key.lower())
+            if first:
+                first_words.setdefault(first.group(), []).append((position, name_key))
+            else:
+                unindexed.append((position, name_key))
+        self._first_words = first_words
+        self._unindexed = unindexed
+    
+    @property
+    def loaded(self) -> bool:
+        return self.version > 0
+    
+    @property
+    def complete(self) -> bool:
+        """True for a full table (a partial one may be served while loading)"""
+        return self.loaded and self.coverage >= 1.0
+    
+    def confirmed(self, fetched_at: float, source_signal: Optional[str]) -> "CommanderTable":
+        """This version again, re-checked against the source; shares every structure"""
+        table = object.__new__(CommanderTable)
+        for slot in CommanderTable.__slots__:
+            setattr(table, slot, getattr(self, slot))
+        table.fetched_at = fetched_at
+        table.source_signal = source_signal
+        return table
+    
+    def get_colors(self, commander_name: str) -> Optional[str]:
+        """
+        Get color identity for a commander name
+        Returns color identity string like 'WUBG' or None if not found
+        """
+        name_key = commander_name.lower().strip()
+        memo = self._colors_memo
+        if name_key in memo:
+            return memo[name_key]
+        
+        # Try exact match first
+        colors = self.commanders.get(name_key)
+        if colors is None:
+            # Try partial matches (for queries like "my atraxa deck")
+            for commander_key, commander_colors in self.commanders.items():
+                if commander_key in name_key or name_key in commander_key:
+                    colors = commander_colors
+                    break
+        
+        if len(memo) < COLORS_MEMO_SIZE:
+            memo[name_key] = colors
+        return colors
+    
+    def memory_parts(self) -> Dict[str, object]:
+        """The table's structures by name, for memory accounting"""
+        return {
+            "commanders": self.commanders,
+            "commander_cards": self.commander_cards,
+            "identity_buckets": (self.buckets, self.bucket_counts),
+            "name_index": (self._first_words, self._unindexed),
+            "colors_memo": self._colors_memo,
+        }
+    
+    def name_candidates(self, text_lower: str) -> List[str]:
+        """
+        Commanders whose name may occur in the text as whole words, in table order
+        
+        A name matched with \\b on both sides starts with a complete word of
+        the text, so only names whose first word appears there are returned
+        (plus the few names that don't start with a word character).
+        """
+        words = set(_WORDS.findall(text_lower))
+        found = list(self._unindexed)
+        for word in words:
+            found.extend(self._first_words.get(word, ()))
+        found.sort()
+        return [name_key for _, name_key in found]
+    
+    def identity_masks(self, mask: int, mode: str = "subset") -> List[int]:
+        """
+        Buckets matching an identity query
+        
+        "subset": identity within `mask` (what a deck of that identity can
+        run), "exact": identity equal to `mask`, "count": exactly `mask` colors.
+        """
+        if mode == "subset":
+            masks = submasks(mask)
+        elif mode == "exact":
+            masks = [mask]
+        elif mode == "count":
+            masks = masks_with_color_count(mask)
+        else:
+            raise ValueError(f"unknown identity mode: {mode!r}")
+        return [m for m in masks if self.bucket_counts[m]]
+    
+    def count_by_identity(self, mask: int, mode: str = "subset") -> int:
+        """Number of commanders matching an identity query, from the bucket counts"""
+        return sum(self.bucket_counts[m] for m in self.identity_masks(mask, mode))
+    
+    def commanders_by_identity(self, mask: int, mode: str = "subset") -> List[str]:
+        """Name keys matching an identity query, in name order; only matching buckets are read"""
+        # Each bucket is already sorted, so this sort just merges the runs
+        return sorted(chain.from_iterable(self.buckets[m] for m in self.identity_masks(mask, mode)))
+    
+    def identity_counts(self) -> Dict[str, int]:
+        """Commanders per color identity ('' = colorless), from the bucket counts"""
+        return {mask_colors(m): n for m, n in enumerate(self.bucket_counts) if n}
+    
+    def display_name(self, name_key: str) -> str:
+        """Printed card name for a commander key"""
+        record = self.commander_cards.get(name_key)
+        return record.name if record and record.name else name_key.title()
+    
+    def search(self, query: str, limit: int = 10, session: Optional[str] = None) -> List[dict]:
+        """
+        Search commanders by name, return list of matches
+        
+        When a session token is given and the query contains that session's
+        previous query, only the previously matching names are rescanned.
+        """
+        query_lower = query.lower()
+        commanders = self.commanders
+        candidates = commanders.keys()
+        
+        if session:
+            previous = typeahead_sessions.get(("commanders", session), commanders)
+            if previous and previous[0] in query_lower:
+                candidates = previous[1]
+        
+        matching_keys = [name_key for name_key in candidates if query_lower in name_key]
+        
+        if session:
+            typeahead_sessions.put(("commanders", session), commanders, query_lower, matching_keys, size=len(matching_keys))
+        
+        matches = []
+        for name_key in matching_keys[:limit]:
+            colors = commanders[name_key]
+            matches.append({
+                "name": self.display_name(name_key),
+                "color_identity": colors,
+                "colors_display": _format_colors(colors)
+            })
+        
+        return matches
+
+_EMPTY_TABLE = CommanderTable(0, {}, {}, coverage=0.0)
 
 class CommanderDatabase:
-    def __init__(self):
-        self.commanders: Dict[str, str] = {}  # name -> color_identity
-        self.commander_cards: Dict[str, dict] = {}  # name -> full card data
-        self.loaded = False
+    def __init__(self, snapshot_path: Optional[str] = None, card_store_path: Optional[str] = None, source: str = "search"):
+        self.table = _EMPTY_TABLE  # current version; replaced whole, never mutated
+        self._versions = count(1)
+        self._publish_lock = threading.Lock()  # serializes writers; readers never take it
+        self.snapshot_path = snapshot_path
+        self.card_store = FullCardStore(card_store_path)  # full card JSON, read on demand
+        self.source = source  # "bulk" (one streamed bulk-data file) or "search" (paged /cards/search)
+    
+    # Shortcuts to the current table; code that reads more than one of these
+    # should take `self.table` once instead
+    @property
+    def commanders(self) -> Mapping[str, str]:
+        return self.table.commanders
+    
+    @property
+    def commander_cards(self) -> Mapping[str, CommanderRecord]:
+        return self.table.commander_cards
+    
+    @property
+    def loaded(self) -> bool:
+        return self.table.loaded
+    
+    @property
+    def coverage(self) -> float:
+        return self.table.coverage
     
-    def load_commanders_at_startup(self) -> bool:
+    @property
+    def complete(self) -> bool:
+        """True once a full table is loaded (a partial one may be served before that)"""
+        return self.table.complete
+    
+    @property
+    def fetched_at(self) -> Optional[float]:
+        return self.table.fetched_at
+    
+    @property
+    def source_signal(self) -> Optional[str]:
+        return self.table.source_signal
+    
+    def load_commanders_at_startup(self, source_signal: Optional[str] = None) -> bool:
         """
         Load all commanders from Scryfall at server startup
-        Uses a single optimized query with retry logic
+        Uses the bulk-data file when configured, otherwise a single paged
+        search query with retry logic. True if a table was loaded, changed or not.
+        """
+        return self.reload(source_signal) != "failed"
+    
+    def reload(self, source_signal: Optional[str] = None) -> str:
         """
+        Load all commanders from Scryfall, publishing them if they changed
+        
+        `source_signal` is the freshness signal the caller already fetched; it
+        is recorded when the loaded data doesn't carry its own. Returns
+        "reloaded" (a new table was published), "unchanged" or "failed".
+        """
+        if self.source == "bulk":
+            outcome = self._load_from_bulk(source_signal=source_signal)
+            if outcome != "failed":
+                return outcome
+            print("⚠️  Bulk data load failed, falling back to paged search")
+        
         print("🔄 Loading commander database from Scryfall...")
         start_time = time.time()
         
         try:
-            query = "legal:commander type:legendary type:creature"
+            query = COMMANDER_QUERY
             
-            commanders = {}
+            new_commanders, new_commander_cards = {}, {}
             page = 1
             total_cards = 0
+            expected_cards = None  # Scryfall's total_cards for the query
             max_pages = 100  # Increased limit
             consecutive_failures = 0
             max_consecutive_failures = 3
             
             print(f"🔍 Fetching commanders with query: '{query}'")
             
-            while page <= max_pages and consecutive_failures < max_consecutive_failures:
-                try:
-                    response = requests.get(
-                        "https://api.scryfall.com/cards/search",
-                        params={
-                            "q": query,
-                            "page": page,
-                            "order": "name"
-                        },
-                        timeout=10  # Increased timeout
-                    )
-                    
-                    if response.status_code != 200:
-                        print(f"❌ Page {page} failed with status {response.status_code}")
-                        consecutive_failures += 1
+            # Full cards go to disk page by page; only /commanders/{name} reads them back.
+            # Raising inside the block keeps the previous card store.
+            with self.card_store.writer() as store_card:
+                while page <= max_pages and consecutive_failures < max_consecutive_failures:
+                    try:
+                        response = scryfall_get(
+                            "commander_loader",
+                            f"{SCRYFALL_API_URL}/cards/search",
+                            params={
+                                "q": query,
+                                "page": page,
+                                "order": "name"
+                            },
+                            timeout=10  # Increased timeout
+                        )
+                        
+                        if response.status_code != 200:
+                            print(f"❌ Page {page} failed with status {response.status_code}")
+                            consecutive_failures += 1
+                            page += 1
+                            time.sleep(0.5)  # Wait longer on failure
+                            continue
+                        
+                        data = response.json()
+                        page_cards = len(data.get("data", []))
+                        total_cards += page_cards
+                        expected_cards = data.get("total_cards") or expected_cards
+                        consecutive_failures = 0  # Reset on success
+                        
+                        if page % 10 == 0:  # Print progress every 10 pages
+                            print(f"📄 Page {page}: {page_cards} cards (total: {total_cards})")
+                        
+                        page_commanders = {}
+                        for card in data.get("data", []):
+                            name_key = card["name"].lower()
+                            page_commanders[name_key] = card
+                            store_card(name_key, card)
+                        
+                        processed = self._process_commanders(page_commanders)
+                        new_commanders.update(processed[0])
+                        new_commander_cards.update(processed[1])
+                        
+                        # Check if there are more pages
+                        if not data.get("has_more", False):
+                            print(f"✅ Completed at page {page} (no more pages)")
+                            break
+                        
+                        # Serve what we have so far until the first complete table lands
+                        self._publish_partial(new_commanders, new_commander_cards, self._fraction(total_cards, expected_cards))
+                            
                         page += 1
-                        time.sleep(0.5)  # Wait longer on failure
+                        rate_limit("commander_loader")
+                        
+                    except CardStoreError:
+                        raise  # a disk problem, not a bad page
+                        
+                    except requests.exceptions.Timeout:
+                        print(f"⏰ Page {page} timed out, retrying...")
+                        consecutive_failures += 1
+                        time.sleep(1)  # Wait before retry
                         continue
-                    
-                    data = response.json()
-                    page_cards = len(data.get("data", []))
-                    total_cards += page_cards
-                    consecutive_failures = 0  # Reset on success
-                    
-                    if page % 10 == 0:  # Print progress every 10 pages
-                        print(f"📄 Page {page}: {page_cards} cards (total: {total_cards})")
-                    
-                    for card in data.get("data", []):
-                        name_key = card["name"].lower()
-                        commanders[name_key] = card
-                    
-                    # Check if there are more pages
-                    if not data.get("has_more", False):
-                        print(f"✅ Completed at page {page} (no more pages)")
-                        break
                         
-                    page += 1
-                    time.sleep(0.1)  # Rate limiting
-                    
-                except requests.exceptions.Timeout:
-                    print(f"⏰ Page {page} timed out, retrying...")
-                    consecutive_failures += 1
-                    time.sleep(1)  # Wait before retry
-                    continue
-                    
-                except Exception as e:
-                    print(f"❌ Error on page {page}: {e}")
-                    consecutive_failures += 1
-                    page += 1
-                    time.sleep(0.5)
-                    continue
-            
-            if page > max_pages:
-                print(f"⚠️  Stopped at page limit ({max_pages})")
-            elif consecutive_failures >= max_consecutive_failures:
-                print(f"⚠️  Stopped due to consecutive failures")
-            
-            # Process commanders
-            print(f"🔄 Processing {len(commanders)} commanders...")
-            self.commanders, self.commander_cards = self._process_commanders(commanders)
+                    except Exception as e:
+                        print(f"❌ Error on page {page}: {e}")
+                        consecutive_failures += 1
+                        page += 1
+                        time.sleep(0.5)
+                        continue
+                
+                if not new_commanders:
+                    raise ValueError("no commanders fetched from Scryfall")
+                
+                coverage = 1.0
+                if page > max_pages:
+                    print(f"⚠️  Stopped at page limit ({max_pages})")
+                elif consecutive_failures >= max_consecutive_failures:
+                    print(f"⚠️  Stopped due to consecutive failures")
+                    if self.complete:
+                        # Don't replace a complete table (e.g. from the snapshot) with a partial one
+                        print(f"💾 Keeping the {len(self.commanders)} commanders already loaded")
+                        raise _KeepCurrentTable()
+                    coverage = self._fraction(total_cards, expected_cards)
             
-            self.loaded = True
+            if coverage < 1.0:
+                source_signal = None  # incomplete, so the next refresh reloads
+            elif expected_cards:
+                source_signal = self._search_signal(expected_cards)
+            if not self._publish(new_commanders, new_commander_cards, coverage, source_signal):
+                return "unchanged"
             load_time = time.time() - start_time
             
             print(f"✅ Loaded {len(self.commanders)} commanders in {load_time:.2f}s")
@@ -120,12 +425,15 @@ class CommanderDatabase:
             covered_letters = sorted(alphabet_coverage.keys())
             print(f"📝 Alphabet coverage: {covered_letters} ({len(covered_letters)}/26 letters)")
             
-            return True
+            return "reloaded"
+            
+        except _KeepCurrentTable:
+            return "failed"
             
         except Exception as e:
             print(f"❌ Failed to load commanders: {e}")
             self._load_fallback_commanders()
-            return False
+            return "failed"
     
     def _fetch_commanders_by_query(self, query: str) -> Dict[str, dict]:
         """Fetch commanders using a Scryfall search query"""
@@ -137,8 +445,9 @@ class CommanderDatabase:
         
         while True:
             try:
-                response = requests.get(
-                    "https://api.scryfall.com/cards/search",
+                response = scryfall_get(
+                    "commander_loader",
+                    f"{SCRYFALL_API_URL}/cards/search",
                     params={
                         "q": query,
                         "page": page,
@@ -170,7 +479,7 @@ class CommanderDatabase:
                     break
                     
                 page += 1
-                time.sleep(0.1)  # Rate limiting
+                rate_limit("commander_loader")
                 
             except Exception as e:
                 print(f"❌ Error fetching page {page} for query '{query}': {e}")
@@ -179,7 +488,7 @@ class CommanderDatabase:
         print(f"✅ Query '{query}' completed: {len(commanders)} unique commanders from {total_cards} total cards")
         return commanders
     
-    def _process_commanders(self, raw_commanders: Dict[str, dict]) -> Tuple[Dict[str, str], Dict[str, dict]]:
+    def _process_commanders(self, raw_commanders: Dict[str, dict]) -> Tuple[Dict[str, str], Dict[str, CommanderRecord]]:
         """
         Process raw commander data to create clean name->color_identity mapping
         Keeps all distinct commanders (no deduplication by base name)
@@ -189,71 +498,258 @@ class CommanderDatabase:
         
         # Process each commander individually - no grouping/deduplication
         for name_key, card in raw_commanders.items():
-            color_identity = ''.join(card.get("color_identity", []))
+            name_key = sys.intern(name_key)
+            color_identity = sys.intern(''.join(card.get("color_identity", [])))
             
             # Use the full lowercase name as the key
             commanders[name_key] = color_identity
-            commander_cards[name_key] = card
+            commander_cards[name_key] = CommanderRecord(card)
         
         return commanders, commander_cards
     
+    def load_commanders_from_bulk(self, source: Optional[str] = None) -> bool:
+        """
+        Load commanders in one pass over a Scryfall bulk-data file
+        
+        The file is streamed and decoded card by card: ineligible cards are
+        dropped immediately and full eligible cards go straight to the disk
+        store, so memory stays bounded no matter how big the file is.
+        `source` is a URL or local path (plain or gzip JSON); by default the
+        current oracle-cards file is looked up.
+        """
+        return self._load_from_bulk(source) != "failed"
     
-    @lru_cache(maxsize=1000)
-    def get_commander_colors(self, commander_name: str) -> Optional[str]:
+    def _load_from_bulk(self, source: Optional[str] = None, source_signal: Optional[str] = None) -> str:
+        """The bulk load behind load_commanders_from_bulk(), returning the outcome as reload() does"""
+        print("🔄 Streaming commanders from Scryfall bulk data...")
+        start_time = time.time()
+        
+        try:
+            commanders = {}
+            commander_cards = {}
+            
+            with open_bulk_stream(source) as stream, self.card_store.writer() as store_card:
+                def add_card(card: dict):
+                    name_key = sys.intern(card["name"].lower())
+                    commanders[name_key] = sys.intern(''.join(card.get("color_identity", [])))
+                    commander_cards[name_key] = CommanderRecord(card)
+                    store_card(name_key, card)
+                    if len(commanders) % PARTIAL_PUBLISH_EVERY == 0:
+                        self._publish_partial(commanders, commander_cards, stream.fraction or 0.0, sort=True)
+                
+                scanned = ingest_commanders(stream, add_card)
+                updated_at = stream.updated_at
+                if not commanders:
+                    # Raising here also keeps the previous card store
+                    raise ValueError(f"bulk data contained no commanders ({scanned} cards scanned)")
+            
+            changed = self._publish(*self._in_name_order(commanders, commander_cards),
+                                    source_signal=self._bulk_signal(updated_at) if updated_at else source_signal)
+            print(f"✅ Loaded {len(self.commanders)} commanders from {scanned} bulk cards in {time.time() - start_time:.2f}s")
+            return "reloaded" if changed else "unchanged"
+            
+        except Exception as e:
+            print(f"❌ Failed to load commanders from bulk data: {e}")
+            return "failed"
+    
+    @staticmethod
+    def _in_name_order(commanders: Dict[str, str], commander_cards: Dict[str, CommanderRecord]) -> Tuple[Dict[str, str], Dict[str, CommanderRecord]]:
         """
-        Get color identity for a commander name
-        Returns color identity string like 'WUBG' or None if not found
+        Copies of the dicts sorted by name key
+        
+        The bulk file is not in name order, but the table is expected to be
+        (as the search loader's order=name pages are): partial-name color
+        lookups, /commanders/search and name_candidates return the first
+        matches in table order.
         """
-        if not self.loaded:
-            return None
+        names = sorted(commanders)
+        return {name: commanders[name] for name in names}, {name: commander_cards[name] for name in names}
+    
+    @staticmethod
+    def _bulk_signal(updated_at: str) -> str:
+        return f"bulk:{updated_at}"
+    
+    @staticmethod
+    def _search_signal(total_cards: int) -> str:
+        return f"search:{total_cards}"
+    
+    def fetch_source_signal(self) -> str:
+        """
+        Cheaply check the current state of the commander source
         
-        # Try exact match first
-        name_key = commander_name.lower().strip()
-        if name_key in self.commanders:
-            return self.commanders[name_key]
+        One small request: the bulk file's updated_at, or the total_cards of
+        the commander search. Compare with `source_signal` to decide whether a
+        full reload is worth it. Raises on network or HTTP errors.
+        """
+        if self.source == "bulk":
+            return self._bulk_signal(fetch_bulk_metadata(timeout=10)["updated_at"])
+        
+        response = scryfall_get(
+            "commander_loader",
+            f"{SCRYFALL_API_URL}/cards/search",
+            params={"q": COMMANDER_QUERY, "page": 1, "order": "name"},
+            timeout=10
+        )
+        response.raise_for_status()
+        return self._search_signal(response.json()["total_cards"])
+    
+    def _publish(self, commanders: Dict[str, str], commander_cards: Dict[str, CommanderRecord], coverage: float = 1.0,
+                 source_signal: Optional[str] = None) -> bool:
+        """
+        Install a freshly loaded table unless it matches the current one
         
-        # Try partial matches (for queries like "my atraxa deck")
-        for commander_key, colors in self.commanders.items():
-            if commander_key in name_key or name_key in commander_key:
-                return colors
+        Returns True if the table was replaced. Either way the new fetch time
+        and source signal are published with the table and the snapshot is
+        rewritten (only complete tables are saved).
+        """
+        fetched_at = time.time()
+        current = self.table
+        if current.complete and commanders == current.commanders and commander_cards == current.commander_cards:
+            print(f"✅ Commander data unchanged ({len(commanders)} commanders), keeping current table")
+            with self._publish_lock:
+                self.table = current.confirmed(fetched_at, source_signal)
+            self.save_snapshot()
+            return False
         
-        return None
+        self._install(commanders, commander_cards, coverage, fetched_at, source_signal)
+        self.save_snapshot()
+        return True
     
-    def get_commander_info(self, commander_name: str) -> Optional[dict]:
-        """Get full card info for a commander"""
-        name_key = commander_name.lower().strip()
-        return self.commander_cards.get(name_key)
+    def _publish_partial(self, commanders: Dict[str, str], commander_cards: Dict[str, CommanderRecord], coverage: float,
+                         sort: bool = False):
+        """
+        Serve a table that is still being loaded
+        
+        Only happens while no complete table is loaded; a refresh of a complete
+        table is built off to the side and installed once. The loader keeps
+        adding to its dicts, so readers get copies, put in name order first
+        with `sort`. A partial table never replaces a bigger one (e.g. the
+        bulk loader's before a search fallback).
+        """
+        current = self.table
+        if current.complete or len(commanders) <= len(current.commanders):
+            return
+        if sort:
+            commanders, commander_cards = self._in_name_order(commanders, commander_cards)
+        else:
+            commanders, commander_cards = dict(commanders), dict(commander_cards)
+        self._install(commanders, commander_cards, coverage)
+        print(f"📄 Serving {len(commanders)} commanders so far ({coverage:.0%} loaded)")
     
-    def search_commanders(self, query: str, limit: int = 10) -> List[dict]:
-        """Search commanders by name, return list of matches"""
-        query_lower = query.lower()
-        matches = []
+    @staticmethod
+    def _fraction(done: int, total: Optional[int]) -> float:
+        """Loaded fraction, kept just below 1.0 until the load actually finishes"""
+        if not total:
+            return 0.0
+        return min(done / total, 0.99)
+    
+    def _install(self, commanders: Dict[str, str], commander_cards: Dict[str, CommanderRecord], coverage: float = 1.0,
+                 fetched_at: Optional[float] = None, source_signal: Optional[str] = None):
+        """Publish a new table version; the dicts must not be modified afterwards"""
+        with self._publish_lock:
+            self.table = CommanderTable(next(self._versions), commanders, commander_cards, coverage, fetched_at, source_signal)
+    
+    def load_snapshot(self) -> bool:
+        """Load the commander table saved by a previous run; takes milliseconds, no network"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
         
-        for name_key, colors in self.commanders.items():
-            if query_lower in name_key:
-                card_info = self.commander_cards.get(name_key, {})
-                matches.append({
-                    "name": card_info.get("name", name_key.title()),
-                    "color_identity": colors,
-                    "colors_display": self._format_colors(colors)
+        try:
+            start_time = time.time()
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = json.loads(gzip.decompress(f.read()))
+            
+            if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("fields") != list(SLIM_CARD_FIELDS):
+                print(f"⚠️  Ignoring commander snapshot with version {snapshot.get('version')}")
+                return False
+            
+            # Rows are [name_key, color_identity, *SLIM_CARD_FIELDS] with None for missing fields
+            commanders = {}
+            commander_cards = {}
+            for row in snapshot["rows"]:
+                name_key, color_identity, values = sys.intern(row[0]), sys.intern(row[1]), row[2:]
+                commanders[name_key] = color_identity
+                commander_cards[name_key] = CommanderRecord({
+                    field: value for field, value in zip(SLIM_CARD_FIELDS, values) if value is not None
                 })
+            
+            self.card_store.load_index()
+            
+            self._install(commanders, commander_cards,
+                          fetched_at=snapshot.get("fetched_at"), source_signal=snapshot.get("source_signal"))
+            print(f"💾 Loaded {len(commanders)} commanders from snapshot in {(time.time() - start_time) * 1000:.1f}ms")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to load commander snapshot: {e}")
+            return False
+    
+    def save_snapshot(self) -> bool:
+        """Persist the processed commander table for the next startup"""
+        table = self.table
+        if not self.snapshot_path or not table.complete:
+            return False
         
-        return matches[:limit]
-    
-    def _format_colors(self, color_identity: str) -> str:
-        """Format color identity for display"""
-        color_names = {
-            'W': 'White',
-            'U': 'Blue', 
-            'B': 'Black',
-            'R': 'Red',
-            'G': 'Green'
-        }
-        
-        if not color_identity:
-            return "Colorless"
+        try:
+            rows = []
+            for name_key, color_identity in table.commanders.items():
+                record = table.commander_cards.get(name_key)
+                card = record.to_dict() if record else {}
+                rows.append([name_key, color_identity] + [card.get(field) for field in SLIM_CARD_FIELDS])
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "fetched_at": table.fetched_at,
+                "source_signal": table.source_signal,
+                "fields": list(SLIM_CARD_FIELDS),
+                "rows": rows
+            }
+            body = json.dumps(snapshot, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            atomic_write_bytes(self.snapshot_path, gzip.compress(body, mtime=0))
+            return True
+        except Exception as e:
+            print(f"❌ Failed to save commander snapshot: {e}")
+            return False
+    
+    def _load_fallback_commanders(self):
+        """Used when the Scryfall load fails: fall back to the disk snapshot if no complete table is loaded"""
+        if self.complete:
+            return
+        if not self.load_snapshot():
+            # Color inference keeps using the hardcoded commanders in app.nlp
+            print("⚠️  No commander data available, using built-in commander list")
+    
+    def get_commander_colors(self, commander_name: str) -> Optional[str]:
+        """
+        Get color identity for a commander name
+        Returns color identity string like 'WUBG' or None if not found
+        """
+        return self.table.get_colors(commander_name)
+    
+    def get_commander_info(self, commander_name: str, table: Optional[CommanderTable] = None) -> Optional[dict]:
+        """
+        Get full card info for a commander
         
-        return "/".join(color_names[c] for c in color_identity)
+        The full Scryfall JSON is read from the disk store on demand; if it
+        isn't there, the slim record is returned instead. Pass the table the
+        request already holds to stay on that version.
+        """
+        name_key = commander_name.lower().strip()
+        record = (table or self.table).commander_cards.get(name_key)
+        if record is None:
+            return None
+        return self.card_store.get(name_key) or record.to_dict()
+    
+    def get_display_name(self, name_key: str) -> str:
+        """Printed card name for a commander key"""
+        return self.table.display_name(name_key)
+    
+    def search_commanders(self, query: str, limit: int = 10, session: Optional[str] = None) -> List[dict]:
+        """Search commanders by name, return list of matches"""
+        return self.table.search(query, limit, session)
 
 # Global instance
-commander_db = CommanderDatabase()
+commander_db = CommanderDatabase(
+    snapshot_path=COMMANDERS_SNAPSHOT,
+    card_store_path=COMMANDER_CARDS_STORE,
+    source=COMMANDER_SOURCE
+)
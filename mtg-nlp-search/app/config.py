@@ -0,0 +1,98 @@
+"""
+Runtime configuration - every knob can be overridden with an environment variable
+"""
+
+import os
+
+# Directory of this package (mtg-nlp-search/)
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to the default on bad input"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting, falling back to the default on bad input"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Scryfall API base URL; point it at a stand-in (tests/load/scryfall_standin.py)
+# to run without the live API
+SCRYFALL_API_URL = os.environ.get("SCRYFALL_API_URL", "https://api.scryfall.com").rstrip("/")
+
+# Typeahead sessions (/card-names and /commanders/search)
+TYPEAHEAD_SESSION_TTL = _env_float("TYPEAHEAD_SESSION_TTL", 30.0)  # seconds
+TYPEAHEAD_MAX_SESSIONS = _env_int("TYPEAHEAD_MAX_SESSIONS", 512)
+TYPEAHEAD_MAX_CANDIDATES = _env_int("TYPEAHEAD_MAX_CANDIDATES", 2000)
+
+# On-disk snapshots of reference data, so restarts don't wait on Scryfall.
+# Set a path to an empty string to disable that snapshot.
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(_PACKAGE_DIR, "data"))
+CARD_NAMES_SNAPSHOT = os.environ.get("CARD_NAMES_SNAPSHOT", os.path.join(DATA_DIR, "card_names.json.gz"))
+COMMANDERS_SNAPSHOT = os.environ.get("COMMANDERS_SNAPSHOT", os.path.join(DATA_DIR, "commanders.json.gz"))
+COMMANDER_CARDS_STORE = os.environ.get("COMMANDER_CARDS_STORE", os.path.join(DATA_DIR, "commander_cards.jsonl"))
+
+# Where commanders come from: "bulk" streams Scryfall's oracle-cards bulk file in
+# one request; "search" pages through /cards/search. Bulk falls back to search.
+COMMANDER_SOURCE = os.environ.get("COMMANDER_SOURCE", "bulk")
+
+# Background refresh of card names and commanders: every REFRESH_INTERVAL
+# seconds (0 disables), randomly spread by ±REFRESH_JITTER of the interval
+REFRESH_INTERVAL = _env_float("REFRESH_INTERVAL", 6 * 3600)
+REFRESH_JITTER = _env_float("REFRESH_JITTER", 0.2)
+
+# Longest /search prompt accepted, in characters. The parsers are linear in
+# the prompt length; the cap bounds the work one request can ask for.
+MAX_PROMPT_LENGTH = _env_int("MAX_PROMPT_LENGTH", 500)
+
+# Logging: level for the app's loggers (DEBUG shows per-request parse
+# traces) and output format, "text" or "json" (one JSON object per line)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+
+# Sampled query log for offline replay (tests/load/replay_query_log.py):
+# path of the JSON-lines file (empty disables it) and fraction of /search
+# requests written
+QUERY_LOG_PATH = os.environ.get("QUERY_LOG_PATH", "")
+QUERY_LOG_SAMPLE_RATE = _env_float("QUERY_LOG_SAMPLE_RATE", 0.1)
+
+# Secret for the /admin endpoints (X-Admin-Token header) and for profiling a
+# single request with an X-Profile header; empty disables both
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Request profiling: fraction of requests profiled (0 = only on demand),
+# "sampling" (stack samples every PROFILE_INTERVAL seconds, collapsed-stack
+# output) or "cprofile" (deterministic, pstats output), and how many recent
+# profiles are kept in memory for /admin/profiles
+PROFILE_SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sampling").lower()
+PROFILE_INTERVAL = _env_float("PROFILE_INTERVAL", 0.005)
+PROFILE_KEEP = _env_int("PROFILE_KEEP", 20)
+
+# Span tracing: where finished spans go, a JSON-lines file path or an
+# OTLP/HTTP collector URL (empty disables tracing), and the fraction of
+# requests traced (decided once per trace, at its root)
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "")
+TRACE_SAMPLE_RATE = _env_float("TRACE_SAMPLE_RATE", 0.1)
+
+# Slow-query log: /search requests taking at least SLOW_QUERY_MS milliseconds
+# (0 disables it) are appended to SLOW_QUERY_LOG_PATH (JSON lines, empty keeps
+# them in memory only); the last SLOW_QUERY_KEEP are listed by /admin/slow-queries
+SLOW_QUERY_MS = _env_float("SLOW_QUERY_MS", 1000.0)
+SLOW_QUERY_LOG_PATH = os.environ.get("SLOW_QUERY_LOG_PATH", "")
+SLOW_QUERY_KEEP = _env_int("SLOW_QUERY_KEEP", 100)
+
+# Memory accounting: seconds between samples of structure sizes and RSS for
+# /metrics (0 disables sampling; /admin/memory can still measure on demand),
+# and tracemalloc frames kept per allocation (0 leaves tracemalloc off; it
+# slows allocations down, PYTHONTRACEMALLOC also works)
+MEMORY_SAMPLE_INTERVAL = _env_float("MEMORY_SAMPLE_INTERVAL", 300.0)
+MEMORY_TRACEMALLOC_FRAMES = _env_int("MEMORY_TRACEMALLOC_FRAMES", 0)
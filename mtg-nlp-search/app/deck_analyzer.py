@@ -4,12 +4,15 @@ For integration with the MTG NLP Search API
 """
 
 import requests
-import time
 from typing import Dict, List, Optional
 
+from app.config import SCRYFALL_API_URL
+from app.scryfall import rate_limit, scryfall_get
+from app.timing import stage
+
 class DeckAnalyzer:
     def __init__(self):
-        self.scryfall_base = "https://api.scryfall.com"
+        self.scryfall_base = SCRYFALL_API_URL
         
         # Known underpowered cards with better alternatives
         self.underpowered_cards = {
@@ -52,7 +55,8 @@ class DeckAnalyzer:
         try:
             url = f"{self.scryfall_base}/cards/named"
             params = {"fuzzy": card_name}
-            response = requests.get(url, params=params, timeout=10)
+            with stage("scryfall", card_name):
+                response = scryfall_get("deck_analyzer", url, params=params, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -167,6 +171,6 @@ class DeckAnalyzer:
                 results["summary"]["needs_improvement"] += 1
             
             # Rate limiting for Scryfall API
-            time.sleep(0.1)
+            rate_limit("deck_analyzer")
         
         return results
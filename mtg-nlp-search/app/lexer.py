@@ -0,0 +1,381 @@
+"""
+Single-pass scanning for many regex patterns at once
+
+Parsers ask dozens of "does this pattern occur in the prompt?" questions.
+Instead of one re.search per pattern, a Lexer compiles all of them into one
+regex and answers every question from a single left-to-right pass.
+
+Prompts come straight from users, so every scan is linear in the prompt
+length. The regex only does bounded work per position; alternatives that a
+backtracking engine would handle in quadratic time or worse (".*" spans and
+"(?!.*...)" exclusions) are matched by plain string scans instead (see
+Sequence), and word-run captures have their own linear scanner
+(word_run_captures).
+"""
+
+import re
+
+# A number is always matched whole, never from the middle of a digit run, so
+# a long run of digits is scanned once instead of once per digit
+_NUMBER = r'(\d+)'
+_WHOLE_NUMBER = r'(?<!\d)'
+
+_WORD_CHAR = re.compile(r'\w')
+_WORD_RUNS = re.compile(r'[\w\s]+')
+
+# Marker for \b inside a Sequence part
+_BOUNDARY = object()
+
+
+def _alternatives(pattern: str) -> list:
+    """Split a regex on its top-level '|'"""
+    depth, start, i, parts = 0, 0, 0, []
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _literal_prefix(alternative: str) -> list:
+    """
+    The regex tokens every match of `alternative` starts with
+
+    A leading \\b is kept so the prefix cannot match inside a word, and a
+    leading number becomes a single digit that does not follow another one.
+    Otherwise literal characters are taken up to the first metacharacter (a
+    character made optional by a quantifier is dropped).
+    """
+    prefix = []
+    if alternative.startswith(r'\b'):
+        alternative = alternative[2:]
+        prefix.append(r'\b')
+    if alternative.startswith(_NUMBER):
+        return prefix + [_WHOLE_NUMBER + r'\d']
+    if alternative.startswith(r'(?:\d+)'):
+        return prefix + [r'\d']
+    i = 0
+    while i < len(alternative):
+        if alternative[i] == '\\':
+            if alternative[i + 1].isalnum():
+                break
+            token, i = re.escape(alternative[i + 1]), i + 2
+        elif alternative[i] in '.^$*+?{}[]|()':
+            break
+        else:
+            token, i = re.escape(alternative[i]), i + 1
+        if i < len(alternative) and alternative[i] in '*?{':
+            break
+        prefix.append(token)
+    return prefix
+
+
+def _prefix_trie(prefixes: list) -> str:
+    """One regex matching any of the prefixes, shared starts factored out"""
+    trie = {}
+    for prefix in prefixes:
+        node = trie
+        for token in prefix:
+            node = node.setdefault(token, {})
+        node[''] = {}
+
+    def emit(node):
+        if '' in node:  # a shorter prefix already covers everything below
+            return ''
+        parts = [token + emit(child) for token, child in node.items()]
+        return parts[0] if len(parts) == 1 else '(?:' + '|'.join(parts) + ')'
+
+    return emit(trie)
+
+
+def _first_token(alternative: str) -> str:
+    """The first literal token of the alternative, ignoring \\b ('' if none)"""
+    tokens = [token for token in _literal_prefix(alternative) if token != r'\b']
+    return tokens[0] if tokens else ''
+
+
+def _needs_sequence(alternative: str) -> bool:
+    return '.*' in alternative or '(?!' in alternative
+
+
+class Sequence:
+    """
+    A pattern like 'exile.*graveyard' or r'\\bcounter\\b(?!.*cannot)(?!.*counter.*on)'
+    matched with string scans instead of backtracking
+
+    Supported syntax: literal text (backslash escapes allowed), \\b, '.*'
+    between parts, and trailing '(?!.*...)' exclusions made of the same.
+    Since '.' stops at newlines, each line is checked on its own: earlier
+    parts are found as early as possible and the last part as late as
+    possible, which leaves the least text for the exclusions to match.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.parts, self.exclusions = self._parse(pattern)
+
+    @classmethod
+    def _parse(cls, pattern: str, nested: bool = False):
+        parts, exclusions, current, i = [], [], [], 0
+        while i < len(pattern):
+            char = pattern[i]
+            if exclusions and not pattern.startswith('(?!', i):
+                raise ValueError(f"exclusions must come last: {pattern!r}")
+            if char == '\\':
+                escaped = pattern[i + 1]
+                if escaped == 'b':
+                    current.append(_BOUNDARY)
+                elif escaped.isalnum():
+                    raise ValueError(f"unsupported escape \\{escaped} in {pattern!r}")
+                else:
+                    current.append(escaped)
+                i += 2
+            elif pattern.startswith('.*', i):
+                parts.append(current)
+                current, i = [], i + 2
+            elif pattern.startswith('(?!', i) and not nested:
+                end = cls._group_end(pattern, i)
+                inner = pattern[i + 3:end]
+                if not inner.startswith('.*'):
+                    raise ValueError(f"exclusions must start with '.*': {pattern!r}")
+                exclusions.append(cls._parse(inner[2:], nested=True)[0])
+                i = end + 1
+            elif char in '.^$*+?{}[]|()':
+                raise ValueError(f"unsupported syntax {char!r} in {pattern!r}")
+            else:
+                current.append(char)
+                i += 1
+        parts.append(current)
+        if not all(parts):
+            raise ValueError(f"empty part in {pattern!r}")
+        return [cls._compile_part(part) for part in parts], exclusions
+
+    @staticmethod
+    def _group_end(pattern: str, start: int) -> int:
+        depth, i = 0, start
+        while i < len(pattern):
+            if pattern[i] == '\\':
+                i += 2
+                continue
+            if pattern[i] == '(':
+                depth += 1
+            elif pattern[i] == ')':
+                depth -= 1
+                if depth == 0:
+                    return i
+            i += 1
+        raise ValueError(f"unbalanced group in {pattern!r}")
+
+    @staticmethod
+    def _compile_part(tokens: list):
+        """Plain string when possible, otherwise a regex with \\b anchors"""
+        if _BOUNDARY not in tokens:
+            return ''.join(tokens)
+        return re.compile(''.join(r'\b' if t is _BOUNDARY else re.escape(t) for t in tokens))
+
+    @staticmethod
+    def _find(part, line: str, pos: int):
+        """(start, end) of the first occurrence at or after pos, or None"""
+        if isinstance(part, str):
+            start = line.find(part, pos)
+            return None if start == -1 else (start, start + len(part))
+        match = part.search(line, pos)
+        return match.span() if match else None
+
+    @staticmethod
+    def _find_last(part, line: str, pos: int):
+        """(start, end) of the last-starting occurrence at or after pos, or None"""
+        if isinstance(part, str):
+            start = line.rfind(part, pos)
+            return None if start == -1 else (start, start + len(part))
+        last, match = None, part.search(line, pos)
+        while match:
+            last = match.span()
+            match = part.search(line, last[0] + 1)
+        return last
+
+    @classmethod
+    def _find_all_parts(cls, parts: list, line: str, pos: int) -> bool:
+        for part in parts:
+            span = cls._find(part, line, pos)
+            if span is None:
+                return False
+            pos = span[1]
+        return True
+
+    def search_line(self, line: str) -> bool:
+        pos = 0
+        for part in self.parts[:-1]:
+            span = self._find(part, line, pos)
+            if span is None:
+                return False
+            pos = span[1]
+        span = self._find_last(self.parts[-1], line, pos)
+        if span is None:
+            return False
+        return not any(self._find_all_parts(exclusion, line, span[1]) for exclusion in self.exclusions)
+
+    def search(self, text: str) -> bool:
+        """Whether re.search(self.pattern, text) would find a match"""
+        return any(self.search_line(line) for line in text.split('\n'))
+
+
+def compile_lexer(patterns: list):
+    """
+    Compile (key, regex) pairs into one scanner
+
+    Each pattern becomes a zero-width lookahead at the same position, so
+    overlapping matches ("counterspell" is a counter effect and a spell) are
+    all reported in a single left-to-right pass, and the first position where
+    a pattern matches is exactly where re.search would have found it. A
+    leading trie of literal prefixes skips positions where nothing can start,
+    and lookaheads are grouped by their first character so a position only
+    tries the patterns that can start there.
+
+    Alternatives with '.*' or '(?!' are split off into Sequences; they only
+    report whether they match, so they must not capture numbers.
+    """
+    prefixes = []
+    blocks = {}  # first literal token ('' if none) -> [(key, regex)]
+    sequences = []
+    for key, pattern in patterns:
+        alternatives = _alternatives(pattern)
+        spans = [Sequence(a) for a in alternatives if _needs_sequence(a)]
+        if spans:
+            sequences.append((key, spans))
+        plain = [a for a in alternatives if not _needs_sequence(a)]
+        if not plain:
+            continue
+        prefixes += [_literal_prefix(a) for a in plain]
+
+        by_first = {}
+        for alternative in plain:
+            by_first.setdefault(_first_token(alternative), []).append(alternative)
+        if len(by_first) > 1 and _NUMBER in pattern:
+            by_first = {'': plain}  # numbers come from the first alternative that matches
+        for first, group in by_first.items():
+            blocks.setdefault(first, []).append((key, '|'.join(group)))
+
+    regex = ['(?=' + _prefix_trie(prefixes) + ')']
+    entries = []
+    for b, (first, members) in enumerate(blocks.items()):
+        groups = []
+        for key, pattern in members:
+            i = len(entries)
+            numbers = iter(range(pattern.count(_NUMBER)))
+            named = re.sub(re.escape(_NUMBER), lambda _: f'{_WHOLE_NUMBER}(?P<t{i}_{next(numbers)}>\\d+)', pattern)
+            groups.append(f'(?:(?=(?P<t{i}>{named}))|)')
+            entries.append((b, key, pattern))
+        # The empty b{n} group marks positions where the block was tried
+        regex.append(f'(?:(?={first})(?P<b{b}>){"".join(groups)}|)' if first else ''.join(groups))
+    lexer = re.compile(''.join(regex))
+
+    keys = {}  # block marker group (None: always tried) -> [(key, group, number groups)]
+    for i, (b, key, pattern) in enumerate(entries):
+        keys.setdefault(lexer.groupindex.get(f'b{b}'), []).append(
+            (key, lexer.groupindex[f't{i}'],
+             [lexer.groupindex[f't{i}_{n}'] for n in range(pattern.count(_NUMBER))]))
+    return lexer, list(keys.items()), sequences
+
+
+class Lexer:
+    """Finds the first match of many patterns in one pass over the text"""
+
+    def __init__(self, patterns: list):
+        self.scanner, self._keys, self._sequences = compile_lexer(patterns)
+
+    def scan(self, text: str) -> dict:
+        """
+        Scan the text once and record the first match of every pattern
+
+        Returns key -> the pattern's numbers as ints (an empty tuple for
+        patterns without numbers). Keys that never matched are absent.
+        """
+        tokens = {}
+        pending = self._keys
+        for match in self.scanner.finditer(text):
+            start = match.start
+            found = False
+            for marker, entries in pending:
+                if marker is not None and start(marker) == -1:
+                    continue  # the block's first character is not here
+                for key, group, numbers in entries:
+                    if start(group) != -1 and key not in tokens:
+                        tokens[key] = tuple(int(match.group(n)) for n in numbers)
+                        found = True
+            if found:
+                pending = [(marker, remaining) for marker, remaining in
+                           ((marker, [e for e in entries if e[0] not in tokens]) for marker, entries in pending)
+                           if remaining]
+                if not pending:
+                    break
+
+        lines = None
+        for key, sequences in self._sequences:
+            if key in tokens:
+                continue
+            if lines is None:
+                lines = text.split('\n')
+            if any(sequence.search_line(line) for sequence in sequences for line in lines):
+                tokens[key] = ()
+        return tokens
+
+
+def word_run_captures(text: str, prefix: str = '', suffix: str = '') -> list:
+    """
+    re.findall(prefix + r'(\\w+(?:\\s+\\w+)*)' + suffix, text) in linear time
+
+    prefix and suffix are literal word/space text, and suffix is empty or
+    starts with whitespace. Such a match never leaves a run of word and
+    space characters, and within a run the greedy capture always ends at the
+    last place the suffix can follow a word, so each run gives at most one
+    capture and is scanned a constant number of times.
+    """
+    if not _WORD_RUNS.fullmatch(prefix or ' ') or not re.fullmatch(r'(\s[\w\s]*)?', suffix):
+        raise ValueError(f"unsupported prefix/suffix: {prefix!r}, {suffix!r}")
+
+    captures = []
+    for run in _WORD_RUNS.finditer(text):
+        run_start, run_end = run.span()
+
+        # Where the capture ends: just before the last suffix that follows a word
+        if suffix:
+            end = text.rfind(suffix, run_start + 1, run_end)
+            while end != -1 and not _WORD_CHAR.match(text, end - 1):
+                end = text.rfind(suffix, run_start + 1, end - 1 + len(suffix))
+            if end == -1:
+                continue
+        else:
+            end = run_start + len(run.group().rstrip())
+
+        # Where it starts: the first word character after an occurrence of the prefix
+        if prefix:
+            start = None
+            found = text.find(prefix, run_start, run_end)
+            while found != -1:
+                candidate = found + len(prefix)
+                if candidate >= end:
+                    break
+                if _WORD_CHAR.match(text, candidate):
+                    start = candidate
+                    break
+                found = text.find(prefix, found + 1, run_end)
+            if start is None:
+                continue
+        else:
+            start = run_start + len(run.group()) - len(run.group().lstrip())
+            if start >= end:
+                continue
+
+        captures.append(text[start:end])
+    return captures
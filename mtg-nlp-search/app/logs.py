@@ -0,0 +1,124 @@
+"""
+Leveled, structured logging that stays off the request path
+
+Every module logs through logging.getLogger(__name__) under the "app"
+logger. configure_logging() gives that logger a queue handler: a log call
+only checks the level and enqueues the record, and a background listener
+thread formats and writes it. Hot paths log with %-style arguments, so a
+disabled DEBUG call costs one level check and never formats its payload.
+Structured data goes in `extra={"fields": {...}}` and is rendered as
+key=value pairs (text) or JSON keys (json).
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+from app.config import LOG_FORMAT, LOG_LEVEL
+
+ROOT_LOGGER = "app"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: readable text, or a JSON object when json_lines"""
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        fields = getattr(record, "fields", None) or {}
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if self.json_lines:
+            entry = {
+                "ts": datetime.datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message,
+                **fields,
+            }
+            if exc:
+                entry["exc"] = exc
+            return json.dumps(entry, default=str, ensure_ascii=False)
+
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, default=str, ensure_ascii=False)}"
+                                   for key, value in fields.items())
+        if exc:
+            line += "\n" + exc
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records without formatting them on the caller's thread
+
+    The message is merged with its arguments here (callers may mutate them
+    afterwards) and fields are copied one level deep, so a filters dict
+    logged as a field keeps its logged keys; rendering happens on the
+    listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {key: value.copy() if isinstance(value, (dict, list)) else value
+                             for key, value in fields.items()}
+        return record
+
+
+def _level(name) -> int:
+    level = logging.getLevelName(name) if isinstance(name, str) else name
+    return level if isinstance(level, int) else logging.INFO
+
+
+def configure_logging(level=LOG_LEVEL, json_lines: bool = LOG_FORMAT == "json", stream=None):
+    """
+    Route the app's loggers through a queue to a background writer
+
+    Safe to call again (e.g. from tests with another level or stream): the
+    previous listener is flushed and replaced.
+    """
+    global _listener
+    shutdown_logging()
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter(json_lines))
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+    logger.addHandler(_QueueHandler(records))
+    logger.setLevel(_level(level))
+    logger.propagate = False
+    return _listener
+
+
+def shutdown_logging():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# Flush queued records when the process exits
+atexit.register(shutdown_logging)
@@ -1,16 +1,36 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import Depends, FastAPI, Query, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.query_builder import extract_filters
 from app.scryfall import search_scryfall
 from app.deck_analyzer import DeckAnalyzer
 from app.commanders import commander_db
+from app.color_identity import mask_colors, parse_identity
 from app.card_names import card_names_cache
+from app.suggest import suggest_index, KINDS
+from app.refresh import refresh_scheduler
+from app.typeahead import typeahead_sessions
+from app.config import MAX_PROMPT_LENGTH
+from app.admin import require_admin
+from app.logs import configure_logging
+from app.memory import measure as measure_memory, memory_sampler, rss_bytes
+from app.metrics import CallbackGauge, MetricsMiddleware, render as render_metrics
+from app.profiling import ProfilingMiddleware, profiled, profiler
+from app.query_log import query_log
+from app.slow_queries import slow_query_log
+from app.timing import stage, start_request, timed_json_response
+from app.tracing import TracingMiddleware, in_context, root_span
 from typing import List
 import asyncio
 import datetime
+import logging
+import time
 import subprocess
 import os
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="MTG NLP Search", description="Natural language search for Magic: The Gathering cards")
 
 # Store server start time
@@ -62,14 +82,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Trace-Id"],  # readable by the frontend's fetch()
 )
 
+# Latency, status and in-flight count per route (see /metrics)
+app.add_middleware(MetricsMiddleware, routes=app.router.routes)
+# Marks sampled or X-Profile requests for the @profiled endpoints (see /admin/profiles)
+app.add_middleware(ProfilingMiddleware)
+# Root span per request, for the sampled share of requests (see TRACE_EXPORT)
+app.add_middleware(TracingMiddleware, routes=app.router.routes)
+
+def _cache_entries():
+    index = suggest_index.current()
+    return {
+        ("typeahead",): len(typeahead_sessions),
+        ("suggest",): index.cached_results() if index else 0,
+    }
+
+def _resident_memory():
+    rss = rss_bytes()
+    return {(): rss} if rss is not None else {}
+
+CallbackGauge("mtgnlp_cache_entries", "Entries held per cache", ["cache"], _cache_entries)
+CallbackGauge("mtgnlp_memory_retained_bytes", "Estimated bytes retained per structure, at the last memory sample",
+              ["structure", "kind"], memory_sampler.retained_values)
+CallbackGauge("mtgnlp_process_resident_memory_bytes", "Resident set size of this worker", [], _resident_memory)
+
 @app.on_event("startup")
 async def startup_event():
     """Load commander database and card names at server startup"""
+    # Warm start from the last run's snapshot (milliseconds, no network);
+    # the background load below then refreshes it from Scryfall
+    if card_names_cache.load_snapshot():
+        logger.info("💾 Card names loaded from snapshot: %s cards", len(card_names_cache.card_names))
+    commander_db.load_snapshot()
+    
     # Run in background to not block startup
     asyncio.create_task(load_commanders_background())
     asyncio.create_task(load_card_names_background())
+    
+    # Periodic re-validation against Scryfall (first run is a full interval away)
+    refresh_scheduler.start()
+    # Periodic memory accounting for /metrics (first sample is a full interval away)
+    memory_sampler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    refresh_scheduler.stop()
+    memory_sampler.stop()
 
 async def load_commanders_background():
     """Background task to load commanders with timeout and fallback"""
@@ -78,23 +138,27 @@ async def load_commanders_background():
         
         async def load_with_timeout():
             loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(None, commander_db.load_commanders_at_startup)
+            with root_span("startup.load_commanders", sampled=True):
+                return await loop.run_in_executor(None, in_context(commander_db.load_commanders_at_startup))
         
         # 30 second timeout for the entire loading process
         try:
             success = await asyncio.wait_for(load_with_timeout(), timeout=30.0)
             
             if success:
-                print("🎉 Commander database loaded successfully in background")
+                logger.info("🎉 Commander database loaded successfully in background")
+                # Prebuild the /suggest index so the first keystroke doesn't pay for it
+                with root_span("startup.build_suggest_index", sampled=True):
+                    await asyncio.get_event_loop().run_in_executor(None, in_context(suggest_index.rebuild))
             else:
-                print("⚠️  Commander database loaded with fallback")
+                logger.warning("⚠️  Commander database loaded with fallback")
                 
         except asyncio.TimeoutError:
-            print("⏰ Commander loading timed out after 30s, using fallback")
+            logger.warning("⏰ Commander loading timed out after 30s, using fallback")
             commander_db._load_fallback_commanders()
             
     except Exception as e:
-        print(f"❌ Commander loading failed: {e}")
+        logger.error("❌ Commander loading failed: %s", e)
         commander_db._load_fallback_commanders()
 
 async def load_card_names_background():
@@ -104,35 +168,42 @@ async def load_card_names_background():
         
         async def load_with_timeout():
             loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(None, card_names_cache.load_card_names)
+            with root_span("startup.load_card_names", sampled=True):
+                return await loop.run_in_executor(None, in_context(card_names_cache.load_card_names))
         
         # 30 second timeout for loading card names
+        # (a failed or slow refresh keeps serving the snapshot, if one was loaded)
         try:
-            await asyncio.wait_for(load_with_timeout(), timeout=30.0)
-            print(f"🎉 Card names loaded successfully: {len(card_names_cache.card_names)} cards")
+            success = await asyncio.wait_for(load_with_timeout(), timeout=30.0)
+            if success:
+                logger.info("🎉 Card names loaded successfully: %s cards", len(card_names_cache.card_names))
+            else:
+                logger.warning("⚠️  Card names refresh failed, serving %s cached cards", len(card_names_cache.card_names))
+            with root_span("startup.build_suggest_index", sampled=True):
+                await asyncio.get_event_loop().run_in_executor(None, in_context(suggest_index.rebuild))
                 
         except asyncio.TimeoutError:
-            print("⏰ Card names loading timed out after 30s")
-            card_names_cache.loaded = False
+            logger.warning("⏰ Card names loading timed out after 30s")
             
     except Exception as e:
-        print(f"❌ Card names loading failed: {e}")
-        card_names_cache.loaded = False
+        logger.error("❌ Card names loading failed: %s", e)
 
 @app.get("/")
 def read_root():
+    table = commander_db.table
     return {
         "message": "MTG NLP Search API", 
-        "commanders_loaded": commander_db.loaded,
-        "commander_count": len(commander_db.commanders) if commander_db.loaded else 0
+        "commanders_loaded": table.loaded,
+        "commander_count": len(table.commanders)
     }
 
 @app.get("/debug-nlp")
-def debug_nlp(prompt: str = Query(..., description="Debug NLP parsing")):
+@profiled
+def debug_nlp(prompt: str = Query(..., max_length=MAX_PROMPT_LENGTH, description="Debug NLP parsing")):
     """Debug endpoint to test NLP parsing directly"""
     try:
         from app.nlp import extract_filters
-        filters = extract_filters(prompt)
+        filters = extract_filters(prompt, debug=True)
         
         return {
             "prompt": prompt,
@@ -147,30 +218,64 @@ def debug_nlp(prompt: str = Query(..., description="Debug NLP parsing")):
         }
 
 @app.get("/commanders")
-def get_commanders(search: str = Query(None, description="Search commander names"), full_names: bool = Query(False, description="Return full names instead of keys")):
+@profiled
+def get_commanders(
+    search: str = Query(None, description="Search commander names"),
+    full_names: bool = Query(False, description="Return full names instead of keys"),
+    identity_subset: str = Query(None, description="Commanders whose color identity is within these colors, e.g. 'esper' or 'WUB'"),
+    identity_exact: str = Query(None, description="Commanders with exactly this color identity, e.g. 'simic', 'GU' or 'colorless'"),
+    color_count: int = Query(None, ge=0, le=5, description="Commanders with exactly this many colors")
+):
     """Get commander information"""
-    if not commander_db.loaded:
+    table = commander_db.table  # one consistent version for the whole request
+    if not table.loaded:
         return {
             "loaded": False,
             "message": "Commander database still loading, please try again in a moment"
         }
     
+    if identity_subset or identity_exact or color_count is not None:
+        # Answered from the color-identity buckets
+        try:
+            if identity_subset:
+                mode, mask = "subset", parse_identity(identity_subset)
+            elif identity_exact:
+                mode, mask = "exact", parse_identity(identity_exact)
+            else:
+                mode, mask = "count", color_count
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error": str(e), "error_type": "invalid_identity"})
+        
+        name_keys = table.commanders_by_identity(mask, mode)
+        return {
+            "loaded": True,
+            "coverage": table.coverage,
+            "mode": mode,
+            "identity": mask_colors(mask) if mode != "count" else None,
+            "color_count": mask if mode == "count" else None,
+            "total": len(name_keys),
+            "results": [
+                {"name": table.display_name(name_key), "colors": table.commanders[name_key]}
+                for name_key in name_keys
+            ]
+        }
+    
     if search:
         # Search for specific commanders
-        results = commander_db.search_commanders(search, limit=20)
+        results = table.search(search, limit=20)
         return {
             "loaded": True,
+            "coverage": table.coverage,
             "query": search,
             "results": results,
-            "total_commanders": len(commander_db.commanders)
+            "total_commanders": len(table.commanders)
         }
     elif full_names:
         # Return all commanders with full names (for frontend cache)
         commanders = []
-        for name_key, color_identity in commander_db.commanders.items():
-            card_info = commander_db.commander_cards.get(name_key, {})
+        for name_key, color_identity in table.commanders.items():
             commanders.append({
-                "name": card_info.get("name", name_key.title()),
+                "name": table.display_name(name_key),
                 "colors": color_identity
             })
         return sorted(commanders, key=lambda x: x["name"])
@@ -178,22 +283,45 @@ def get_commanders(search: str = Query(None, description="Search commander names
         # Return summary info
         return {
             "loaded": True,
-            "total_commanders": len(commander_db.commanders),
-            "sample_commanders": list(commander_db.commanders.keys())[:20],
-            "message": "Use ?search=name to search for specific commanders, or ?full_names=true to get all commanders with full names"
+            "coverage": table.coverage,
+            "total_commanders": len(table.commanders),
+            "identity_counts": table.identity_counts(),
+            "sample_commanders": list(table.commanders.keys())[:20],
+            "message": "Use ?search=name to search for specific commanders, ?full_names=true to get all commanders with full names, or ?identity_subset=esper / ?identity_exact=GU / ?color_count=4 to filter by color identity"
         }
 
 @app.get("/search")
+@profiled
 def search(
-    prompt: str = Query(..., description="Describe the kind of card you're looking for."),
+    prompt: str = Query(..., max_length=MAX_PROMPT_LENGTH, description="Describe the kind of card you're looking for."),
     page: int = Query(1, ge=1, description="Page number (starts at 1)"),
     per_page: int = Query(20, ge=1, le=100, description="Results per page (1-100)"),
-    commander_colors: str = Query(None, description="Commander color identity (e.g., 'WUBG' for Atraxa)")
+    commander_colors: str = Query(None, description="Commander color identity (e.g., 'WUBG' for Atraxa)"),
+    timing: bool = Query(False, description="Add a per-stage timing block to the response")
 ):
+    request_timing = start_request()
+    status = 500
+    result = None
+    try:
+        result = _search(prompt, page, per_page, commander_colors)
+        if timing:
+            result["timing"] = request_timing.block()
+        response = timed_json_response(result, request_timing)
+        status = 200
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        query_log.record(prompt, commander_colors, page, per_page, status, request_timing)
+        slow_query_log.record(prompt, commander_colors, page, per_page, status, request_timing, result)
+
+def _search(prompt: str, page: int, per_page: int, commander_colors: str):
     try:
         # Try to extract filters using NLP
-        filters = extract_filters(prompt)
-        print(f"API: Extracted filters: {filters}")
+        with stage("parse"):
+            filters = extract_filters(prompt)
+        logger.debug("API: Extracted filters: %s", filters)
         
         # If commander colors are explicitly provided, override with COLORIDENTITY constraint
         if commander_colors:
@@ -203,7 +331,7 @@ def search(
             # Set explicit commander constraint
             filters['coloridentity'] = commander_colors
             filters['is_commander_context'] = True
-            print(f"API: Applied explicit commander constraint: commander:{commander_colors}")
+            logger.debug("API: Applied explicit commander constraint: commander:%s", commander_colors)
         
         # If OpenAI failed, create a basic filter from the prompt
         if not filters or (len(filters) == 1 and "raw_query" in filters):
@@ -216,7 +344,7 @@ def search(
                 # Set explicit commander constraint
                 filters['coloridentity'] = commander_colors
                 filters['is_commander_context'] = True
-            print(f"API: Using raw query: {prompt}")
+            logger.debug("API: Using raw query: %s", prompt)
         
         # Calculate which Scryfall page we need
         # Scryfall uses 175 cards per page, our API uses configurable per_page
@@ -228,15 +356,14 @@ def search(
         scryfall_query = search_result["query"]
         total_results = search_result.get("total_cards", len(scryfall_cards))
         
-        print(f"API: Scryfall query: {scryfall_query}")
-        print(f"API: Total results: {total_results}")
-        print(f"API: Requested page {page}, fetching Scryfall page {scryfall_page}")
-        print(f"API: Final filters: {filters}")
+        logger.debug("API: Scryfall query: %s", scryfall_query, extra={"fields": {
+            "total_results": total_results, "page": page, "scryfall_page": scryfall_page, "filters": filters}})
         
         # Calculate pagination within the Scryfall page
         scryfall_start_idx = ((page - 1) * per_page) % 175
         scryfall_end_idx = min(scryfall_start_idx + per_page, len(scryfall_cards))
-        cards = scryfall_cards[scryfall_start_idx:scryfall_end_idx]
+        with stage("slice"):
+            cards = scryfall_cards[scryfall_start_idx:scryfall_end_idx]
         
         # If we need more cards and there are more Scryfall pages, fetch the next page
         if len(cards) < per_page and scryfall_start_idx + per_page > 175:
@@ -247,11 +374,11 @@ def search(
             # Add remaining cards from next page
             remaining_needed = per_page - len(cards)
             cards.extend(next_cards[:remaining_needed])
-            print(f"API: Fetched additional {len(next_cards[:remaining_needed])} cards from page {next_scryfall_page}")
+            logger.debug("API: Fetched additional %s cards from page %s", len(next_cards[:remaining_needed]), next_scryfall_page)
         
         total_pages = (total_results + per_page - 1) // per_page  # Ceiling division
         
-        print(f"Found {total_results} total cards, showing page {page}/{total_pages}")
+        logger.debug("Found %s total cards, showing page %s/%s", total_results, page, total_pages)
         
         return {
             "prompt": prompt,
@@ -269,7 +396,7 @@ def search(
             }
         }
     except Exception as e:
-        print(f"Error in search endpoint: {e}")
+        logger.exception("Error in search endpoint: %s", e)
         error_str = str(e).lower()
         
         # Detect cold start / server warmup issues
@@ -310,18 +437,24 @@ def search(
         )
 
 @app.post("/analyze-deck")
-def analyze_deck(card_names: List[str]):
+@profiled
+def analyze_deck(card_names: List[str],
+                 timing: bool = Query(False, description="Add a per-stage timing block to the response")):
     """Analyze a deck list and suggest improvements"""
+    request_timing = start_request()
     try:
         analyzer = DeckAnalyzer()
         results = analyzer.analyze_deck_list(card_names)
         
-        return {
+        result = {
             "success": True,
             "analysis": results
         }
+        if timing:
+            result["timing"] = request_timing.block()
+        return timed_json_response(result, request_timing)
     except Exception as e:
-        print(f"Error in deck analysis: {e}")
+        logger.exception("Error in deck analysis: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
@@ -358,6 +491,57 @@ def get_sample_queries():
         "note": "These are basic examples for API testing. Frontend should manage its own sample queries with UI-specific metadata."
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics for this worker: latency, parse time, Scryfall calls, rate-limit waits, caches"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """Recently profiled requests, newest first"""
+    return {
+        "sample_rate": profiler.sample_rate,
+        "mode": profiler.mode,
+        "profiles": [profile.summary() for profile in profiler.store.list()],
+    }
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: int, format: str = Query("text", description="collapsed, pstats or text")):
+    """One profile as collapsed stacks (sampling), a pstats file (cprofile) or text"""
+    profile = profiler.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail={"error": f"No profile {profile_id} (only the most recent are kept)"})
+    if format not in profile.formats:
+        raise HTTPException(status_code=400, detail={
+            "error": f"A {profile.mode} profile is available as {' or '.join(profile.formats)}",
+            "formats": list(profile.formats)})
+    
+    if format == "pstats":
+        return Response(profile.pstats_bytes(), media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'})
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed(),
+                                 headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'})
+    return PlainTextResponse(profile.text())
+
+@app.get("/admin/slow-queries", dependencies=[Depends(require_admin)])
+def list_slow_queries(limit: int = Query(20, ge=1, le=1000, description="How many queries to list")):
+    """The slowest recent /search requests (at least SLOW_QUERY_MS), slowest first"""
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "recorded": slow_query_log.recorded,
+        "queries": slow_query_log.slowest(limit),
+    }
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+def memory_report(
+    fresh: bool = Query(False, description="Measure now instead of returning the last sample"),
+    top: int = Query(10, ge=1, le=100, description="Tracemalloc allocation sites to list, when measuring")
+):
+    """Retained size per structure, process RSS and tracemalloc's top allocators"""
+    report = measure_memory(top) if fresh or memory_sampler.last is None else memory_sampler.last
+    return dict(report, interval_seconds=memory_sampler.interval, samples=memory_sampler.samples)
+
 @app.get("/health-check")
 def health_check():
     """Health check endpoint with deployment metadata"""
@@ -374,6 +558,10 @@ def health_check():
     # Detect if server is in cold start phase (first 60 seconds)
     is_cold_start = uptime_seconds < 60
     
+    table = commander_db.table
+    catalog = card_names_cache.catalog
+    card_names_loaded = catalog.loaded
+    
     return {
         "status": "healthy",
         "timestamp": current_time.isoformat() + "Z",
@@ -388,43 +576,63 @@ def health_check():
             "environment": "render" if os.environ.get("RENDER") else "local"
         },
         "services": {
-            "commanders_loaded": commander_db.loaded,
-            "commander_count": len(commander_db.commanders) if commander_db.loaded else 0,
-            "card_names_loaded": card_names_cache.loaded,
-            "card_names_count": len(card_names_cache.card_names) if card_names_cache.loaded else 0,
-            "ready_for_search": commander_db.loaded and not is_cold_start,
-            "ready_for_lookahead": card_names_cache.loaded
+            "commanders_loaded": table.loaded,
+            "commander_count": len(table.commanders),
+            "commanders_coverage": round(table.coverage, 3),
+            "commanders_version": table.version,
+            "commanders_fetched_at": (
+                datetime.datetime.utcfromtimestamp(table.fetched_at).isoformat() + "Z"
+                if table.fetched_at else None
+            ),
+            "card_names_loaded": card_names_loaded,
+            "card_names_count": len(catalog.card_names) if card_names_loaded else 0,
+            "card_names_version": catalog.version,
+            "card_names_fetched_at": (
+                datetime.datetime.utcfromtimestamp(catalog.fetched_at).isoformat() + "Z"
+                if catalog.fetched_at else None
+            ),
+            "ready_for_search": table.loaded and not is_cold_start,
+            "ready_for_lookahead": card_names_loaded
         },
+        "refresh": refresh_scheduler.metrics(),
+        "memory": memory_sampler.summary(),
         "cold_start": is_cold_start,
         "version": "1.0.1"  # You can update this manually or read from a version file
     }
 
 @app.get("/commanders/search")
-def search_commanders(search: str = Query(..., description="Search commander names")):
+@profiled
+def search_commanders(
+    search: str = Query(..., description="Search commander names"),
+    session: str = Query(None, description="Typeahead session token; narrows the previous keystroke's matches")
+):
     """Search for specific commanders"""
-    if not commander_db.loaded:
+    table = commander_db.table
+    if not table.loaded:
         return {
             "loaded": False,
             "message": "Commander database still loading, please try again in a moment"
         }
     
     # Search for specific commanders
-    results = commander_db.search_commanders(search, limit=20)
+    results = table.search(search, limit=20, session=session)
     return {
         "loaded": True,
+        "coverage": table.coverage,
         "query": search,
         "results": results,
-        "total_commanders": len(commander_db.commanders)
+        "total_commanders": len(table.commanders)
     }
 
 @app.get("/commanders/{commander_name}")
 def get_commander_info(commander_name: str):
     """Get detailed info for a specific commander"""
-    if not commander_db.loaded:
+    table = commander_db.table
+    if not table.loaded:
         return {"error": "Commander database still loading"}
     
-    colors = commander_db.get_commander_colors(commander_name)
-    info = commander_db.get_commander_info(commander_name)
+    colors = table.get_colors(commander_name)
+    info = commander_db.get_commander_info(commander_name, table=table)
     
     if colors:
         return {
@@ -437,11 +645,90 @@ def get_commander_info(commander_name: str):
         return {
             "name": commander_name,
             "found": False,
-            "suggestions": commander_db.search_commanders(commander_name, limit=5)
+            "suggestions": table.search(commander_name, limit=5)
         }
 
+@app.get("/suggest")
+@profiled
+def suggest(
+    query: str = Query(..., description="What the user has typed so far"),
+    limit: int = Query(5, ge=1, le=20, description="Maximum suggestions per kind")
+):
+    """Unified typeahead over card names, commanders and query vocabulary (guilds, lands, effects)"""
+    # Limit the query length to prevent abuse
+    if len(query) > 50:
+        query = query[:50]
+    
+    start = time.perf_counter()
+    index = suggest_index.get()
+    results = index.suggest(query, limit)
+    took_ms = (time.perf_counter() - start) * 1000
+    
+    return {
+        "query": query,
+        "results": results,
+        "kinds": list(KINDS),
+        "commanders_loaded": commander_db.loaded,
+        "card_names_loaded": card_names_cache.loaded,
+        "took_ms": round(took_ms, 3)
+    }
+
+@app.get("/card-names/all")
+def get_all_card_names(request: Request):
+    """Full card-name catalog for client-side autocomplete (gzip + ETag, revalidates with 304)"""
+    download = card_names_cache.download
+    if download is None:
+        return Response(
+            content=b'{"loaded":false,"data":[],"message":"Card names database still loading, please try again in a moment"}',
+            media_type="application/json",
+            headers={"Cache-Control": "no-store"}
+        )
+    
+    gzipped = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": download.gzip_etag if gzipped else download.etag,
+        "Cache-Control": "public, max-age=3600",
+        "Vary": "Accept-Encoding"
+    }
+    
+    # Any listed validator (weak or strong) of either encoding of the current catalog means the client is up to date
+    if_none_match = request.headers.get("if-none-match", "")
+    client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if download.etag in client_etags or download.gzip_etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers=headers)
+    
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=download.gzipped, media_type="application/json", headers=headers)
+    
+    return Response(content=download.body, media_type="application/json", headers=headers)
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip: listed (or covered by *) with a q-value above 0"""
+    qualities = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
 @app.get("/card-names")
-def get_card_names(query: str = Query(..., description="Search query for card names"), limit: int = Query(10, description="Maximum number of results")):
+@profiled
+def get_card_names(
+    query: str = Query(..., description="Search query for card names"),
+    limit: int = Query(10, description="Maximum number of results"),
+    session: str = Query(None, description="Typeahead session token; narrows the previous keystroke's matches")
+):
     """Get card name suggestions for lookahead functionality"""
     if not card_names_cache.loaded:
         return {
@@ -457,7 +744,7 @@ def get_card_names(query: str = Query(..., description="Search query for card na
     # Limit the number of results
     limit = min(limit, 20)
     
-    suggestions = card_names_cache.search_card_names(query, limit)
+    suggestions = card_names_cache.search_card_names(query, limit, session=session)
     
     return {
         "loaded": True,
@@ -0,0 +1,195 @@
+"""
+Memory accounting: retained size of the app's large structures, process RSS
+and tracemalloc's top allocation sites
+
+The retained size of a structure is estimated by walking everything
+reachable from it (gc.get_referents) and adding up sys.getsizeof() of each
+object once. Structures are walked in a fixed order with one shared "seen"
+set, so an object reachable from several (a card name in the catalog and
+in a typeahead session) is counted for the first: data, then indexes, then
+caches. Classes, modules and functions are not walked.
+
+Walking takes a while on a fully loaded worker (hundreds of thousands of
+objects), so MemorySampler measures every MEMORY_SAMPLE_INTERVAL seconds in
+an executor thread; /metrics and /health-check report the last sample, and
+/admin/memory can measure on demand.
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import types
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.card_names import card_names_cache
+from app.commanders import commander_db
+from app.config import MEMORY_SAMPLE_INTERVAL, MEMORY_TRACEMALLOC_FRAMES
+from app.suggest import suggest_index
+from app.typeahead import typeahead_sessions
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Shared by the whole program, not owned by any structure
+_NOT_WALKED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType, types.FrameType)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Bytes of obj and everything reachable from it, each object counted once
+
+    Objects whose id is in `seen` are skipped; the ones counted are added to it.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, _NOT_WALKED):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        pending.extend(gc.get_referents(item))
+    return total
+
+
+def accounted_structures() -> List[Tuple[str, str, Any]]:
+    """(name, kind, object) for every accounted structure, in counting order"""
+    table = commander_db.table.memory_parts()
+    catalog = card_names_cache.catalog
+    index = suggest_index.current()
+    suggest = index.memory_parts() if index is not None else {}
+    return [
+        ("commander_db.commanders", "data", table["commanders"]),
+        ("commander_db.commander_cards", "data", table["commander_cards"]),
+        ("card_names_cache.card_names", "data", catalog.card_names),
+        ("commander_db.identity_buckets", "index", table["identity_buckets"]),
+        ("commander_db.name_index", "index", table["name_index"]),
+        ("card_names_cache.prefix_index", "index", (catalog.sorted_keys, catalog.sorted_positions, catalog.name_set)),
+        ("suggest_index", "index", suggest.get("index")),
+        ("card_names_cache.download", "cache", catalog.download),
+        ("suggest_index.results", "cache", suggest.get("results")),
+        ("typeahead_sessions", "cache", typeahead_sessions.memory_parts()["sessions"]),
+        ("commander_db.colors_memo", "cache", table["colors_memo"]),
+    ]
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux), or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Highest resident set size so far, or None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+def tracemalloc_top(limit: int = 10) -> Dict[str, Any]:
+    """The source lines holding the most traced memory, when tracemalloc is on"""
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "top": []}
+    snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "top": [
+            {"where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ],
+    }
+
+
+def measure(top: int = 10) -> Dict[str, Any]:
+    """One memory report: retained size per structure, RSS and the top allocators"""
+    start = time.perf_counter()
+    seen: Set[int] = set()
+    retained = [
+        {"name": name, "kind": kind, "bytes": deep_sizeof(obj, seen) if obj is not None else 0}
+        for name, kind, obj in accounted_structures()
+    ]
+    return {
+        "sampled_at": time.time(),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "retained_total_bytes": sum(entry["bytes"] for entry in retained),
+        "retained": retained,
+        "tracemalloc": tracemalloc_top(top),
+        "measure_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+class MemorySampler:
+    """Measures memory periodically in the background and keeps the last report"""
+
+    def __init__(self, interval: float, tracemalloc_frames: int = 0):
+        self.interval = interval  # seconds between samples; 0 disables the sampler
+        self.tracemalloc_frames = tracemalloc_frames
+        self.last: Optional[Dict[str, Any]] = None
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> Dict[str, Any]:
+        report = measure()
+        self.last = report
+        self.samples += 1
+        logger.debug("🧠 Memory sample: rss=%s retained=%s (%.1f ms)",
+                     report["rss_bytes"], report["retained_total_bytes"], report["measure_ms"])
+        return report
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            await loop.run_in_executor(None, self.sample)
+
+    def start(self):
+        """Start tracemalloc if configured, and the background loop (no-op when disabled or already running)"""
+        if self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def retained_values(self) -> Dict[Tuple[str, ...], float]:
+        """Last sample's retained bytes per (structure, kind), for /metrics"""
+        if self.last is None:
+            return {}
+        return {(entry["name"], entry["kind"]): entry["bytes"] for entry in self.last["retained"]}
+
+    def summary(self) -> Dict[str, Any]:
+        """Current RSS and the last sample's totals, for /health-check"""
+        last = self.last or {}
+        return {
+            "rss_bytes": rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "retained_total_bytes": last.get("retained_total_bytes"),
+            "sampled_at": last.get("sampled_at"),
+        }
+
+
+# Global instance
+memory_sampler = MemorySampler(MEMORY_SAMPLE_INTERVAL, MEMORY_TRACEMALLOC_FRAMES)
@@ -0,0 +1,308 @@
+"""
+Prometheus-style metrics, exposed in text format at /metrics
+
+Recording never takes a lock: every metric keeps one dict per thread, only
+that thread writes to it, and a scrape sums copies of all of them. Once a
+thread has exited (the threadpool retires idle workers), its dict is folded
+into a retired total and dropped, so the number of dicts follows the number
+of live threads. The numbers are per worker process; with several workers, each one reports its
+own (scrape them separately or add them up downstream).
+
+Metrics are module-level objects, recorded where the work happens:
+
+    SCRYFALL_REQUESTS.inc("search", "200")
+    with PARSE_SECONDS.time("query_builder"):
+        ...
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; requests and Scryfall calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; parsing a prompt takes microseconds to a few milliseconds
+PARSE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+REGISTRY: List["_Metric"] = []
+
+
+class _ThreadShards:
+    """One dict per live thread; each thread only ever writes its own"""
+
+    def __init__(self, merge: Callable[[dict, dict], None]):
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}  # folded shards of exited threads
+        self._merge = merge  # merge(into, shard); must not modify values of `into` in place
+        self._lock = threading.Lock()  # taken when a thread's shard is created, and by scrapes
+
+    def mine(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_finished()
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _retire_finished(self):
+        """Fold the shards of exited threads into the retired total (lock held)"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)  # nothing writes to it any more
+        self._shards = live
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            self._retire_finished()
+            shards = [shard for _, shard in self._shards]
+            retired = self._retired.copy()
+        return [retired] + [shard.copy() for shard in shards]  # dict.copy() is atomic under the GIL
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        REGISTRY.append(self)
+
+    def samples(self) -> List[Tuple[str, LabelValues, Tuple[Tuple[str, str], ...], float]]:
+        """(name suffix, label values, extra labels, value) for exposition"""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._shards = _ThreadShards(self._merge)
+
+    @staticmethod
+    def _merge(into: dict, shard: dict):
+        for key, value in shard.items():
+            into[key] = into.get(key, 0) + value
+
+    def inc(self, *label_values: str, amount: float = 1):
+        shard = self._shards.mine()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._shards.snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def samples(self):
+        return [("", key, (), value) for key, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """A value that goes up and down (e.g. requests in flight)"""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class CallbackGauge(_Metric):
+    """A gauge read at scrape time from `read()` -> {label values: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], read: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, help_text, labels)
+        self.read = read
+
+    def samples(self):
+        return [("", key, (), value) for key, value in sorted(self.read().items())]
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards(self._merge)
+
+    @staticmethod
+    def _merge(into: dict, shard: dict):
+        for key, counts in shard.items():
+            total = into.get(key)
+            into[key] = list(counts) if total is None else [a + b for a, b in zip(total, counts)]
+
+    def observe(self, value: float, *label_values: str):
+        shard = self._shards.mine()
+        counts = shard.get(label_values)
+        if counts is None:
+            # one slot per bucket, one for +Inf, then the sum
+            counts = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observe the duration of the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def timed(self, *label_values: str):
+        """Decorator form of time()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+            return wrapper
+        return decorator
+
+    def values(self) -> Dict[LabelValues, List[float]]:
+        """Per label set: bucket counts (not cumulative), +Inf count, then the sum"""
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._shards.snapshot():
+            for key, counts in shard.items():
+                total = totals.setdefault(key, [0] * len(counts))
+                for i, value in enumerate(list(counts)):
+                    total[i] += value
+        return totals
+
+    def samples(self):
+        samples = []
+        for key, counts in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", key, (("le", _format_bound(bound)),), cumulative))
+            samples.append(("_sum", key, (), counts[-1]))
+            samples.append(("_count", key, (), cumulative))
+        return samples
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format (0.0.4)"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, key, extra, value in metric.samples():
+            pairs = list(zip(metric.labels, key)) + list(extra)
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in pairs)
+            lines.append(f"{metric.name}{suffix}{{{labels}}} {_format_value(value)}" if labels
+                         else f"{metric.name}{suffix} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+REQUEST_SECONDS = Histogram("mtgnlp_http_request_duration_seconds", "Time to answer a request, by route",
+                            ["endpoint"])
+REQUESTS = Counter("mtgnlp_http_requests_total", "Requests answered, by route and status", ["endpoint", "status"])
+IN_FLIGHT = Gauge("mtgnlp_http_requests_in_flight", "Requests being answered, by route", ["endpoint"])
+
+# Parsing
+PARSE_SECONDS = Histogram("mtgnlp_parse_duration_seconds", "Time to parse a prompt, by parser", ["parser"],
+                          buckets=PARSE_BUCKETS)
+
+# Scryfall
+SCRYFALL_REQUESTS = Counter("mtgnlp_scryfall_requests_total",
+                            "Scryfall API calls by caller and status (\"error\" when no response)",
+                            ["caller", "status"])
+SCRYFALL_SECONDS = Histogram("mtgnlp_scryfall_request_duration_seconds", "Scryfall API call latency, by caller",
+                             ["caller"])
+RATE_LIMIT_WAIT_SECONDS = Histogram("mtgnlp_rate_limiter_wait_seconds",
+                                    "Time spent waiting to respect Scryfall's rate limit, by caller", ["caller"],
+                                    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+# Caches
+CACHE_EVENTS = Counter("mtgnlp_cache_events_total", "Cache lookups and evictions, by cache and event (hit, miss, eviction)",
+                       ["cache", "event"])
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and in-flight count per route
+
+    Requests are labelled with the route's path template (/commanders/{commander_name}),
+    or "other" when no route matches, so labels stay bounded.
+    """
+
+    def __init__(self, app, routes: Sequence = ()):
+        self.app = app
+        self.routes = routes
+
+    def _endpoint(self, scope) -> str:
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path  # path matches, method doesn't
+        return partial or "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        IN_FLIGHT.inc(endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+            REQUESTS.inc(endpoint, status)
+            IN_FLIGHT.dec(endpoint)
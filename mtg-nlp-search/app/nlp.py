@@ -1,6 +1,13 @@
 import json
+import logging
 import re
 
+from app.lexer import Lexer, word_run_captures
+from app.metrics import PARSE_SECONDS
+from app.tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
 # Magic: The Gathering vocabulary mappings
 GUILD_COLORS = {
     'azorius': 'WU', 'dimir': 'UB', 'rakdos': 'BR', 'gruul': 'RG', 'selesnya': 'GW',
@@ -65,30 +72,115 @@ COMMANDERS = {
     'sliver overlord': 'WUBRG'
 }
 
-def extract_filters_fallback(prompt: str) -> dict:
-    """Fallback parser when OpenAI fails or isn't available"""
-    import re  # Import at function level
+# Mana value patterns, in priority order: the first pattern that matches
+# anywhere wins, using its leftmost match
+RANGE_PATTERNS = [
+    (r'(\d+)\+\s+mana', '>='),  # "6+ mana"
+    (r'(\d+)\s*\+\s*mana', '>='),  # "6 + mana"
+    (r'(\d+)\s*or\s+less', '<='),  # "2 or less"
+    (r'costs?\s+(\d+)\s+or\s+less', '<='),  # "costs 2 or less"
+    (r'(\d+)\s+or\s+fewer', '<='),  # "2 or fewer"
+]
+
+MANA_PATTERNS = [
+    r'(\d+)\s+mana',
+    r'cmc\s*:?\s*(\d+)',
+    r'(\d+)\s+cmc',  # Added pattern for "1 cmc", "2 cmc", etc.
+    r'costs?\s+(\d+)',
+    r'(\d+)\s+cost'
+]
+
+CARD_TYPE_WORDS = ['instant', 'sorcery', 'creature', 'artifact', 'enchantment', 'planeswalker', 'land']
+
+# Sort types to match Scryfall's expected order (artifact before creature)
+TYPE_ORDER = {'artifact': 0, 'creature': 1, 'enchantment': 2, 'instant': 3, 'sorcery': 4, 'planeswalker': 5, 'land': 6}
+
+FORMAT_PATTERNS = {
+    'standard': [r'\bstandard\b', r'format:standard'],
+    'commander': [r'\bcommander\b', r'\bedh\b', r'format:commander'],
+    'modern': [r'\bmodern\b', r'format:modern'],
+    'pioneer': [r'\bpioneer\b', r'format:pioneer'],
+    'legacy': [r'\blegacy\b', r'format:legacy'],
+    'pauper': [r'\bpauper\b', r'format:pauper']
+}
+
+# Common effects; "counter" is handled separately so that
+# "cannot be countered" doesn't count as a counterspell
+EFFECT_PATTERNS = {
+    'draw': ['draw', 'card draw'],
+    'removal': ['destroy', 'remove', 'removal'],
+    'ramp': [r'\bramp\b', r'search.*land(?!.*mana)', 'acceleration', 'mana acceleration'],
+    'token': ['token', 'create.*creature'],
+    'damage': ['damage', 'deal.*damage'],
+    'life': ['life', 'gain.*life'],
+    'flying': ['flying'],
+    'vigilance': ['vigilance'],
+    'trample': ['trample'],
+    'haste': ['haste'],
+    'defender': ['defender'],
+    'flashback': ['flashback'],
+    'tap': ['tap', 'untap']
+}
+
+COUNTER_PATTERNS = {
+    'counterspell': 'counterspell',
+    'counter_word': r'\bcounters?\b',
+    'uncounterable': r'cannot be countered|can\'t be countered',
+}
+
+
+def _word(phrase: str) -> str:
+    """Whole-word pattern for a vocabulary phrase"""
+    return r'\b' + re.escape(phrase) + r'\b'
+
+
+def _lexer_patterns() -> list:
+    """(token key, regex) for everything the fallback parser looks for"""
+    patterns = []
+    patterns += [(('range', i), pattern) for i, (pattern, _) in enumerate(RANGE_PATTERNS)]
+    patterns += [(('mana', i), pattern) for i, pattern in enumerate(MANA_PATTERNS)]
+    patterns += [
+        ('zero_mana', r'zero mana|0 mana'),
+        ('x_cost', r'\bx\s+cost|\bx\s+mana'),
+        ('power_toughness', r'(\d+)/(\d+)'),
+    ]
+    patterns += [(('type', word), re.escape(word)) for word in CARD_TYPE_WORDS]
+    patterns += [(('vernacular', phrase), re.escape(phrase)) for phrase in CARD_TYPES]
+    patterns += [(('land', phrase), re.escape(phrase)) for phrase in LAND_TYPES]
+    patterns += [(('format', name), '|'.join(pats)) for name, pats in FORMAT_PATTERNS.items()]
+    patterns += [(('effect', name), '|'.join(pats)) for name, pats in EFFECT_PATTERNS.items()]
+    patterns += [(name, pattern) for name, pattern in COUNTER_PATTERNS.items()]
+    for group, table in (('guild', GUILD_COLORS), ('shard', SHARD_COLORS), ('wedge', WEDGE_COLORS),
+                         ('color', COLOR_MAP), ('commander', COMMANDERS)):
+        patterns += [((group, name), _word(name.lower())) for name in table]
+    return patterns
+
+
+_LEXER = Lexer(_lexer_patterns())
+
+
+def lex(prompt_lower: str) -> dict:
+    """First match of every fallback-parser pattern in the prompt (see Lexer.scan)"""
+    return _LEXER.scan(prompt_lower)
+
+
+def extract_filters_fallback(prompt: str, debug: bool = False) -> dict:
+    """Fallback parser when OpenAI fails or isn't available
+    With debug=True the color-identity matching details are returned under '_debug_color'.
+    """
     prompt_lower = prompt.lower()
+    tokens = lex(prompt_lower)
     filters = {}
     
     # Extract mana cost patterns
     # Handle range patterns first (6+, 2 or less, etc.)
-    range_patterns = [
-        (r'(\d+)\+\s+mana', '>='),  # "6+ mana"
-        (r'(\d+)\s*\+\s*mana', '>='),  # "6 + mana"
-        (r'(\d+)\s*or\s+less', '<='),  # "2 or less"
-        (r'costs?\s+(\d+)\s+or\s+less', '<='),  # "costs 2 or less"
-        (r'(\d+)\s+or\s+fewer', '<='),  # "2 or fewer"
-    ]
-    
     cmc_operator = None
     cmc_value = None
     
-    for pattern, operator in range_patterns:
-        match = re.search(pattern, prompt_lower)
-        if match:
+    for i, (pattern, operator) in enumerate(RANGE_PATTERNS):
+        if ('range', i) in tokens:
             cmc_operator = operator
-            cmc_value = int(match.group(1))
+            cmc_value = tokens[('range', i)][0]
             break
     
     if cmc_operator and cmc_value is not None:
@@ -100,26 +192,17 @@ def extract_filters_fallback(prompt: str) -> dict:
             filters['scryfall_query'] += f' cmc{cmc_operator}{cmc_value}'
     else:
         # Handle exact mana costs if no range found
-        mana_patterns = [
-            r'(\d+)\s+mana',
-            r'cmc\s*:?\s*(\d+)',
-            r'(\d+)\s+cmc',  # Added pattern for "1 cmc", "2 cmc", etc.
-            r'costs?\s+(\d+)',
-            r'(\d+)\s+cost'
-        ]
-        
-        for pattern in mana_patterns:
-            match = re.search(pattern, prompt_lower)
-            if match:
-                filters['cmc'] = int(match.group(1))
+        for i in range(len(MANA_PATTERNS)):
+            if ('mana', i) in tokens:
+                filters['cmc'] = tokens[('mana', i)][0]
                 break
     
     # Handle zero mana specially
-    if 'zero mana' in prompt_lower or '0 mana' in prompt_lower:
+    if 'zero_mana' in tokens:
         filters['cmc'] = 0
     
     # Handle X cost spells
-    if re.search(r'\bx\s+cost', prompt_lower) or re.search(r'\bx\s+mana', prompt_lower):
+    if 'x_cost' in tokens:
         cmc_value = 1  # X costs are typically 1 or more
         filters['cmc'] = cmc_value
         if 'scryfall_query' not in filters:
@@ -128,24 +211,16 @@ def extract_filters_fallback(prompt: str) -> dict:
             filters['scryfall_query'] += f' cmc>={cmc_value}'
     
     # Extract power/toughness
-    pt_match = re.search(r'(\d+)/(\d+)', prompt)
-    if pt_match:
-        filters['power'] = int(pt_match.group(1))
-        filters['toughness'] = int(pt_match.group(2))
+    if 'power_toughness' in tokens:
+        filters['power'], filters['toughness'] = tokens['power_toughness']
     
     # Extract card types - handle multiple types like "artifact creature"
-    card_types = ['instant', 'sorcery', 'creature', 'artifact', 'enchantment', 'planeswalker', 'land']
-    found_types = []
-    for card_type in card_types:
-        if card_type in prompt_lower:
-            found_types.append(card_type)
+    found_types = [card_type for card_type in CARD_TYPE_WORDS if ('type', card_type) in tokens]
     
     # If multiple types found, create separate type: queries for Scryfall
     if found_types:
         if len(found_types) > 1:
-            # Sort types to match Scryfall's expected order (artifact before creature)
-            type_order = {'artifact': 0, 'creature': 1, 'enchantment': 2, 'instant': 3, 'sorcery': 4, 'planeswalker': 5, 'land': 6}
-            found_types.sort(key=lambda x: type_order.get(x, 99))
+            found_types.sort(key=lambda x: TYPE_ORDER.get(x, 99))
             
             # For multiple types, create individual type: queries
             type_queries = [f'type:{t}' for t in found_types]
@@ -164,10 +239,10 @@ def extract_filters_fallback(prompt: str) -> dict:
     # Handle special card type vernacular
     spell_or_permanent_query = None
     for vernacular, scryfall_query in CARD_TYPES.items():
-        if vernacular in prompt_lower:
+        if ('vernacular', vernacular) in tokens:
             # For commander queries, check for color combinations
             if vernacular == 'commander':
-                color_result = extract_color_identity(prompt_lower)
+                color_result = extract_color_identity(prompt_lower, tokens)
                 if color_result[0]:  # If color_identity is not None
                     color_identity, is_commander_context = color_result[0], color_result[1]
                     # Commander queries always use coloridentity
@@ -181,9 +256,9 @@ def extract_filters_fallback(prompt: str) -> dict:
     
     # Handle land vernacular
     for land_type, scryfall_query in LAND_TYPES.items():
-        if land_type in prompt_lower:
+        if ('land', land_type) in tokens:
             # Check for color combinations with land types
-            color_result = extract_color_identity(prompt_lower)
+            color_result = extract_color_identity(prompt_lower, tokens)
             
             # Always set type:land for land queries
             filters['type'] = 'land'
@@ -195,97 +270,53 @@ def extract_filters_fallback(prompt: str) -> dict:
             return {'type': 'land', 'scryfall_query': scryfall_query}
     
     # Extract color identity
-    print(f"🔍 DEBUG: About to call extract_color_identity with: '{prompt_lower}'")
-    color_result = extract_color_identity(prompt_lower)
+    logger.debug("🔍 About to call extract_color_identity with: '%s'", prompt_lower)
+    color_result = extract_color_identity(prompt_lower, tokens)
     color_identity, is_commander_context, color_debug = color_result[0], color_result[1], color_result[2]
-    print(f"🔍 DEBUG: extract_color_identity returned: {color_result}")
+    logger.debug("🔍 extract_color_identity returned: %s", color_result)
     
     if color_identity:
         if is_commander_context:
             # Commander context uses coloridentity
             filters['coloridentity'] = color_identity
-            print(f"🔍 DEBUG: Added coloridentity filter: {color_identity}")
+            logger.debug("🔍 Added coloridentity filter: %s", color_identity)
         else:
             # Everything else uses color
             filters['colors'] = color_identity
-            print(f"🔍 DEBUG: Added colors filter: {color_identity}")
+            logger.debug("🔍 Added colors filter: %s", color_identity)
     else:
-        print(f"🔍 DEBUG: No color identity found, checking individual colors")
+        logger.debug("🔍 No color identity found, checking individual colors")
         # Check for individual colors if no guild/commander context found
-        import re
+        # (matched on word boundaries to prevent substring matches)
         individual_colors = []
         for color_name, color_code in COLOR_MAP.items():
-            # Use word boundaries to prevent substring matches
-            pattern = r'\b' + re.escape(color_name.lower()) + r'\b'
-            if re.search(pattern, prompt_lower):
-                print(f"🔍 DEBUG: Individual color found - '{color_name}' -> {color_code}")
+            if ('color', color_name) in tokens:
+                logger.debug("🔍 Individual color found - '%s' -> %s", color_name, color_code)
                 individual_colors.append(color_code)
         
         if individual_colors:
             color_string = ''.join(sorted(individual_colors))
             filters["colors"] = color_string
-            print(f"🔍 DEBUG: Added individual colors filter: {color_string}")
+            logger.debug("🔍 Added individual colors filter: %s", color_string)
         else:
-            print(f"🔍 DEBUG: No colors found at all")
+            logger.debug("🔍 No colors found at all")
     
-    # Add debug info to filters
-    filters['_debug_color'] = color_debug
+    # Add debug info to filters (only when asked for, e.g. by /debug-nlp)
+    if debug:
+        filters['_debug_color'] = color_debug
     
     # Extract format information
-    format_patterns = {
-        'standard': [r'\bstandard\b', r'format:standard'],
-        'commander': [r'\bcommander\b', r'\bedh\b', r'format:commander'],
-        'modern': [r'\bmodern\b', r'format:modern'],
-        'pioneer': [r'\bpioneer\b', r'format:pioneer'],
-        'legacy': [r'\blegacy\b', r'format:legacy'],
-        'pauper': [r'\bpauper\b', r'format:pauper']
-    }
-    
-    for format_name, patterns in format_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, prompt_lower):
-                filters['format'] = format_name
-                break
-        if 'format' in filters:
+    for format_name in FORMAT_PATTERNS:
+        if ('format', format_name) in tokens:
+            filters['format'] = format_name
             break
     
     # Extract common effects
     effects = []
-    effect_patterns = {
-        'counter': ['counterspell', r'\bcounters?\b(?!.*cannot be countered)(?!.*can\'t be countered)'],
-        'draw': ['draw', 'card draw'],
-        'removal': ['destroy', 'remove', 'removal'],
-        'ramp': [r'\bramp\b', r'search.*land(?!.*mana)', 'acceleration', 'mana acceleration'],
-        'token': ['token', 'create.*creature'],
-        'damage': ['damage', 'deal.*damage'],
-        'life': ['life', 'gain.*life'],
-        'flying': ['flying'],
-        'vigilance': ['vigilance'],
-        'trample': ['trample'],
-        'haste': ['haste'],
-        'defender': ['defender'],
-        'flashback': ['flashback'],
-        'tap': ['tap', 'untap']
-    }
-    
-    for effect, patterns in effect_patterns.items():
-        for pattern in patterns:
-            # Special handling for counter effect to avoid "cannot be countered"
-            if effect == 'counter':
-                if pattern == 'counterspell' and 'counterspell' in prompt_lower:
-                    effects.append(effect)
-                    break
-                elif pattern.startswith(r'\bcounters?\b'):
-                    # Check if "counter" or "counters" appears but NOT in "cannot be countered" context
-                    if re.search(r'\bcounters?\b', prompt_lower):
-                        # Exclude if it's in a "cannot be countered" context
-                        if not re.search(r'cannot be countered|can\'t be countered|this spell cannot be countered', prompt_lower):
-                            effects.append(effect)
-                            break
-            else:
-                if re.search(pattern, prompt_lower):
-                    effects.append(effect)
-                    break
+    # Special handling for counter effect to avoid "cannot be countered"
+    if 'counterspell' in tokens or ('counter_word' in tokens and 'uncounterable' not in tokens):
+        effects.append('counter')
+    effects += [effect for effect in EFFECT_PATTERNS if ('effect', effect) in tokens]
     
     if effects:
         filters['effects'] = effects
@@ -302,14 +333,26 @@ def extract_filters_fallback(prompt: str) -> dict:
     
     return filters
 
-def extract_color_identity(prompt_lower: str) -> tuple:
+# Phrases that usually wrap a commander name ("for my Chulane deck"), as
+# (text before, text after) the words r'(\w+(?:\s+\w+)*)' would capture
+COMMANDER_PATTERNS = [
+    ('for my ', ' deck'),
+    ('in ', ' colors'),
+    ('', ' commander'),
+    ('for ', ''),
+]
+
+@traced("extract_color_identity")
+def extract_color_identity(prompt_lower: str, tokens: dict = None) -> tuple:
     """Extract color information from guild names, shard names, commanders, etc.
     Returns (color_identity, is_commander_context, debug_info) where:
     - color_identity is the color string (e.g., 'BR', 'GWU')
     - is_commander_context is True when we should use 'coloridentity:' instead of 'color:'
     - debug_info contains matching details for debugging
+    Pass the prompt's lex() tokens when the caller already has them.
     """
-    import re  # Import at function level to avoid scope issues
+    if tokens is None:
+        tokens = lex(prompt_lower)
     
     debug_info = {
         "input": prompt_lower,
@@ -320,16 +363,14 @@ def extract_color_identity(prompt_lower: str) -> tuple:
         "fallback_commander_matches": []
     }
     
-    print(f"🎨 DEBUG: extract_color_identity called with: '{prompt_lower}'")
+    logger.debug("🎨 extract_color_identity called with: '%s'", prompt_lower)
     color_identity = None
     is_commander_context = False
     
     # Check guild names - use coloridentity for deck building context
     for guild, colors in GUILD_COLORS.items():
-        # Use word boundaries to prevent substring matches
-        pattern = r'\b' + re.escape(guild.lower()) + r'\b'
-        if re.search(pattern, prompt_lower):
-            print(f"🏛️ DEBUG: Guild match found - '{guild}' -> {colors}")
+        if ('guild', guild) in tokens:
+            logger.debug("🏛️ Guild match found - '%s' -> %s", guild, colors)
             debug_info["guild_matches"].append({"name": guild, "colors": colors})
             color_identity = colors
             is_commander_context = True  # Guild names imply deck building context
@@ -338,10 +379,8 @@ def extract_color_identity(prompt_lower: str) -> tuple:
     # Check shard names - use coloridentity for deck building context
     if not color_identity:
         for shard, colors in SHARD_COLORS.items():
-            # Use word boundaries to prevent substring matches
-            pattern = r'\b' + re.escape(shard.lower()) + r'\b'
-            if re.search(pattern, prompt_lower):
-                print(f"🔺 DEBUG: Shard match found - '{shard}' -> {colors}")
+            if ('shard', shard) in tokens:
+                logger.debug("🔺 Shard match found - '%s' -> %s", shard, colors)
                 debug_info["shard_matches"].append({"name": shard, "colors": colors})
                 color_identity = colors
                 is_commander_context = True  # Shard names imply deck building context
@@ -350,10 +389,8 @@ def extract_color_identity(prompt_lower: str) -> tuple:
     # Check wedge names - use coloridentity for deck building context
     if not color_identity:
         for wedge, colors in WEDGE_COLORS.items():
-            # Use word boundaries to prevent substring matches
-            pattern = r'\b' + re.escape(wedge.lower()) + r'\b'
-            if re.search(pattern, prompt_lower):
-                print(f"🔶 DEBUG: Wedge match found - '{wedge}' -> {colors}")
+            if ('wedge', wedge) in tokens:
+                logger.debug("🔶 Wedge match found - '%s' -> %s", wedge, colors)
                 debug_info["wedge_matches"].append({"name": wedge, "colors": colors})
                 color_identity = colors
                 is_commander_context = True  # Wedge names imply deck building context
@@ -361,66 +398,62 @@ def extract_color_identity(prompt_lower: str) -> tuple:
     
     # Check commander names using dynamic database - use coloridentity
     if not color_identity:
-        from app.commanders import commander_db
+        with span("commander_lookup"):
+            from app.commanders import commander_db
+            table = commander_db.table  # one consistent version for the whole lookup
         
-        if commander_db.loaded:
-            # Try to extract commander name from common patterns
-            import re
-            commander_patterns = [
-                r'for my (\w+(?:\s+\w+)*) deck',
-                r'in (\w+(?:\s+\w+)*) colors',
-                r'(\w+(?:\s+\w+)*) commander',
-                r'for (\w+(?:\s+\w+)*)',
-            ]
-            
-            for pattern in commander_patterns:
-                matches = re.findall(pattern, prompt_lower)
-                for match in matches:
-                    commander_colors = commander_db.get_commander_colors(match.strip())
-                    if commander_colors:
-                        color_identity = commander_colors
-                        is_commander_context = True
+            if table.loaded:
+                # Try to extract commander name from common patterns
+                for prefix, suffix in COMMANDER_PATTERNS:
+                    matches = word_run_captures(prompt_lower, prefix, suffix)
+                    for match in matches:
+                        commander_colors = table.get_colors(match.strip())
+                        if commander_colors:
+                            color_identity = commander_colors
+                            is_commander_context = True
+                            break
+                    if color_identity:
                         break
-                if color_identity:
-                    break
             
-            # Also check direct commander name mentions
-            if not color_identity:
-                for commander_name in commander_db.commanders.keys():
-                    # Use word boundaries to prevent substring matches
-                    pattern = r'\b' + re.escape(commander_name.lower()) + r'\b'
-                    if re.search(pattern, prompt_lower):
-                        print(f"👑 DEBUG: Commander match found - '{commander_name}' -> {commander_db.commanders[commander_name]}")
-                        debug_info["commander_matches"].append({
-                            "name": commander_name, 
-                            "colors": commander_db.commanders[commander_name]
+                # Also check direct commander name mentions
+                if not color_identity:
+                    for commander_name in table.name_candidates(prompt_lower):
+                        name_lower = commander_name.lower()
+                        # Cheap substring test first; only then confirm the word boundaries
+                        if name_lower in prompt_lower and re.search(r'\b' + re.escape(name_lower) + r'\b', prompt_lower):
+                            logger.debug("👑 Commander match found - '%s' -> %s", commander_name, table.commanders[commander_name])
+                            debug_info["commander_matches"].append({
+                                "name": commander_name, 
+                                "colors": table.commanders[commander_name]
+                            })
+                            color_identity = table.commanders[commander_name]
+                            is_commander_context = True
+                            break
+        
+            if not color_identity and not table.complete:
+                # Fallback to hardcoded commanders while the database is not (fully) loaded
+                for commander, colors in COMMANDERS.items():
+                    if ('commander', commander) in tokens:
+                        logger.debug("👑 Fallback commander match found - '%s' -> %s", commander, colors)
+                        debug_info["fallback_commander_matches"].append({
+                            "name": commander, 
+                            "colors": colors
                         })
-                        color_identity = commander_db.commanders[commander_name]
+                        color_identity = colors
                         is_commander_context = True
                         break
-        else:
-            # Fallback to hardcoded commanders if database not loaded
-            for commander, colors in COMMANDERS.items():
-                # Use word boundaries to prevent substring matches
-                pattern = r'\b' + re.escape(commander.lower()) + r'\b'
-                if re.search(pattern, prompt_lower):
-                    print(f"👑 DEBUG: Fallback commander match found - '{commander}' -> {colors}")
-                    debug_info["fallback_commander_matches"].append({
-                        "name": commander, 
-                        "colors": colors
-                    })
-                    color_identity = colors
-                    is_commander_context = True
-                    break
     
-    print(f"🎨 DEBUG: extract_color_identity result - color_identity: '{color_identity}', is_commander_context: {is_commander_context}")
+    logger.debug("🎨 extract_color_identity result - color_identity: '%s', is_commander_context: %s",
+                 color_identity, is_commander_context)
     return color_identity, is_commander_context, debug_info
 
-def extract_filters(prompt: str) -> dict:
+@PARSE_SECONDS.timed("nlp")
+@traced("extract_filters", parser="nlp")
+def extract_filters(prompt: str, debug: bool = False) -> dict:
     """Main filter extraction function with OpenAI + fallback"""
     
     # First try the fallback parser (it's actually more reliable for Magic terms)
-    fallback_filters = extract_filters_fallback(prompt)
+    fallback_filters = extract_filters_fallback(prompt, debug=debug)
     
     # If we got a direct scryfall query, use it
     if 'scryfall_query' in fallback_filters:
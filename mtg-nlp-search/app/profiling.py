@@ -0,0 +1,279 @@
+"""
+On-demand request profiling
+
+ProfilingMiddleware picks the requests to profile: a random
+PROFILE_SAMPLE_RATE fraction, plus any request carrying an X-Profile header
+equal to ADMIN_TOKEN (X-Profile-Mode: sampling | cprofile overrides the
+mode). Endpoints decorated with @profiled then run under a profiler in the
+worker thread that executes them:
+
+- "sampling": a background thread records the endpoint thread's stack every
+  PROFILE_INTERVAL seconds. Cheap enough for production; output is
+  collapsed stacks ("frame;frame;frame count", as read by flamegraph.pl
+  and speedscope).
+- "cprofile": deterministic cProfile of the call; output is a pstats file
+  (marshal format, open with pstats.Stats(path)).
+
+The last PROFILE_KEEP profiles are kept in memory and listed/downloaded
+through /admin/profiles.
+"""
+
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.admin import token_matches
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sampling", "cprofile")
+
+
+@dataclass(frozen=True)
+class ProfileRequest:
+    """What the middleware asked for: how to profile and why"""
+    mode: str
+    trigger: str  # "sample" or "header"
+    path: str
+    query: str
+
+
+_requested: ContextVar[Optional[ProfileRequest]] = ContextVar("profile_request", default=None)
+
+
+@dataclass
+class Profile:
+    """One profiled request"""
+    id: int
+    mode: str
+    trigger: str
+    endpoint: str
+    path: str
+    query: str
+    started_at: float
+    duration_ms: float = 0.0
+    samples: Counter = field(default_factory=Counter)  # sampling: collapsed stack -> count
+    profiler: Optional[cProfile.Profile] = None  # cprofile
+
+    @property
+    def formats(self) -> Tuple[str, ...]:
+        return ("pstats", "text") if self.profiler is not None else ("collapsed", "text")
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "trigger": self.trigger,
+            "endpoint": self.endpoint,
+            "path": self.path,
+            "query": self.query,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": sum(self.samples.values()),
+            "formats": list(self.formats),
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def pstats_bytes(self) -> bytes:
+        """The same bytes pstats.Stats.dump_stats() writes"""
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+    def text(self, limit: int = 40) -> str:
+        if self.profiler is None:
+            return self.collapsed()
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+
+class ProfileStore:
+    """The most recent profiles, oldest dropped first"""
+
+    def __init__(self, keep: int = 20):
+        self._profiles: "deque[Profile]" = deque(maxlen=max(1, keep))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def list(self) -> List[Profile]:
+        """Newest first"""
+        with self._lock:
+            return list(reversed(self._profiles))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    One background thread sampling the stacks of the threads being profiled
+
+    The thread only runs while at least one request is being profiled.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._targets: Dict[int, Tuple[object, Counter]] = {}  # thread id -> (frame to stop at, samples)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int, stop_frame, samples: Counter):
+        """Sample `thread_id` below `stop_frame` into `samples` until stop()"""
+        with self._lock:
+            self._targets[thread_id] = (stop_frame, samples)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: int):
+        """After this returns, no more samples are added for the thread"""
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, (stop_frame, samples) in self._targets.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None and frame is not stop_frame:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if stack:
+                        samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+
+class Profiler:
+    """Decides which requests to profile, runs the profilers and keeps the results"""
+
+    def __init__(self, sample_rate: float = 0.0, mode: str = "sampling", interval: float = 0.005, keep: int = 20):
+        self.sample_rate = sample_rate
+        self.mode = mode if mode in MODES else "sampling"
+        self.store = ProfileStore(keep)
+        self.sampler = StackSampler(interval)
+        self._random = random.Random()
+
+    def choose(self, headers: Dict[str, str]) -> Optional[Tuple[str, str]]:
+        """(mode, trigger) when a request should be profiled"""
+        presented = headers.get("x-profile")
+        if presented is not None and token_matches(presented):
+            mode = headers.get("x-profile-mode", self.mode).lower()
+            return (mode if mode in MODES else self.mode), "header"
+        if self.sample_rate > 0 and self._random.random() < self.sample_rate:
+            return self.mode, "sample"
+        return None
+
+    def run(self, request: ProfileRequest, func, args, kwargs):
+        profile = Profile(id=self.store.next_id(), mode=request.mode, trigger=request.trigger,
+                          endpoint=func.__name__, path=request.path, query=request.query, started_at=time.time())
+        start = time.perf_counter()
+        try:
+            if request.mode == "cprofile":
+                return self._run_cprofile(profile, func, args, kwargs)
+            return self._run_sampling(profile, func, args, kwargs)
+        finally:
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            self.store.add(profile)
+            logger.info("🔬 Profiled %s (%s, %s): %.1f ms", request.path, profile.mode, request.trigger,
+                        profile.duration_ms, extra={"fields": {"profile_id": profile.id}})
+
+    def _run_sampling(self, profile: Profile, func, args, kwargs):
+        thread_id = threading.get_ident()
+        self.sampler.start(thread_id, sys._getframe(), profile.samples)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.sampler.stop(thread_id)
+
+    def _run_cprofile(self, profile: Profile, func, args, kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler owns this interpreter's profiling hook; sample instead
+            profile.mode = "sampling"
+            return self._run_sampling(profile, func, args, kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.profiler = profiler
+
+
+# Global instance
+profiler = Profiler(config.PROFILE_SAMPLE_RATE, config.PROFILE_MODE, config.PROFILE_INTERVAL, config.PROFILE_KEEP)
+
+
+def profiled(func):
+    """Run the endpoint under the profiler when its request was picked for profiling"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        request = _requested.get()
+        if request is None:
+            return func(*args, **kwargs)
+        return profiler.run(request, func, args, kwargs)
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """ASGI middleware marking the requests @profiled endpoints should profile"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {}
+        for name, value in scope.get("headers", ()):
+            if name in (b"x-profile", b"x-profile-mode"):
+                headers[name.decode("latin-1")] = value.decode("latin-1")
+        choice = profiler.choose(headers)
+        if choice is None:
+            await self.app(scope, receive, send)
+            return
+
+        mode, trigger = choice
+        # The threadpool copies this context into the worker thread that runs the endpoint
+        token = _requested.set(ProfileRequest(mode, trigger, scope["path"],
+                                              scope.get("query_string", b"").decode("latin-1")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _requested.reset(token)
@@ -19,10 +19,17 @@ Color Logic:
 - Commander context → use 'coloridentity' field → COLOR<= in Scryfall (color identity constraint)
 """
 
+import logging
 import re
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 
+from app.lexer import Lexer
+from app.metrics import PARSE_SECONDS
+from app.tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class QueryState:
@@ -30,6 +37,8 @@ class QueryState:
     filters: Dict[str, Any] = field(default_factory=dict)
     tokens: List[str] = field(default_factory=list)
     consumed_tokens: set = field(default_factory=set)
+    vocabulary: Dict[str, Tuple[str, str, str]] = field(default_factory=dict)  # kind -> first (token, label, value)
+    matches: Dict[Any, tuple] = field(default_factory=dict)  # lexer matches over the joined tokens
     debug_info: Dict[str, Any] = field(default_factory=dict)
 
 
@@ -143,18 +152,68 @@ class QueryBuilder:
         }
     }
     
+    # Multi-word phrases kept together as one token
+    PROTECTED_PHRASES = [
+        'artifact creature', 'legendary creature', 'tribal instant',
+        'enchantment creature', 'card draw', 'mana acceleration',
+        '+1/+1 counter', '+1/+1 counters', 'dual land', 'basic land', 'utility land'
+    ]
+    
+    # Phrases that put a query in deck building context (plain substring matches)
+    COLOR_CONTEXT_KEYWORDS = [
+        'for my', 'for', 'deck', 'commander', 'legal in', 'in my', 
+        'edh', 'commander deck', 'my deck'
+    ]
+    COMMANDER_KEYWORDS = ['for my', 'for', 'commander', 'deck']
+    
     def __init__(self):
         self.state = QueryState()
     
+    @classmethod
+    def _compile_vocabulary(cls):
+        """
+        Compile the vocabulary once, when the class is loaded
+        
+        Single-token vocabulary (guilds, shards, wedges, colors, card types)
+        becomes one dict consulted once per token. The phrase vocabulary
+        (context keywords, compound types, special lands, modifier triggers)
+        becomes a Lexer that answers every substring or pattern check in one
+        scan of the joined tokens.
+        """
+        vocabulary = {}
+        for name, colors in cls.GUILD_COLORS.items():
+            vocabulary[name] = ('guild', 'guild', colors)
+        for label, table in (('shard', cls.SHARD_COLORS), ('wedge', cls.WEDGE_COLORS)):
+            for name, colors in table.items():
+                vocabulary[name] = ('shard_wedge', label, colors)
+        for name, color in cls.COLORS.items():
+            vocabulary[name] = ('color', 'color', color)
+        for card_type in cls.BASIC_TYPES:
+            vocabulary[card_type] = ('type', 'type', card_type)
+        cls._TOKEN_VOCABULARY = vocabulary
+        
+        keywords = dict.fromkeys(cls.COLOR_CONTEXT_KEYWORDS + cls.COMMANDER_KEYWORDS)
+        patterns = [(('keyword', keyword), re.escape(keyword)) for keyword in keywords]
+        patterns += [(('compound', name), re.escape(name)) for name in cls.COMPOUND_TYPES]
+        patterns += [(('land', name), re.escape(name)) for name in cls.SPECIAL_LANDS]
+        patterns += [(('modifier', name), '|'.join(config['patterns']))
+                     for name, config in cls.EFFECT_MODIFIERS.items()]
+        cls._LEXER = Lexer(patterns)
+    
+    @PARSE_SECONDS.timed("query_builder")
+    @traced("extract_filters", parser="query_builder")
     def parse(self, prompt: str) -> Dict[str, Any]:
         """Main entry point - parse a natural language query into filters"""
         self.state = QueryState()
         self.state.tokens = self._tokenize(prompt.lower())
         self.state.debug_info['original_prompt'] = prompt
         self.state.debug_info['tokens'] = self.state.tokens.copy()
+        self._classify_tokens()
+        with span("lex"):
+            self.state.matches = self._LEXER.scan(' '.join(self.state.tokens))
         
-        print(f"🔧 QueryBuilder parsing: '{prompt}'")
-        print(f"🔧 Tokens: {self.state.tokens}")
+        logger.debug("🔧 QueryBuilder parsing: '%s'", prompt)
+        logger.debug("🔧 Tokens: %s", self.state.tokens)
         
         # Step 1: Extract base filters
         self._extract_mana_cost()
@@ -168,22 +227,16 @@ class QueryBuilder:
         # Step 3: Handle special cases
         self._handle_special_lands()
         
-        print(f"🔧 Final filters: {self.state.filters}")
+        logger.debug("🔧 Final filters: %s", self.state.filters)
         return self.state.filters
     
     def _tokenize(self, prompt: str) -> List[str]:
         """Tokenize the prompt, preserving important phrases"""
         # First, protect important multi-word phrases
-        protected_phrases = [
-            'artifact creature', 'legendary creature', 'tribal instant',
-            'enchantment creature', 'card draw', 'mana acceleration',
-            '+1/+1 counter', '+1/+1 counters', 'dual land', 'basic land', 'utility land'
-        ]
-        
         # Replace spaces in protected phrases with underscores temporarily
         working_prompt = prompt
         phrase_map = {}
-        for phrase in protected_phrases:
+        for phrase in self.PROTECTED_PHRASES:
             if phrase in working_prompt:
                 placeholder = phrase.replace(' ', '_').replace('/', '_')
                 phrase_map[placeholder] = phrase
@@ -199,8 +252,22 @@ class QueryBuilder:
         
         return tokens
     
+    def _classify_tokens(self):
+        """One pass over the tokens, keeping the first token of each vocabulary kind"""
+        vocabulary = self.state.vocabulary
+        for token in self.state.tokens:
+            entry = self._TOKEN_VOCABULARY.get(token)
+            if entry is None and token.endswith('s'):
+                # Handle plurals ("creatures") by removing trailing 's'
+                entry = self._TOKEN_VOCABULARY.get(token.rstrip('s'))
+                if entry is not None and entry[0] != 'type':
+                    entry = None
+            if entry is not None and entry[0] not in vocabulary:
+                vocabulary[entry[0]] = (token, entry[1], entry[2])
+    
     def _extract_mana_cost(self):
         """Extract mana cost information with comparison operators"""
+        mentions_cmc = 'cmc' in self.state.tokens  # checked once, not per descriptive token
         for i, token in enumerate(self.state.tokens):
             if i in self.state.consumed_tokens:
                 continue
@@ -213,7 +280,7 @@ class QueryBuilder:
                     self.state.filters['cmc_gte'] = value
                     self.state.consumed_tokens.add(i)
                     self.state.consumed_tokens.add(i + 1)
-                    print(f"🔧 Found CMC >=: {value}")
+                    logger.debug("🔧 Found CMC >=: %s", value)
                     break
                     
             # Look for patterns like "1 mana", "2 cost", "3 cmc"
@@ -228,7 +295,7 @@ class QueryBuilder:
                     value = int(token)
                     self.state.filters['cmc_lte'] = value
                     self.state.consumed_tokens.update([i, i + 1, i + 2, i + 3])
-                    print(f"🔧 Found CMC <=: {value}")
+                    logger.debug("🔧 Found CMC <=: %s", value)
                     break
                     
                 # Check for "X or more mana" pattern
@@ -239,7 +306,7 @@ class QueryBuilder:
                     value = int(token)
                     self.state.filters['cmc_gte'] = value
                     self.state.consumed_tokens.update([i, i + 1, i + 2, i + 3])
-                    print(f"🔧 Found CMC >=: {value}")
+                    logger.debug("🔧 Found CMC >=: %s", value)
                     break
                     
                 # Simple "X mana" pattern
@@ -247,7 +314,7 @@ class QueryBuilder:
                     self.state.filters['cmc'] = int(token)
                     self.state.consumed_tokens.add(i)
                     self.state.consumed_tokens.add(i + 1)
-                    print(f"🔧 Found CMC: {token}")
+                    logger.debug("🔧 Found CMC: %s", token)
                     break
             
             # Handle special cases like "zero mana", "x cost"
@@ -257,7 +324,7 @@ class QueryBuilder:
                     self.state.filters['cmc'] = 0
                     self.state.consumed_tokens.add(i)
                     self.state.consumed_tokens.add(i + 1)
-                    print(f"🔧 Found CMC: 0")
+                    logger.debug("🔧 Found CMC: 0")
                     break
             
             elif token == 'x':
@@ -267,75 +334,62 @@ class QueryBuilder:
                     self.state.filters['scryfall_query'] = 'mana>=X'
                     self.state.consumed_tokens.add(i)
                     self.state.consumed_tokens.add(i + 1)
-                    print(f"🔧 Found X cost")
+                    logger.debug("🔧 Found X cost")
                     break
             
             # Handle descriptive CMC terms
             elif token in ['high', 'expensive']:
                 next_token = self.state.tokens[i + 1] if i + 1 < len(self.state.tokens) else None
-                if next_token in ['cmc', 'cost', 'mana'] or 'cmc' in self.state.tokens:
+                if next_token in ['cmc', 'cost', 'mana'] or mentions_cmc:
                     self.state.filters['cmc_gte'] = 6  # High CMC typically means 6+
                     self.state.consumed_tokens.add(i)
                     if next_token in ['cmc', 'cost', 'mana']:
                         self.state.consumed_tokens.add(i + 1)
-                    print(f"🔧 Found high CMC: >=6")
+                    logger.debug("🔧 Found high CMC: >=6")
                     break
                     
             elif token in ['low', 'cheap']:
                 next_token = self.state.tokens[i + 1] if i + 1 < len(self.state.tokens) else None
-                if next_token in ['cmc', 'cost', 'mana'] or 'cmc' in self.state.tokens:
+                if next_token in ['cmc', 'cost', 'mana'] or mentions_cmc:
                     self.state.filters['cmc_lte'] = 2  # Low CMC typically means 2 or less
                     self.state.consumed_tokens.add(i)
                     if next_token in ['cmc', 'cost', 'mana']:
                         self.state.consumed_tokens.add(i + 1)
-                    print(f"🔧 Found low CMC: <=2")
+                    logger.debug("🔧 Found low CMC: <=2")
                     break
     
+    @traced("extract_color_identity")
     def _extract_colors(self):
         """Extract color information - distinguish between colors and color identity"""
         color_identity = None
         is_commander_context = False
         
         # First, check for actual commander context keywords
-        prompt_lower = ' '.join(self.state.tokens)
-        commander_keywords = [
-            'for my', 'for', 'deck', 'commander', 'legal in', 'in my', 
-            'edh', 'commander deck', 'my deck'
-        ]
-        
-        for keyword in commander_keywords:
-            if keyword in prompt_lower:
+        for keyword in self.COLOR_CONTEXT_KEYWORDS:
+            if ('keyword', keyword) in self.state.matches:
                 is_commander_context = True
-                print(f"🔧 Found commander context keyword: '{keyword}'")
+                logger.debug("🔧 Found commander context keyword: '%s'", keyword)
                 break
         
+        vocabulary = self.state.vocabulary
+        
         # Check for guild names (always exact match unless commander context detected above)
-        for token in self.state.tokens:
-            if token in self.GUILD_COLORS:
-                color_identity = self.GUILD_COLORS[token]
-                print(f"🔧 Found guild: {token} -> {color_identity} ({'commander context' if is_commander_context else 'exact match'})")
-                break
+        if 'guild' in vocabulary:
+            token, _, color_identity = vocabulary['guild']
+            logger.debug("🔧 Found guild: %s -> %s (%s)",
+                         token, color_identity, 'commander context' if is_commander_context else 'exact match')
         
         # Check for shard/wedge names (always exact match unless commander context detected above)
-        if not color_identity:
-            for token in self.state.tokens:
-                if token in self.SHARD_COLORS:
-                    color_identity = self.SHARD_COLORS[token]
-                    print(f"🔧 Found shard: {token} -> {color_identity} ({'commander context' if is_commander_context else 'exact match'})")
-                    break
-                elif token in self.WEDGE_COLORS:
-                    color_identity = self.WEDGE_COLORS[token]
-                    print(f"🔧 Found wedge: {token} -> {color_identity} ({'commander context' if is_commander_context else 'exact match'})")
-                    break
+        if not color_identity and 'shard_wedge' in vocabulary:
+            token, label, color_identity = vocabulary['shard_wedge']
+            logger.debug("🔧 Found %s: %s -> %s (%s)",
+                         label, token, color_identity, 'commander context' if is_commander_context else 'exact match')
         
         # Check for individual colors (always exact match, never commander context)
-        if not color_identity:
-            for token in self.state.tokens:
-                if token in self.COLORS:
-                    color_identity = self.COLORS[token]
-                    is_commander_context = False  # Individual colors are never commander context
-                    print(f"🔧 Found color: {token} -> {color_identity} (exact match)")
-                    break
+        if not color_identity and 'color' in vocabulary:
+            token, _, color_identity = vocabulary['color']
+            is_commander_context = False  # Individual colors are never commander context
+            logger.debug("🔧 Found color: %s -> %s (exact match)", token, color_identity)
         
         # Store the appropriate field
         if color_identity:
@@ -351,37 +405,28 @@ class QueryBuilder:
     def _extract_types(self):
         """Extract card type information"""
         # Check for compound types first
-        prompt = ' '.join(self.state.tokens)
         for compound_type, scryfall_query in self.COMPOUND_TYPES.items():
-            if compound_type in prompt:
+            if ('compound', compound_type) in self.state.matches:
                 self.state.filters['scryfall_query'] = scryfall_query
-                print(f"🔧 Found compound type: {compound_type}")
+                logger.debug("🔧 Found compound type: %s", compound_type)
                 return
         
-        # Check for basic types (handle plurals)
-        for token in self.state.tokens:
-            # Handle plurals by removing 's' if present
-            singular_token = token.rstrip('s') if token.endswith('s') and len(token) > 1 else token
-            
-            if token in self.BASIC_TYPES:
-                self.state.filters['type'] = token
-                print(f"🔧 Found type: {token}")
-                break
-            elif singular_token in self.BASIC_TYPES:
-                self.state.filters['type'] = singular_token
-                print(f"🔧 Found type: {singular_token} (from plural {token})")
-                break
+        # Check for basic types (plurals were resolved while classifying tokens)
+        if 'type' in self.state.vocabulary:
+            token, _, card_type = self.state.vocabulary['type']
+            self.state.filters['type'] = card_type
+            if token == card_type:
+                logger.debug("🔧 Found type: %s", token)
+            else:
+                logger.debug("🔧 Found type: %s (from plural %s)", card_type, token)
     
     def _extract_commanders(self):
         """Handle commander context keywords (but do NOT infer commander colors from text)"""
-        prompt = ' '.join(self.state.tokens)
-        
         # Check for commander context keywords - this just marks the context, doesn't set colors
-        commander_keywords = ['for my', 'for', 'commander', 'deck']
-        has_commander_context = any(keyword in prompt for keyword in commander_keywords)
+        keyword = next((k for k in self.COMMANDER_KEYWORDS if ('keyword', k) in self.state.matches), None)
         
-        if has_commander_context:
-            print(f"🔧 Found commander context keyword: '{next(k for k in commander_keywords if k in prompt)}'")
+        if keyword:
+            logger.debug("🔧 Found commander context keyword: '%s'", keyword)
             self.state.filters['is_commander_context'] = True
         
         # NOTE: We do NOT automatically infer commander colors from names like "Chulane"
@@ -390,20 +435,17 @@ class QueryBuilder:
     
     def _apply_modifiers(self):
         """Apply effect modifiers that transform the query"""
-        prompt = ' '.join(self.state.tokens)
-        
         for effect_name, effect_config in self.EFFECT_MODIFIERS.items():
-            for pattern in effect_config['patterns']:
-                if re.search(pattern, prompt):
-                    print(f"🔧 Found modifier: {effect_name}")
-                    
-                    # Apply transforms
-                    for key, value in effect_config['transforms'].items():
-                        self.state.filters[key] = value
-                    
-                    # Handle the effect based on existing filters
-                    self._transform_for_effect(effect_name, effect_config)
-                    return  # Only apply one modifier for now
+            if ('modifier', effect_name) in self.state.matches:
+                logger.debug("🔧 Found modifier: %s", effect_name)
+                
+                # Apply transforms
+                for key, value in effect_config['transforms'].items():
+                    self.state.filters[key] = value
+                
+                # Handle the effect based on existing filters
+                self._transform_for_effect(effect_name, effect_config)
+                return  # Only apply one modifier for now
     
     def _transform_for_effect(self, effect_name: str, effect_config: Dict):
         """Transform existing filters based on the effect modifier"""
@@ -427,23 +469,23 @@ class QueryBuilder:
                     # "instant removal" -> removal spells that are instants
                     self.state.filters['scryfall_query'] = oracle_text
                     # Keep the type filter - we want instant removal spells
-                    print(f"🔧 Transformed to {effect_name} spells of type {type_value}")
+                    logger.debug("🔧 Transformed to %s spells of type %s", effect_name, type_value)
                 elif type_value in pure_target_types:
                     # "creature removal" -> spells that remove creatures
                     self.state.filters['scryfall_query'] = f"{oracle_text} and (o:{type_value} or o:permanent)"
                     del self.state.filters['type']  # We're not looking for creatures, but spells that affect creatures
-                    print(f"🔧 Transformed to {effect_name} targeting {type_value} (including permanents)")
+                    logger.debug("🔧 Transformed to %s targeting %s (including permanents)", effect_name, type_value)
                 elif type_value in ambiguous_types:
                     # For ambiguous types like "artifact", default to target for removal
                     # "artifact removal" -> spells that remove artifacts
                     self.state.filters['scryfall_query'] = f"{oracle_text} and (o:{type_value} or o:permanent)"
                     del self.state.filters['type']
-                    print(f"🔧 Transformed to {effect_name} targeting {type_value} (including permanents)")
+                    logger.debug("🔧 Transformed to %s targeting %s (including permanents)", effect_name, type_value)
                 else:
                     # Other types (like land, instant, sorcery when used as targets) - no permanent clause
                     self.state.filters['scryfall_query'] = f"{oracle_text} and o:{type_value}"
                     del self.state.filters['type']
-                    print(f"🔧 Transformed to {effect_name} targeting {type_value}")
+                    logger.debug("🔧 Transformed to %s targeting %s", effect_name, type_value)
             
             elif effect_name == 'counterspell':
                 # Counterspells are always instants, regardless of what they counter
@@ -455,30 +497,31 @@ class QueryBuilder:
                     # "creature counterspell" -> counterspells that can counter creatures
                     self.state.filters['scryfall_query'] = oracle_text
                     self.state.filters['type'] = 'instant'  # Override type
-                print(f"🔧 Transformed to {effect_name}")
+                logger.debug("🔧 Transformed to %s", effect_name)
             
             elif effect_name == 'pump':
                 # "creature with +1/+1 counters" -> creatures that have/get +1/+1 counters
                 self.state.filters['scryfall_query'] = f"type:{type_value} {oracle_text}"
                 del self.state.filters['type']  # Replace with scryfall_query
-                print(f"🔧 Transformed to {type_value} with {effect_name}")
+                logger.debug("🔧 Transformed to %s with %s", type_value, effect_name)
         
         else:
             # No specific type, just add the effect
             self.state.filters['scryfall_query'] = oracle_text
-            print(f"🔧 Added effect: {effect_name}")
+            logger.debug("🔧 Added effect: %s", effect_name)
     
     def _handle_special_lands(self):
         """Handle special land types"""
-        prompt = ' '.join(self.state.tokens)
-        
         for land_type, scryfall_query in self.SPECIAL_LANDS.items():
-            if land_type in prompt:
+            if ('land', land_type) in self.state.matches:
                 self.state.filters['scryfall_query'] = scryfall_query
-                print(f"🔧 Found special land: {land_type}")
+                logger.debug("🔧 Found special land: %s", land_type)
                 break
 
 
+QueryBuilder._compile_vocabulary()
+
+
 # Compatibility function to match nlp.py interface
 def extract_filters(prompt: str) -> Dict[str, Any]:
     """Extract filters from natural language prompt using QueryBuilder"""
@@ -0,0 +1,150 @@
+"""
+Sampled, anonymized query log of /search requests, for offline replay
+
+Off unless QUERY_LOG_PATH is set. A sampled request is written as one
+compact JSON line, appended by a background thread (the request thread only
+enqueues a dict):
+
+    {"t":1760000000.123,"p":"1 mana counterspell","cc":"WU","pg":2,"pp":50,
+     "s":200,"ms":212.4,"st":{"parse":0.41,"limiter":100.2,"scryfall":110.9}}
+
+t is the wall-clock time, p the anonymized prompt, cc/pg/pp the
+commander_colors, page and per_page parameters (omitted at their defaults),
+s the status, ms the time spent in the endpoint and st the stage breakdown.
+Nothing that identifies the client (address, headers, session tokens) is recorded,
+and prompts have e-mail addresses, URLs and long digit runs masked.
+
+tests/load/replay_query_log.py feeds a log back into the app.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+from app.config import QUERY_LOG_PATH, QUERY_LOG_SAMPLE_RATE
+from app.timing import RequestTiming
+
+logger = logging.getLogger(__name__)
+
+_EMAIL = re.compile(r"\S+@\S+")
+_URL = re.compile(r"\b(?:https?://|www\.)\S+", re.IGNORECASE)
+_LONG_NUMBER = re.compile(r"\d{5,}")  # card prompts use small numbers ("3 mana", "2/2")
+_SPACES = re.compile(r"\s+")
+
+_STOP = object()
+
+
+def anonymize_prompt(prompt: str) -> str:
+    """Mask the parts of a prompt that could identify someone"""
+    prompt = _URL.sub("<url>", prompt)
+    prompt = _EMAIL.sub("<email>", prompt)
+    prompt = _LONG_NUMBER.sub("<number>", prompt)
+    return _SPACES.sub(" ", prompt).strip()
+
+
+class JsonLinesWriter:
+    """Appends dicts to a JSON-lines file from a background thread"""
+
+    def __init__(self, path: str, name: str = "jsonl-writer"):
+        self.path = path
+        self.name = name
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def write(self, entry: dict):
+        """Queue one entry (the caller never touches the file)"""
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name=self.name, daemon=True)
+                    self._writer.start()
+        self._queue.put(entry)
+
+    def _write_loop(self):
+        try:
+            output = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.warning("⚠️  %s disabled, cannot open %s: %s", self.name, self.path, e)
+            while self._queue.get() is not _STOP:
+                self.dropped += 1
+            return
+
+        with output:
+            while True:
+                entry = self._queue.get()
+                if entry is _STOP:
+                    break
+                output.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+                self.written += 1
+                if self._queue.empty():
+                    output.flush()
+
+    def close(self):
+        """Write out queued entries and stop the writer thread"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join(timeout=5)
+
+
+class QueryLog:
+    """Append-only JSON-lines log of a random sample of /search requests"""
+
+    def __init__(self, path: str = "", sample_rate: float = 0.1, seed: Optional[int] = None):
+        self.path = path
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self._random = random.Random(seed)
+        self._output = JsonLinesWriter(path, "query-log")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.sample_rate > 0
+
+    @property
+    def written(self) -> int:
+        return self._output.written
+
+    @property
+    def dropped(self) -> int:
+        return self._output.dropped
+
+    def record(self, prompt: str, commander_colors: Optional[str], page: int, per_page: int,
+               status: int, timing: RequestTiming) -> bool:
+        """Queue one request for the log if it is sampled; returns whether it was"""
+        if not self.enabled or self._random.random() >= self.sample_rate:
+            return False
+
+        entry = {"t": round(time.time(), 3), "p": anonymize_prompt(prompt)}
+        if commander_colors:
+            entry["cc"] = commander_colors
+        if page != 1:
+            entry["pg"] = page
+        if per_page != 20:
+            entry["pp"] = per_page
+        entry["s"] = status
+        entry["ms"] = round(timing.elapsed() * 1000, 2)
+        entry["st"] = timing.totals_ms()
+
+        self._output.write(entry)
+        return True
+
+    def close(self):
+        """Write out queued entries and stop the writer thread"""
+        self._output.close()
+
+
+# Global instance
+query_log = QueryLog(QUERY_LOG_PATH, QUERY_LOG_SAMPLE_RATE)
+
+# Flush sampled queries when the process exits
+atexit.register(query_log.close)
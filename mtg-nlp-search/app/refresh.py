@@ -0,0 +1,166 @@
+"""
+Scheduled background refresh of reference data (card names, commanders)
+
+Each dataset first compares a cheap freshness signal from Scryfall with the
+one recorded at its last load, and only reloads when the signal changed or
+the data is incomplete. Runs are jittered so several workers started
+together don't all hit Scryfall at the same moment.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from app.card_names import card_names_cache
+from app.commanders import commander_db
+from app.config import REFRESH_INTERVAL, REFRESH_JITTER
+from app.suggest import suggest_index
+from app.tracing import in_context, root_span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RefreshTarget:
+    """A dataset the scheduler keeps fresh"""
+    name: str
+    fetch_signal: Callable[[], str]                 # cheap remote check; raises on failure
+    current_signal: Callable[[], Optional[str]]     # signal recorded with the loaded data
+    is_complete: Callable[[], bool]
+    reload: Callable[[str], str]                    # expensive reload, given the new signal: "reloaded", "unchanged" or "failed"
+    stats: Dict[str, object] = field(default_factory=lambda: {
+        "checks": 0,
+        "reloads": 0,
+        "unchanged": 0,
+        "reloads_unchanged": 0,  # reloaded on a new signal, but the data was the same
+        "failures": 0,
+        "last_checked_at": None,
+        "last_reloaded_at": None,
+        "last_error": None,
+    })
+
+
+class RefreshScheduler:
+    """Periodically re-validates reference data in the background"""
+
+    def __init__(self, targets: List[RefreshTarget], interval: float, jitter: float = 0.2,
+                 on_reload: Optional[Callable[[], None]] = None):
+        self.targets = targets
+        self.interval = interval  # seconds between runs; 0 disables the scheduler
+        self.jitter = jitter      # each wait is interval * (1 ± jitter)
+        self.on_reload = on_reload
+        self.runs = 0
+        self.next_run_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def next_delay(self) -> float:
+        """Seconds until the next run, randomly spread around the interval"""
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def refresh_once(self) -> Dict[str, str]:
+        """
+        Check every dataset and reload the ones that changed (synchronous)
+
+        Returns the outcome per dataset: "reloaded", "unchanged" or "failed".
+        A reload that finds the data unchanged after all counts as "unchanged"
+        and doesn't trigger on_reload.
+        """
+        self.runs += 1
+        outcomes = {}
+        reloaded = False
+
+        for target in self.targets:
+            stats = target.stats
+            stats["checks"] += 1
+            stats["last_checked_at"] = time.time()
+            try:
+                signal = target.fetch_signal()
+                if target.is_complete() and signal == target.current_signal():
+                    stats["unchanged"] += 1
+                    outcomes[target.name] = "unchanged"
+                    continue
+
+                logger.info("🔄 %s changed upstream (%s -> %s), reloading", target.name, target.current_signal(), signal)
+                outcome = target.reload(signal)
+                if outcome == "failed":
+                    raise RuntimeError("reload failed")
+                if outcome == "unchanged":
+                    stats["reloads_unchanged"] += 1
+                    outcomes[target.name] = "unchanged"
+                    continue
+                stats["reloads"] += 1
+                stats["last_reloaded_at"] = time.time()
+                outcomes[target.name] = "reloaded"
+                reloaded = True
+
+            except Exception as e:
+                logger.warning("❌ Refresh of %s failed: %s", target.name, e)
+                stats["failures"] += 1
+                stats["last_error"] = str(e)
+                outcomes[target.name] = "failed"
+
+        if reloaded and self.on_reload:
+            self.on_reload()
+        return outcomes
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            delay = self.next_delay()
+            self.next_run_at = time.time() + delay
+            await asyncio.sleep(delay)
+            with root_span("refresh", sampled=True):
+                await loop.run_in_executor(None, in_context(self.refresh_once))
+
+    def start(self):
+        """Start the background loop (no-op when disabled or already running)"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.next_run_at = None
+
+    def metrics(self) -> dict:
+        """Refresh counters for /health-check"""
+        return {
+            "enabled": self.interval > 0,
+            "interval_seconds": self.interval,
+            "jitter": self.jitter,
+            "runs": self.runs,
+            "next_run_at": self.next_run_at,
+            "datasets": {
+                target.name: dict(target.stats, signal=target.current_signal())
+                for target in self.targets
+            }
+        }
+
+
+# Global instance
+refresh_scheduler = RefreshScheduler(
+    targets=[
+        RefreshTarget(
+            name="card_names",
+            fetch_signal=card_names_cache.fetch_source_signal,
+            current_signal=lambda: card_names_cache.catalog.source_signal,
+            is_complete=lambda: card_names_cache.catalog.loaded,
+            reload=card_names_cache.reload,
+        ),
+        RefreshTarget(
+            name="commanders",
+            fetch_signal=commander_db.fetch_source_signal,
+            current_signal=lambda: commander_db.table.source_signal,
+            is_complete=lambda: commander_db.table.complete,
+            reload=commander_db.reload,
+        ),
+    ],
+    interval=REFRESH_INTERVAL,
+    jitter=REFRESH_JITTER,
+    on_reload=suggest_index.rebuild  # rebuild /suggest off the request path
+)
@@ -1,8 +1,40 @@
+import logging
 import requests
 import urllib.parse
 import time
 import re
 
+from app.config import SCRYFALL_API_URL
+from app.metrics import RATE_LIMIT_WAIT_SECONDS, SCRYFALL_REQUESTS, SCRYFALL_SECONDS
+from app.timing import stage
+from app.tracing import current_span, span, traced
+
+logger = logging.getLogger(__name__)
+
+def scryfall_get(caller: str, url: str, **kwargs) -> requests.Response:
+    """
+    requests.get() for a Scryfall URL, counted and timed under `caller`
+    
+    Callers: "search", "commander_loader", "catalog", "deck_analyzer".
+    """
+    start = time.perf_counter()
+    status = "error"
+    with span("scryfall.http", caller=caller, **{"http.path": urllib.parse.urlsplit(url).path}) as http_span:
+        try:
+            response = requests.get(url, **kwargs)
+            status = str(getattr(response, "status_code", "error"))
+            return response
+        finally:
+            http_span.set("http.status_code", status)
+            SCRYFALL_SECONDS.observe(time.perf_counter() - start, caller)
+            SCRYFALL_REQUESTS.inc(caller, status)
+
+def rate_limit(caller: str, seconds: float = 0.1):
+    """Pause between Scryfall calls (Scryfall asks for 50-100ms)"""
+    with stage("limiter"), span("rate_limit", caller=caller):
+        time.sleep(seconds)
+    RATE_LIMIT_WAIT_SECONDS.observe(seconds, caller)
+
 def build_query(filters: dict) -> str:
     """
     Build Scryfall query from extracted filters
@@ -117,7 +149,7 @@ def parse_raw_query(raw_query: str) -> str:
     query = raw_query.lower().strip()
     
     # Handle power/toughness patterns
-    pt_match = re.search(r'(\d+)/(\d+)', query)
+    pt_match = re.search(r'(?<!\d)(\d+)/(\d+)', query)  # whole numbers only: linear on long digit runs
     if pt_match:
         power = pt_match.group(1)
         toughness = pt_match.group(2)
@@ -131,7 +163,7 @@ def parse_raw_query(raw_query: str) -> str:
         return f"power:{power} toughness:{toughness} type:creature"
     
     # Handle "X mana Y" patterns
-    mana_match = re.search(r'(\d+|zero|one|two|three|four|five)\s+mana\s+(\w+)', query)
+    mana_match = re.search(r'((?<!\d)\d+|zero|one|two|three|four|five)\s+mana\s+(\w+)', query)
     if mana_match:
         mana_word = mana_match.group(1)
         card_type = mana_match.group(2)
@@ -239,15 +271,19 @@ def parse_raw_query(raw_query: str) -> str:
     # Fallback: try the original query as-is
     return raw_query
 
+@traced("search_scryfall")
 def search_scryfall(filters: dict, page: int = 1):
     """Search Scryfall API with built query, getting specific page"""
-    query = build_query(filters)
+    with stage("build_query"):
+        query = build_query(filters)
+    current_span().set("scryfall.query", query)
+    current_span().set("scryfall.page", page)
     
-    print(f"Scryfall query: {query}")  # Debug output
+    logger.debug("Scryfall query: %s", query)
     
     # URL encode the query and add page parameter
     encoded_query = urllib.parse.quote(query)
-    url = f"https://api.scryfall.com/cards/search?q={encoded_query}&page={page}"
+    url = f"{SCRYFALL_API_URL}/cards/search?q={encoded_query}&page={page}"
     
     # Set proper headers as required by Scryfall API
     headers = {
@@ -257,9 +293,10 @@ def search_scryfall(filters: dict, page: int = 1):
     
     try:
         # Add a small delay to respect rate limits (Scryfall recommends 50-100ms)
-        time.sleep(0.1)
+        rate_limit("search")
         
-        response = requests.get(url, headers=headers, timeout=10)
+        with stage("scryfall", f"page {page}"):
+            response = scryfall_get("search", url, headers=headers, timeout=10)
         
         # Check if request was successful
         if response.status_code == 200:
@@ -267,20 +304,20 @@ def search_scryfall(filters: dict, page: int = 1):
             cards = data.get("data", [])
             total_cards = data.get("total_cards", len(cards))  # Use Scryfall's total count
             
-            print(f"Found {total_cards} total cards (showing page {page} with {len(cards)} cards)")
+            logger.debug("Found %s total cards (showing page %s with %s cards)", total_cards, page, len(cards))
             return {"cards": cards, "query": query, "total_cards": total_cards}
                     
         elif response.status_code == 404:
             # No cards found
-            print(f"No results for query: {query}")
+            logger.debug("No results for query: %s", query)
             return {"cards": [], "query": query, "total_cards": 0}
         else:
-            print(f"Scryfall API error: {response.status_code} - {response.text}")
+            logger.warning("Scryfall API error: %s - %s", response.status_code, response.text)
             return {"cards": [], "query": query, "total_cards": 0}
             
     except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
+        logger.warning("Request error: %s", e)
         return {"cards": [], "query": query, "total_cards": 0}
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        logger.exception("Unexpected error: %s", e)
         return {"cards": [], "query": query, "total_cards": 0}
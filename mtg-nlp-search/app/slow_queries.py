@@ -0,0 +1,95 @@
+"""
+Slow /search requests, logged with everything needed to explain them
+
+A /search request taking at least SLOW_QUERY_MS (0 disables) is recorded
+with its prompt, the parsed filters, the final Scryfall query, how many
+Scryfall pages it fetched and its stage durations:
+
+    {"time":1760000000.123,"ms":1841.2,"status":200,"prompt":"1 mana counterspell",
+     "page":9,"per_page":20,"filters":{"cmc":1,"type":"instant"},
+     "scryfall_query":"cmc=1 type:instant o:counter","upstream_pages":2,
+     "stages":[{"name":"parse","ms":0.4},{"name":"scryfall","ms":912.3,"desc":"page 1"},...],
+     "trace_id":"4bf92f3577b34da6a3ce929d0e0e4736"}
+
+trace_id is only present when the request was traced (see app/tracing.py).
+Entries go to SLOW_QUERY_LOG_PATH (JSON lines, written by a background
+thread) when it is set, and the last SLOW_QUERY_KEEP are kept in memory for
+/admin/slow-queries, which lists the slowest of them.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.config import SLOW_QUERY_KEEP, SLOW_QUERY_LOG_PATH, SLOW_QUERY_MS
+from app.query_log import JsonLinesWriter, anonymize_prompt
+from app.timing import RequestTiming
+from app.tracing import current_trace_id
+
+
+class SlowQueryLog:
+    """Slow /search requests: the most recent in memory, all of them in a JSON-lines file"""
+
+    def __init__(self, threshold_ms: float = 1000.0, path: str = "", keep: int = 100):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=max(1, keep))
+        self._lock = threading.Lock()
+        self._output = JsonLinesWriter(path, "slow-query-log") if path else None
+        self.recorded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def record(self, prompt: str, commander_colors: Optional[str], page: int, per_page: int, status: int,
+               timing: RequestTiming, result: Optional[dict] = None) -> bool:
+        """Record the request if it was slow; returns whether it was"""
+        ms = timing.elapsed() * 1000
+        if not self.enabled or ms < self.threshold_ms:
+            return False
+
+        result = result or {}
+        entry = {
+            "time": round(time.time(), 3),
+            "ms": round(ms, 2),
+            "status": status,
+            "prompt": anonymize_prompt(prompt),
+            "page": page,
+            "per_page": per_page,
+        }
+        if commander_colors:
+            entry["commander_colors"] = commander_colors
+        entry["filters"] = dict(result.get("filters") or {})
+        entry["scryfall_query"] = result.get("scryfall_query")
+        entry["upstream_pages"] = sum(1 for name, _, _ in timing.stages if name == "scryfall")
+        entry["stages"] = timing.block()["stages"]
+        trace_id = current_trace_id()
+        if trace_id:
+            entry["trace_id"] = trace_id
+
+        with self._lock:
+            self._recent.append(entry)
+            self.recorded += 1
+        if self._output is not None:
+            self._output.write(entry)
+        return True
+
+    def slowest(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The slowest of the recent slow queries, slowest first"""
+        with self._lock:
+            recent = list(self._recent)
+        return sorted(recent, key=lambda entry: entry["ms"], reverse=True)[:limit]
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+
+
+# Global instance
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG_PATH, SLOW_QUERY_KEEP)
+
+# Flush logged queries when the process exits
+atexit.register(slow_query_log.close)
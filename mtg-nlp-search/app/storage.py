@@ -0,0 +1,39 @@
+"""
+Small helpers for the on-disk snapshots of reference data
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_open(path: str):
+    """
+    Open a file for writing so readers only ever see the old or the new contents
+
+    Writes go to a temporary file in the same directory, which is renamed over
+    the target when the block exits cleanly (and removed if it raises).
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Write a whole file atomically (see atomic_open)"""
+    with atomic_open(path) as f:
+        f.write(data)
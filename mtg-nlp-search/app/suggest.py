@@ -0,0 +1,227 @@
+"""
+Unified typeahead index - card names, commanders and the query vocabulary the
+parser understands, merged into one prebuilt prefix index
+"""
+
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from heapq import nsmallest
+from typing import Dict, List, Optional, Tuple
+
+from app.card_names import card_names_cache
+from app.commander_records import CommanderRecord
+from app.commanders import commander_db
+from app.metrics import CACHE_EVENTS
+from app.nlp import LAND_TYPES
+from app.query_builder import QueryBuilder
+
+logger = logging.getLogger(__name__)
+
+# Sorts after any real name character, used to close a prefix range
+_PREFIX_END = "\U0010ffff"
+
+# Result groups, in the order the frontend shows them
+KINDS = ("color", "land", "effect", "commander", "card")
+
+# Stand-in for a card-name catalog that is not loaded yet
+_NO_CARD_NAMES: List[str] = []
+
+# Effect trigger words that are plain phrases rather than regexes
+_PLAIN_PHRASE = re.compile(r"[a-z][a-z ]*")
+
+
+def _vocabulary_entries() -> List[Tuple[str, str, str, dict]]:
+    """Collect (key, kind, text, detail) entries for the parser's vocabulary"""
+    entries = []
+
+    for group, table in (("guild", QueryBuilder.GUILD_COLORS),
+                         ("shard", QueryBuilder.SHARD_COLORS),
+                         ("wedge", QueryBuilder.WEDGE_COLORS)):
+        for name, colors in table.items():
+            entries.append((name, "color", name.title(), {"group": group, "colors": colors}))
+
+    lands = dict(LAND_TYPES)
+    lands.update(QueryBuilder.SPECIAL_LANDS)
+    for name in lands:
+        entries.append((name, "land", name, {}))
+
+    for effect_name, config in QueryBuilder.EFFECT_MODIFIERS.items():
+        phrases = {effect_name.replace("_", " ")}
+        phrases.update(p for p in config["patterns"] if _PLAIN_PHRASE.fullmatch(p))
+        for phrase in sorted(phrases):
+            entries.append((phrase, "effect", phrase, {"effect": effect_name}))
+
+    return entries
+
+
+class SuggestIndex:
+    """
+    Immutable prefix index over every typeahead source
+
+    All entries share one sorted key list, so a lookup is a single bisect
+    followed by a scan of the matching range. Ranking is the same for every
+    kind: exact matches first, then shorter names, then alphabetical. Results
+    for repeated queries (mostly the short, wide prefixes) are memoized.
+    """
+
+    def __init__(self, card_names: List[str], commanders: Dict[str, str], commander_cards: Dict[str, CommanderRecord],
+                 cache_size: int = 1024):
+        entries = _vocabulary_entries()
+
+        for name_key, colors in commanders.items():
+            record = commander_cards.get(name_key)
+            display_name = record.name if record and record.name else name_key.title()
+            entries.append((name_key, "commander", display_name, {"colors": colors}))
+
+        for name in card_names:
+            entries.append((name.lower(), "card", name, {}))
+
+        # Static rank: position in (length, key) order
+        by_rank = sorted(range(len(entries)), key=lambda i: (len(entries[i][0]), entries[i][0]))
+        rank = [0] * len(entries)
+        for position, i in enumerate(by_rank):
+            rank[i] = position
+
+        order = sorted(range(len(entries)), key=lambda i: entries[i][0])
+        self._keys = [entries[i][0] for i in order]
+        self._kinds = [entries[i][1] for i in order]
+        self._ranks = [rank[i] for i in order]
+        self._entries = [entries[i] for i in order]
+
+        self.size = len(entries)
+        self._cache: "OrderedDict[Tuple[str, int], Dict[str, List[dict]]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def suggest(self, query: str, limit: int = 5) -> Dict[str, List[dict]]:
+        """Return up to `limit` suggestions per kind for names starting with `query`"""
+        query_lower = query.lower().strip()
+        if not query_lower:
+            return {kind: [] for kind in KINDS}
+
+        cache_key = (query_lower, limit)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                CACHE_EVENTS.inc("suggest", "hit")
+                return cached
+        CACHE_EVENTS.inc("suggest", "miss")
+
+        lo = bisect_left(self._keys, query_lower)
+        hi = bisect_left(self._keys, query_lower + _PREFIX_END, lo)
+
+        ranked: Dict[str, List[Tuple[int, int]]] = {kind: [] for kind in KINDS}
+        for i in range(lo, hi):
+            # Exact matches sort ahead of every prefix match
+            score = -1 if self._keys[i] == query_lower else self._ranks[i]
+            ranked[self._kinds[i]].append((score, i))
+
+        results = {
+            kind: [self._format(self._entries[i]) for _, i in nsmallest(limit, candidates)]
+            for kind, candidates in ranked.items()
+        }
+
+        with self._lock:
+            self._cache[cache_key] = results
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+                CACHE_EVENTS.inc("suggest", "eviction")
+
+        return results
+
+    def cached_results(self) -> int:
+        """Number of memoized queries"""
+        return len(self._cache)
+
+    def memory_parts(self) -> Dict[str, object]:
+        """The index's structures by name, for memory accounting"""
+        return {"index": (self._keys, self._kinds, self._ranks, self._entries), "results": self._cache}
+
+    @staticmethod
+    def _format(entry: Tuple[str, str, str, dict]) -> dict:
+        _, kind, text, detail = entry
+        suggestion = {"text": text, "kind": kind}
+        suggestion.update(detail)
+        return suggestion
+
+
+class SuggestIndexHolder:
+    """
+    Keeps the last built index and rebuilds it off the request path when a new
+    data version is published
+
+    Only the very first get() builds on the calling thread. After that, a
+    get() that sees newer card-name or commander versions starts one
+    background rebuild and keeps serving the previous index until it is
+    swapped in. Startup and the refresh scheduler call rebuild() directly
+    after they publish.
+    """
+
+    def __init__(self):
+        self._index: Optional[SuggestIndex] = None
+        self._versions: Tuple[int, int] = (-1, -1)
+        self._build_lock = threading.Lock()  # serializes builds
+        self._lock = threading.Lock()  # guards _rebuilder; never held while building
+        self._rebuilder: Optional[threading.Thread] = None  # background rebuild in progress
+
+    def current(self) -> Optional[SuggestIndex]:
+        """The index built so far, without building one"""
+        return self._index
+
+    @staticmethod
+    def _current_versions() -> Tuple[int, int]:
+        return (card_names_cache.catalog.version, commander_db.table.version)
+
+    def get(self) -> SuggestIndex:
+        """Return the last built index, scheduling a rebuild if the data moved on"""
+        index = self._index
+        if index is None:
+            return self.rebuild()
+        if self._current_versions() != self._versions:
+            self.schedule_rebuild()
+        return index
+
+    def rebuild(self) -> SuggestIndex:
+        """Build an index from the current card-name and commander versions and swap it in"""
+        with self._build_lock:
+            catalog = card_names_cache.catalog
+            table = commander_db.table
+            versions = (catalog.version, table.version)
+            if self._index is None or versions != self._versions:
+                self._index = SuggestIndex(catalog.card_names if catalog.loaded else _NO_CARD_NAMES,
+                                           table.commanders, table.commander_cards)
+                self._versions = versions
+            return self._index
+
+    def schedule_rebuild(self):
+        """Rebuild in a background thread (no-op while one is already running)"""
+        with self._lock:
+            if self._rebuilder is not None:
+                return
+            self._rebuilder = threading.Thread(target=self._rebuild_until_current, name="suggest-rebuild", daemon=True)
+            self._rebuilder.start()
+
+    def _rebuild_until_current(self):
+        try:
+            # Publishes can land while building (e.g. a paged commander load)
+            while self._current_versions() != self._versions:
+                self.rebuild()
+        except Exception as e:
+            logger.error("❌ Rebuilding the suggest index failed: %s", e)
+        finally:
+            with self._lock:
+                self._rebuilder = None
+
+    def wait(self, timeout: Optional[float] = None):
+        """Wait for a background rebuild to finish, if one is running"""
+        rebuilder = self._rebuilder
+        if rebuilder is not None:
+            rebuilder.join(timeout)
+
+
+# Global instance
+suggest_index = SuggestIndexHolder()
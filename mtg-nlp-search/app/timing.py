@@ -0,0 +1,121 @@
+"""
+Per-request stage timings
+
+An endpoint calls start_request() and wraps its stages in `with stage(...)`;
+code further down the call chain (the Scryfall client) records into the same
+request through a context variable, without the timing object being passed
+around. Outside a request, stage() only yields.
+
+timed_json_response() serializes an endpoint's result as its last stage and
+reports every stage in a Server-Timing header:
+
+    Server-Timing: parse;dur=0.41, build_query;dur=0.02, limiter;dur=100.1,
+        scryfall;dur=84.3;desc="page 1", slice;dur=0.01, serialize;dur=0.6, total;dur=185.5
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+_current: ContextVar[Optional["RequestTiming"]] = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Stage durations of one request, in the order the stages ran"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float, Optional[str]]] = []  # (name, seconds, description); names may repeat
+
+    def record(self, name: str, seconds: float, description: Optional[str] = None):
+        self.stages.append((name, seconds, description))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def totals_ms(self) -> Dict[str, float]:
+        """Milliseconds per stage name, repeated stages summed"""
+        totals: Dict[str, float] = {}
+        for name, seconds, _ in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds * 1000
+        return {name: round(ms, 2) for name, ms in totals.items()}
+
+    def block(self) -> Dict[str, Any]:
+        """The stages so far as a JSON-friendly block for a response body"""
+        stages = []
+        for name, seconds, description in self.stages:
+            entry = {"name": name, "ms": round(seconds * 1000, 2)}
+            if description:
+                entry["desc"] = description
+            stages.append(entry)
+        return {"total_ms": round(self.elapsed() * 1000, 2), "stages": stages}
+
+    def server_timing(self, max_repeats: int = 3) -> str:
+        """
+        Server-Timing header value: one entry per stage, then the total
+
+        A stage that ran more than `max_repeats` times (one Scryfall lookup
+        per card in a deck) is reported once, summed, to keep the header short.
+        """
+        counts: Dict[str, int] = {}
+        for name, _, _ in self.stages:
+            counts[name] = counts.get(name, 0) + 1
+
+        entries = []
+        summed = set()
+        totals = self.totals_ms()
+        for name, seconds, description in self.stages:
+            if counts[name] > max_repeats:
+                if name not in summed:
+                    summed.add(name)
+                    entries.append(f'{name};dur={totals[name]};desc="{counts[name]} calls"')
+                continue
+            entry = f"{name};dur={round(seconds * 1000, 2)}"
+            if description:
+                entry += f';desc="{_quote(description)}"'
+            entries.append(entry)
+        entries.append(f"total;dur={round(self.elapsed() * 1000, 2)}")
+        return ", ".join(entries)
+
+
+def start_request() -> RequestTiming:
+    """Begin timing the current request (sync endpoints each run in their own context)"""
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str, description: Optional[str] = None):
+    """Time the enclosed block as `name` on the current request, if any"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.record(name, time.perf_counter() - start, description)
+
+
+def timed_json_response(content: Any, timing: RequestTiming) -> JSONResponse:
+    """Serialize `content` as the "serialize" stage and attach the Server-Timing header"""
+    start = time.perf_counter()
+    response = JSONResponse(content)
+    timing.record("serialize", time.perf_counter() - start)
+    response.headers["Server-Timing"] = timing.server_timing()
+    return response
+
+
+def _quote(description: str) -> str:
+    """Make a description safe inside a quoted header value"""
+    text = description.encode("ascii", "replace").decode("ascii")
+    return "".join(c for c in text if c.isprintable()).replace("\\", "\\\\").replace('"', '\\"')[:60]
@@ -0,0 +1,321 @@
+"""
+In-process span tracing with a local exporter
+
+Off unless TRACE_EXPORT is set, to a JSON-lines file path or to the URL of
+an OTLP/HTTP collector (JSON encoding, e.g. tests/load/otlp_collector.py).
+
+A trace starts at a root span: one per HTTP request (TracingMiddleware) and
+one per startup load or background refresh. Sampling is decided there, once
+per trace (TRACE_SAMPLE_RATE; startup loads are always kept), and nested
+span() calls inherit the decision, so an unsampled request costs a context
+variable lookup per instrumented call.
+
+The current span lives in a context variable: the request threadpool copies
+it into the worker thread, and executor hops keep it by running the function
+through in_context():
+
+    with root_span("startup.load_commanders", sampled=True):
+        await loop.run_in_executor(None, in_context(commander_db.load_commanders_at_startup))
+
+Spans are exported in the OTLP JSON span shape (traceId, spanId,
+parentSpanId, name, start/endTimeUnixNano, attributes, status), one per
+line in a file or batched per POST to a collector.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from starlette.routing import Match
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "mtg-nlp-search"
+
+_ids = random.Random()
+
+
+class Span:
+    """One timed operation in a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = f"{_ids.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # internal
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _NoopSpan:
+    """Stands in for a span that is not recorded"""
+
+    def set(self, key: str, value: Any):
+        pass
+
+
+class _NoopScope:
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+_NOOP_SCOPE = _NoopScope()
+_UNSAMPLED = object()  # current-span marker inside a trace that was not sampled
+
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class _SpanScope:
+    """Makes a span current for a block, then ends and exports it"""
+
+    __slots__ = ("span", "marker", "token")
+
+    def __init__(self, span: Optional[Span], marker=None):
+        self.span = span
+        self.marker = marker
+
+    def __enter__(self):
+        self.token = _current.set(self.span if self.span is not None else self.marker)
+        return self.span if self.span is not None else NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self.token)
+        span = self.span
+        if span is not None:
+            span.end_ns = time.time_ns()
+            if exc is not None:
+                span.error = f"{exc_type.__name__}: {exc}"
+            exporter.export(span)
+        return False
+
+
+def span(name: str, **attributes):
+    """A child of the current span; does nothing outside a sampled trace"""
+    parent = _current.get()
+    if parent is None or parent is _UNSAMPLED:
+        return _NOOP_SCOPE
+    return _SpanScope(Span(name, parent.trace_id, parent.span_id, attributes))
+
+
+def root_span(name: str, sampled: Optional[bool] = None, **attributes):
+    """
+    Start a trace, or a child span when one is already current
+
+    `sampled` overrides the TRACE_SAMPLE_RATE head-sampling decision.
+    """
+    if not exporter.enabled:
+        return _NOOP_SCOPE
+    parent = _current.get()
+    if parent is _UNSAMPLED:
+        return _NOOP_SCOPE
+    if parent is not None:
+        return _SpanScope(Span(name, parent.trace_id, parent.span_id, attributes))
+    if sampled is None:
+        sampled = _ids.random() < config.TRACE_SAMPLE_RATE
+    if not sampled:
+        return _SpanScope(None, _UNSAMPLED)
+    return _SpanScope(Span(name, f"{_ids.getrandbits(128):032x}", None, attributes))
+
+
+def traced(name: str, **attributes):
+    """Decorator: run the function inside span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:  # fast path: no trace in progress
+                return func(*args, **kwargs)
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_context(func, *args, **kwargs):
+    """
+    A callable running func in a copy of the current context
+
+    loop.run_in_executor() does not carry context variables into the worker
+    thread; pass it in_context(func) to keep the current span.
+    """
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the sampled trace in progress, if any"""
+    parent = _current.get()
+    return parent.trace_id if isinstance(parent, Span) else None
+
+
+def current_span():
+    """The span being recorded, or a no-op stand-in, to add attributes to"""
+    parent = _current.get()
+    return parent if isinstance(parent, Span) else NOOP_SPAN
+
+
+class SpanExporter:
+    """Writes finished spans from a background thread, to a JSONL file or an OTLP/HTTP collector"""
+
+    def __init__(self, target: str = "", batch_size: int = 256, flush_interval: float = 1.0):
+        self.target = target
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.target)
+
+    @property
+    def is_http(self) -> bool:
+        return self.target.startswith(("http://", "https://"))
+
+    def export(self, span: Span):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+        self._queue.put(span)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Span]):
+        try:
+            if self.is_http:
+                self._post(batch)
+            else:
+                with open(self.target, "a", encoding="utf-8") as f:
+                    for item in batch:
+                        f.write(json.dumps(item.to_otlp(), separators=(",", ":")) + "\n")
+            self.exported += len(batch)
+        except (OSError, requests.RequestException) as e:
+            self.failed += len(batch)
+            logger.warning("⚠️  Dropped %s spans, export to %s failed: %s", len(batch), self.target, e)
+
+    def _post(self, batch: List[Span]):
+        url = self.target if self.target.rstrip("/").endswith("/v1/traces") else self.target.rstrip("/") + "/v1/traces"
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                                        {"key": "process.pid", "value": {"intValue": str(os.getpid())}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [item.to_otlp() for item in batch]}],
+        }]}
+        requests.post(url, json=payload, timeout=5).raise_for_status()
+
+    def flush(self):
+        """Write out every queued span and stop the thread (it restarts on the next span)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=10)
+
+
+# Global instance
+exporter = SpanExporter(config.TRACE_EXPORT)
+
+# Write out queued spans when the process exits
+atexit.register(exporter.flush)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per HTTP request"""
+
+    def __init__(self, app, routes=()):
+        self.app = app
+        self.routes = routes
+
+    def _route(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not exporter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with root_span("http.request") as request_span:
+            if request_span is not NOOP_SPAN:
+                route = self._route(scope)
+                request_span.name = f"{scope['method']} {route}"
+                request_span.set("http.method", scope["method"])
+                request_span.set("http.route", route)
+                request_span.set("http.target", scope["path"])
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start" and request_span is not NOOP_SPAN:
+                    request_span.set("http.status_code", message["status"])
+                    # lets a client find its request in the exported spans
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", request_span.trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
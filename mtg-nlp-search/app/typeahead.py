@@ -0,0 +1,92 @@
+"""
+Typeahead sessions - remember the last candidate set per client so that each
+keystroke only narrows the previous result instead of rescanning the catalog
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import TYPEAHEAD_MAX_CANDIDATES, TYPEAHEAD_MAX_SESSIONS, TYPEAHEAD_SESSION_TTL
+from app.metrics import CACHE_EVENTS
+
+
+class TypeaheadSessions:
+    """
+    Small TTL + LRU store of (query, candidates) keyed by session token
+
+    Entries are tied to the data source they were computed from (the catalog
+    list or commander dict), so a reload silently invalidates every session.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_sessions: int = 512, max_candidates: int = 2000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_candidates = max_candidates
+        self._sessions: "OrderedDict[Hashable, Tuple[float, Any, str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, source: Any) -> Optional[Tuple[str, Any]]:
+        """Return (previous_query, candidates) for a live session, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_EVENTS.inc("typeahead", "miss")
+                return None
+
+            expires, entry_source, query, candidates = entry
+            if expires < now or entry_source is not source:
+                del self._sessions[key]
+                self.misses += 1
+                CACHE_EVENTS.inc("typeahead", "miss")
+                return None
+
+            self._sessions.move_to_end(key)
+            self.hits += 1
+            CACHE_EVENTS.inc("typeahead", "hit")
+            return query, candidates
+
+    def put(self, key: Hashable, source: Any, query: str, candidates: Any, size: int = 0):
+        """
+        Remember the candidates for a session
+
+        `size` is the number of items the candidates represent; oversized sets
+        are not kept (a fresh scan is cheap compared to holding them).
+        """
+        if size > self.max_candidates:
+            self.discard(key)
+            return
+
+        with self._lock:
+            self._sessions[key] = (time.monotonic() + self.ttl, source, query, candidates)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+                CACHE_EVENTS.inc("typeahead", "eviction")
+
+    def discard(self, key: Hashable):
+        """Forget a session"""
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def memory_parts(self) -> Dict[str, object]:
+        """The store's structures by name, for memory accounting"""
+        return {"sessions": self._sessions}
+
+
+# Global instance
+typeahead_sessions = TypeaheadSessions(
+    ttl=TYPEAHEAD_SESSION_TTL,
+    max_sessions=TYPEAHEAD_MAX_SESSIONS,
+    max_candidates=TYPEAHEAD_MAX_CANDIDATES,
+)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Parser benchmark suite for app/nlp.py and app/query_builder.py
+
+Runs every prompt of the sample-query corpora (tests/unit/test_all_sample_queries.py
+and tests/unit/test_sample_queries_nlp.py) through both parsers, with no
+commander database and with the synthetic 3k-commander fixture loaded, and
+reports per scenario:
+
+- relative_cost     time per pass over the corpus divided by the time of a fixed
+                    reference pass run just before it (median over rounds)
+- ops_per_sec       prompts parsed per second (median over rounds)
+- p50_us / p99_us   per-prompt latency percentiles
+- alloc_kib         mean peak memory allocated while parsing one prompt
+
+Only relative_cost and alloc_kib are compared with the baseline. The reference
+pass is plain Python string and dict work that doesn't touch the app, so the
+ratio cancels out how fast the machine (or a noisy neighbour) is at the time;
+the absolute timings are reported for context only. Over the default 50
+rounds, reruns of the suite stay within about 10% of each other.
+
+Usage:
+    python tests/benchmarks/bench_parsers.py                 # report and compare with the baseline
+    python tests/benchmarks/bench_parsers.py --save          # record a new baseline
+    python tests/benchmarks/bench_parsers.py --threshold 0.5 # allow 50% regressions
+    python tests/benchmarks/bench_parsers.py --write-fixture # regenerate the 3k-commander fixture
+
+Exits with status 1 when a compared metric regressed by more than the
+threshold (default 25%) against baselines/parsers.json.
+"""
+
+import sys
+import os
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', '..', 'mtg-nlp-search'))
+sys.path.append(os.path.join(HERE, '..', 'unit'))
+
+from app.commanders import CommanderTable, commander_db
+from app.nlp import extract_filters as nlp_extract_filters
+from app.query_builder import extract_filters as qb_extract_filters
+
+FIXTURE_PATH = os.path.join(HERE, 'fixtures', 'commanders_3k.json')
+BASELINE_PATH = os.path.join(HERE, 'baselines', 'parsers.json')
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_ROUNDS = 50
+
+PARSERS = {
+    'nlp': nlp_extract_filters,
+    'query_builder': qb_extract_filters,
+}
+
+# Metric -> True when higher is better
+METRICS = {
+    'relative_cost': False,
+    'ops_per_sec': True,
+    'p50_us': False,
+    'p99_us': False,
+    'alloc_kib': False,
+}
+
+# Metrics that don't depend on the speed of the machine, compared with the baseline
+COMPARED_METRICS = ('relative_cost', 'alloc_kib')
+
+_REFERENCE_WORDS = re.compile(r"[a-z0-9']+")
+_REFERENCE_VOCABULARY = {word: i for i, word in enumerate(
+    "red blue green white black colorless creature creatures instant sorcery artifact enchantment "
+    "land lands under over less more than cost costs mana with power toughness flying deathtouch "
+    "commander legendary draw cards token tokens sacrifice graveyard".split())}
+
+
+def load_corpus() -> list:
+    """Every distinct prompt from the sample-query corpora, in first-seen order"""
+    import test_all_sample_queries
+    import test_sample_queries_nlp
+
+    prompts = []
+    for module in (test_all_sample_queries, test_sample_queries_nlp):
+        for queries in module.SAMPLE_QUERIES.values():
+            prompts.extend(queries)
+    return list(dict.fromkeys(prompts))
+
+
+def synthetic_commanders(count: int = 3000, seed: int = 3000) -> dict:
+    """Commander-like names ('vorel, keeper of the tides') with random identities"""
+    rng = random.Random(seed)
+    syllables = ['ka', 'ro', 'vel', 'tha', 'mir', 'zan', 'el', 'dra', 'quo', 'syl', 'bri', 'os', 'ne', 'lu', 'gar']
+    titles = ['keeper', 'warden', 'herald', 'scourge', 'voice', 'heir', 'tyrant', 'sage', 'seeker', 'blade']
+    places = ['the tides', 'ash', 'the wilds', 'dusk', 'the vault', 'embers', 'the deep', 'thorns', 'storms', 'bone']
+    commanders = {}
+    while len(commanders) < count:
+        name = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3)))
+        if rng.random() < 0.7:
+            name += f", {rng.choice(titles)} of {rng.choice(places)}"
+        commanders[name] = ''.join(c for c in 'WUBRG' if rng.random() < 0.4)
+    return commanders
+
+
+def write_fixture():
+    os.makedirs(os.path.dirname(FIXTURE_PATH), exist_ok=True)
+    with open(FIXTURE_PATH, 'w') as f:
+        json.dump(synthetic_commanders(), f, indent=0, sort_keys=True)
+    print(f"💾 Wrote {FIXTURE_PATH}")
+
+
+def load_fixture() -> dict:
+    with open(FIXTURE_PATH) as f:
+        return json.load(f)
+
+
+def reference_pass(prompts: list) -> int:
+    """Fixed parser-shaped work (tokenize, look up, join) the app's code doesn't affect"""
+    hits = 0
+    for prompt in prompts:
+        words = _REFERENCE_WORDS.findall(prompt.lower())
+        for i, word in enumerate(words):
+            if word in _REFERENCE_VOCABULARY:
+                hits += 1
+            if i and f"{words[i - 1]} {word}" in _REFERENCE_VOCABULARY:
+                hits += 1
+        hits += len(" ".join(sorted(set(words))))
+    return hits
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(parse, prompts: list, rounds: int) -> dict:
+    """Time `rounds` passes over the prompts, each after a reference pass, then one traced pass for allocations"""
+    for prompt in prompts:  # warm up caches and lazy imports
+        parse(prompt)
+    reference_pass(prompts)
+
+    latencies, round_rates, costs = [], [], []
+    for _ in range(rounds):
+        reference_start = time.perf_counter()
+        reference_pass(prompts)
+        round_start = time.perf_counter()
+        for prompt in prompts:
+            start = time.perf_counter_ns()
+            parse(prompt)
+            latencies.append(time.perf_counter_ns() - start)
+        round_end = time.perf_counter()
+        round_rates.append(len(prompts) / (round_end - round_start))
+        costs.append((round_end - round_start) / (round_start - reference_start))
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for prompt in prompts:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            parse(prompt)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'relative_cost': round(statistics.median(costs), 3),
+        'ops_per_sec': round(statistics.median(round_rates), 1),
+        'p50_us': round(percentile(latencies, 0.50) / 1000, 1),
+        'p99_us': round(percentile(latencies, 0.99) / 1000, 1),
+        'alloc_kib': round(statistics.mean(peaks) / 1024, 2),
+    }
+
+
+def run_suite(rounds: int = DEFAULT_ROUNDS) -> dict:
+    """Metrics for every parser with and without the 3k-commander database"""
+    prompts = load_corpus()
+    databases = {
+        'no_db': {},
+        'db_3k': load_fixture(),
+    }
+    original = commander_db.table
+    results = {}
+    try:
+        for db_name, commanders in databases.items():
+            if commanders:
+                commander_db._install(commanders, {})
+            else:
+                commander_db.table = CommanderTable(0, {}, {}, coverage=0.0)
+            for parser_name, parse in PARSERS.items():
+                results[f'{parser_name}/{db_name}'] = measure(parse, prompts, rounds)
+    finally:
+        commander_db.table = original
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'prompts': len(prompts),
+        'rounds': rounds,
+        'scenarios': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Human-readable descriptions of every compared metric that regressed beyond the threshold"""
+    regressions = []
+    for scenario, metrics in current['scenarios'].items():
+        expected = baseline.get('scenarios', {}).get(scenario)
+        if not expected:
+            continue
+        for metric in COMPARED_METRICS:
+            higher_is_better = METRICS[metric]
+            old, new = expected.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > threshold:
+                regressions.append(f"{scenario} {metric}: {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"📊 Parser benchmarks ({results['prompts']} prompts x {results['rounds']} rounds, "
+          f"Python {results['python']})")
+    print(f"{'scenario':<24}{'rel cost':>10}{'ops/sec':>12}{'p50 us':>10}{'p99 us':>10}{'alloc KiB':>11}")
+    for scenario, m in results['scenarios'].items():
+        line = (f"{scenario:<24}{m['relative_cost']:>10.3f}{m['ops_per_sec']:>12,.0f}"
+                f"{m['p50_us']:>10.1f}{m['p99_us']:>10.1f}{m['alloc_kib']:>11.2f}")
+        old = (baseline or {}).get('scenarios', {}).get(scenario)
+        if old and old.get('relative_cost'):
+            line += f"   ({m['relative_cost'] / old['relative_cost'] - 1:+.0%} cost vs baseline)"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the prompt parsers")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="timed passes over the corpus")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a compared metric is worse than the baseline by more than this fraction")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--write-fixture', action='store_true', help="regenerate the 3k-commander fixture")
+    args = parser.parse_args(argv)
+
+    if args.write_fixture:
+        write_fixture()
+        return 0
+
+    results = run_suite(args.rounds)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"⚠️  No baseline at {args.baseline}; run with --save to record one")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
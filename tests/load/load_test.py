@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for /search, /card-names and /analyze-deck
+
+Starts the Scryfall stand-in and one app worker pointed at it (or uses
+ones that are already running), then replays a weighted request mix at
+each concurrency level of a sweep. Every level reports, per endpoint:
+requests per second, p50/p95/p99 latency and error rate, plus the
+upstream Scryfall calls the level caused (from the stand-in's counters).
+
+Reports are saved as JSON under tests/load/reports/ (named by time and
+git commit) so runs can be compared; --compare prints the change against
+an earlier report.
+
+Usage:
+    python tests/load/load_test.py                          # spawn stand-in + app, default sweep
+    python tests/load/load_test.py --concurrency 1,4,16 --duration 20
+    python tests/load/load_test.py --mix search=80,card-names=15,analyze-deck=5
+    python tests/load/load_test.py --standin-arg=--latency=search=lognormal:80,0.5
+    python tests/load/load_test.py --app-url http://127.0.0.1:8000 --standin-url http://127.0.0.1:8100
+    python tests/load/load_test.py --compare tests/load/reports/<earlier>.json
+"""
+
+import sys
+import os
+import argparse
+import datetime
+import json
+import platform
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.join(HERE, '..', '..')
+APP_DIR = os.path.join(REPO_ROOT, 'mtg-nlp-search')
+sys.path.append(os.path.join(HERE, '..', 'unit'))
+
+REPORTS_DIR = os.path.join(HERE, 'reports')
+DEFAULT_MIX = {'search': 70, 'card-names': 20, 'analyze-deck': 10}
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]
+
+# Cards DeckAnalyzer already knows; decks mix them with catalog cards that need a lookup
+UNDERPOWERED = ["Murder", "Cancel", "Doom Blade", "Terror", "Lightning Strike", "Shock", "Divination"]
+
+
+def load_prompts() -> List[str]:
+    """The frontend sample queries (weighted by list order: earlier prompts are more common)"""
+    import test_sample_queries_nlp
+
+    prompts = []
+    for queries in test_sample_queries_nlp.SAMPLE_QUERIES.values():
+        prompts.extend(queries)
+    return list(dict.fromkeys(prompts))
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        endpoint, _, weight = part.partition('=')
+        if endpoint not in DEFAULT_MIX:
+            raise ValueError(f"unknown endpoint {endpoint!r} in mix (use {', '.join(DEFAULT_MIX)})")
+        mix[endpoint] = float(weight)
+    return mix
+
+
+class Workload:
+    """Draws the next request for a virtual user from the weighted mix"""
+
+    def __init__(self, mix: Dict[str, float], prompts: List[str], card_names: List[str], deck_size: int = 10):
+        self.endpoints = [e for e, w in mix.items() if w > 0]
+        self.weights = [mix[e] for e in self.endpoints]
+        self.prompts = prompts
+        self.prompt_weights = [1 / (rank + 1) ** 0.5 for rank in range(len(prompts))]  # a few popular prompts
+        self.card_names = card_names or ["Abjure"]
+        self.deck_size = deck_size
+
+    def next_request(self, rng: random.Random, user: int, sequence: int) -> tuple:
+        """(endpoint, method, path, params, json body)"""
+        endpoint = rng.choices(self.endpoints, self.weights)[0]
+        if endpoint == 'search':
+            prompt = rng.choices(self.prompts, self.prompt_weights)[0]
+            params = {'prompt': prompt, 'per_page': 20}
+            if rng.random() < 0.2:
+                params['page'] = rng.randint(2, 4)
+            return endpoint, 'GET', '/search', params, None
+        if endpoint == 'card-names':
+            name = rng.choice(self.card_names)
+            prefix = name[:rng.randint(2, min(6, max(len(name), 2)))]
+            return endpoint, 'GET', '/card-names', {'query': prefix, 'session': f'load-{user}-{sequence // 5}'}, None
+        deck = rng.sample(self.card_names, min(self.deck_size - 2, len(self.card_names))) + rng.sample(UNDERPOWERED, 2)
+        return endpoint, 'POST', '/analyze-deck', None, deck
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def summarize(samples: List[tuple], elapsed: float) -> Dict[str, dict]:
+    """Per-endpoint RPS, latency percentiles (ms) and error rate from (endpoint, seconds, status) samples"""
+    by_endpoint = defaultdict(list)
+    for endpoint, latency, status in samples:
+        by_endpoint[endpoint].append((latency, status))
+    summary = {}
+    for endpoint, results in sorted(by_endpoint.items()):
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, status in results if not 200 <= status < 300)
+        summary[endpoint] = {
+            'requests': len(results),
+            'rps': round(len(results) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50), 1),
+            'p95_ms': round(percentile(latencies, 0.95), 1),
+            'p99_ms': round(percentile(latencies, 0.99), 1),
+            'error_rate': round(errors / len(results), 4),
+        }
+    return summary
+
+
+def upstream_diff(before: dict, after: dict) -> Dict[str, dict]:
+    """Stand-in request counts by upstream endpoint and status between two stats snapshots"""
+    diff = {}
+    for endpoint, statuses in after.get('requests', {}).items():
+        old = before.get('requests', {}).get(endpoint, {})
+        counts = {status: count - old.get(status, 0) for status, count in statuses.items()}
+        counts = {status: count for status, count in counts.items() if count}
+        if counts:
+            diff[endpoint] = {'calls': sum(counts.values()), 'by_status': counts}
+    return diff
+
+
+def standin_stats(standin_url: Optional[str]) -> dict:
+    if not standin_url:
+        return {}
+    try:
+        return requests.get(f"{standin_url}/_standin/stats", timeout=5).json()
+    except requests.RequestException:
+        return {}
+
+
+def run_level(app_url: str, workload: Workload, concurrency: int, duration: float, seed: int,
+              timeout: float = 30.0) -> tuple:
+    """Closed loop: `concurrency` users each send their next request as soon as the last one returns"""
+    samples, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local, sequence = [], 0
+        while time.perf_counter() < deadline:
+            endpoint, method, path, params, body = workload.next_request(rng, index, sequence)
+            sequence += 1
+            start = time.perf_counter()
+            try:
+                response = session.request(method, app_url + path, params=params, json=body, timeout=timeout)
+                status = response.status_code
+            except requests.RequestException:
+                status = 0  # connection error or timeout
+            local.append((endpoint, time.perf_counter() - start, status))
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout: float, what: str):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"timed out waiting for {what}")
+
+
+class Stack:
+    """The stand-in and one app worker as subprocesses, torn down on exit"""
+
+    def __init__(self, standin_args: List[str], app_env: Dict[str, str]):
+        self.standin_port, self.app_port = free_port(), free_port()
+        self.standin_url = f"http://127.0.0.1:{self.standin_port}"
+        self.app_url = f"http://127.0.0.1:{self.app_port}"
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.standin_args = standin_args
+        self.app_env = app_env
+        self.processes = []
+
+    def __enter__(self):
+        self.processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(HERE, 'scryfall_standin.py'), '--port', str(self.standin_port)]
+            + self.standin_args,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        wait_until(lambda: requests.get(f"{self.standin_url}/_standin/stats", timeout=1).ok, 60, "the stand-in")
+
+        env = dict(os.environ, SCRYFALL_API_URL=self.standin_url, DATA_DIR=self.data_dir.name,
+                   REFRESH_INTERVAL='0', LOG_LEVEL='WARNING', **self.app_env)
+        self.processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(self.app_port), '--workers', '1',
+             '--log-level', 'warning', '--no-access-log'],
+            cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+        def ready():
+            services = requests.get(f"{self.app_url}/health-check", timeout=2).json()["services"]
+            return services["commanders_coverage"] >= 1.0 and services["card_names_loaded"]
+        wait_until(ready, 120, "the app to load its reference data")
+        return self
+
+    def __exit__(self, *exc):
+        for process in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.data_dir.cleanup()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_sweep(app_url: str, standin_url: Optional[str], workload: Workload, concurrency_levels: List[int],
+              duration: float, warmup: float, seed: int) -> List[dict]:
+    if warmup > 0:
+        run_level(app_url, workload, max(concurrency_levels), warmup, seed)
+
+    levels = []
+    for concurrency in concurrency_levels:
+        before = standin_stats(standin_url)
+        samples, elapsed = run_level(app_url, workload, concurrency, duration, seed)
+        upstream = upstream_diff(before, standin_stats(standin_url))
+        endpoints = summarize(samples, elapsed)
+        total = sum(e['requests'] for e in endpoints.values())
+        levels.append({
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 2),
+            'total_rps': round(total / elapsed, 2),
+            'endpoints': endpoints,
+            'upstream': upstream,
+            'upstream_calls_per_request': round(sum(u['calls'] for u in upstream.values()) / total, 3) if total else 0,
+        })
+        print_level(levels[-1])
+    return levels
+
+
+def print_level(level: dict):
+    print(f"\n⚡ concurrency {level['concurrency']}: {level['total_rps']:.1f} req/s "
+          f"({level['upstream_calls_per_request']} upstream calls per request)")
+    print(f"   {'endpoint':<14}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for endpoint, m in level['endpoints'].items():
+        print(f"   {endpoint:<14}{m['requests']:>9}{m['rps']:>9.1f}{m['p50_ms']:>9.1f}"
+              f"{m['p95_ms']:>9.1f}{m['p99_ms']:>9.1f}{m['error_rate']:>9.1%}")
+    for endpoint, u in sorted(level['upstream'].items()):
+        print(f"   ↳ upstream {endpoint}: {u['calls']} calls {u['by_status']}")
+
+
+def compare_reports(current: dict, previous: dict):
+    """Print RPS and p99 changes per concurrency level and endpoint"""
+    print(f"\n📈 Compared with {previous.get('git_commit')} ({previous.get('started_at')})")
+    old_levels = {level['concurrency']: level for level in previous.get('levels', [])}
+    for level in current['levels']:
+        old = old_levels.get(level['concurrency'])
+        if not old:
+            continue
+        for endpoint, m in level['endpoints'].items():
+            o = old['endpoints'].get(endpoint)
+            if not o or not o['rps'] or not o['p99_ms']:
+                continue
+            print(f"   c={level['concurrency']:<4}{endpoint:<14} rps {o['rps']:>8.1f} -> {m['rps']:<8.1f}"
+                  f"({m['rps'] / o['rps'] - 1:+.0%})   p99 {o['p99_ms']:>8.1f} -> {m['p99_ms']:<8.1f}"
+                  f"({m['p99_ms'] / o['p99_ms'] - 1:+.0%})")
+
+
+def save_report(report: dict, output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = report['started_at'].replace(':', '').replace('-', '')[:15]
+    path = os.path.join(output_dir, f"{stamp}_{report.get('git_commit') or 'nogit'}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test /search, /card-names and /analyze-deck")
+    parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)),
+                        help="comma-separated concurrency levels to sweep")
+    parser.add_argument('--duration', type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument('--warmup', type=float, default=3.0, help="unrecorded seconds before the sweep")
+    parser.add_argument('--mix', default=','.join(f"{e}={w}" for e, w in DEFAULT_MIX.items()),
+                        help="endpoint weights, e.g. search=70,card-names=20,analyze-deck=10")
+    parser.add_argument('--deck-size', type=int, default=10, help="cards per /analyze-deck request")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--app-url', help="use an app that is already running instead of spawning one")
+    parser.add_argument('--standin-url', help="stand-in to read upstream call counts from (with --app-url)")
+    parser.add_argument('--standin-arg', action='append', default=[],
+                        help="extra argument for the spawned stand-in, e.g. --standin-arg=--error-rate=0.01")
+    parser.add_argument('--output-dir', default=REPORTS_DIR, help="where reports are saved")
+    parser.add_argument('--compare', help="earlier report to compare with")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(',') if c]
+    mix = parse_mix(args.mix)
+    # Generous default limits so the stand-in models latency rather than throttling the sweep
+    standin_args = ['--synthetic', '3000', '--latency', 'search=lognormal:60,0.4', '--latency', 'fixed:15',
+                    '--rate-limit', '200', '--burst', '200'] + args.standin_arg
+
+    def run(app_url, standin_url):
+        card_names = requests.get(f"{standin_url}/catalog/card-names", timeout=30).json()["data"] if standin_url else []
+        workload = Workload(mix, load_prompts(), card_names, args.deck_size)
+        report = {
+            'started_at': datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'settings': {'concurrency': levels, 'duration_s': args.duration, 'mix': mix,
+                         'deck_size': args.deck_size, 'seed': args.seed,
+                         'standin_args': None if args.app_url else standin_args},
+        }
+        report['levels'] = run_sweep(app_url, standin_url, workload, levels, args.duration, args.warmup, args.seed)
+        return report
+
+    if args.app_url:
+        report = run(args.app_url.rstrip('/'), args.standin_url.rstrip('/') if args.standin_url else None)
+    else:
+        print("🚀 Starting the Scryfall stand-in and one app worker...")
+        with Stack(standin_args, {}) as stack:
+            report = run(stack.app_url, stack.standin_url)
+
+    path = save_report(report, args.output_dir)
+    print(f"\n💾 Report saved to {path}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
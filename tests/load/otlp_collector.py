@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Local OTLP/HTTP collector stand-in for the app's traces
+
+Accepts OTLP JSON at POST /v1/traces (what app/tracing.py sends when
+TRACE_EXPORT is a URL) and appends every span, one per line, to a JSON-lines
+file - the same shape the app writes when TRACE_EXPORT is a file path. Counts
+are served at /_collector/stats.
+
+    python tests/load/otlp_collector.py --port 4318 --output traces.jsonl
+    TRACE_EXPORT=http://127.0.0.1:4318 TRACE_SAMPLE_RATE=1 uvicorn app.main:app --port 8000
+
+Print the traces in either kind of file as indented span trees:
+
+    python tests/load/otlp_collector.py --show traces.jsonl [--trace <trace id>] [--last 5]
+"""
+
+import sys
+import argparse
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+
+
+def create_app(output_path: str) -> FastAPI:
+    app = FastAPI(title="OTLP collector stand-in")
+    lock = threading.Lock()
+    stats = {"requests": 0, "spans": 0}
+
+    @app.post("/v1/traces")
+    async def traces(request: Request):
+        payload = await request.json()
+        lines = []
+        for resource_spans in payload.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    lines.append(json.dumps(span, separators=(",", ":")) + "\n")
+        with lock:
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            stats["requests"] += 1
+            stats["spans"] += len(lines)
+        return {"partialSuccess": {}}
+
+    @app.get("/_collector/stats")
+    def collector_stats():
+        return dict(stats)
+
+    return app
+
+
+def read_spans(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def group_traces(spans: List[dict]) -> Dict[str, List[dict]]:
+    """Trace id -> spans, traces in the order they started"""
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    for span in sorted(spans, key=lambda s: int(s["startTimeUnixNano"])):
+        traces[span["traceId"]].append(span)
+    return dict(traces)
+
+
+def _attribute_text(span: dict) -> str:
+    values = []
+    for attribute in span.get("attributes", []):
+        value = next(iter(attribute["value"].values()))
+        values.append(f"{attribute['key']}={value}")
+    return " ".join(values)
+
+
+def format_trace(spans: List[dict]) -> str:
+    """One line per span, children indented under their parent, with durations"""
+    ids = {span["spanId"] for span in spans}
+    children: Dict[Optional[str], List[dict]] = defaultdict(list)
+    for span in spans:
+        parent = span.get("parentSpanId")
+        children[parent if parent in ids else None].append(span)
+
+    lines = []
+
+    def walk(span: dict, depth: int):
+        ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+        error = " ❌ " + span["status"].get("message", "") if span.get("status", {}).get("code") == 2 else ""
+        lines.append(f"{'  ' * depth}{span['name']}  {ms:.2f} ms  {_attribute_text(span)}{error}".rstrip())
+        for child in children.get(span["spanId"], []):
+            walk(child, depth + 1)
+
+    for root in children.get(None, []):
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def show(path: str, trace_id: Optional[str] = None, last: int = 0):
+    traces = group_traces(read_spans(path))
+    selected = [trace_id] if trace_id else list(traces)[-last:] if last else list(traces)
+    for tid in selected:
+        if tid not in traces:
+            print(f"❌ No trace {tid} in {path}")
+            continue
+        print(f"trace {tid}")
+        print(format_trace(traces[tid]))
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OTLP/HTTP trace collector stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--output', default='traces.jsonl', help="JSON-lines file the spans are appended to")
+    parser.add_argument('--show', metavar='FILE', help="print the traces in FILE instead of serving")
+    parser.add_argument('--trace', help="with --show: only this trace id")
+    parser.add_argument('--last', type=int, default=0, help="with --show: only the last N traces")
+    args = parser.parse_args(argv)
+
+    if args.show:
+        show(args.show, args.trace, args.last)
+        return
+
+    import uvicorn
+
+    print(f"🔭 OTLP collector stand-in on http://{args.host}:{args.port}/v1/traces -> {args.output}")
+    uvicorn.run(create_app(args.output), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Replay a sampled query log (QUERY_LOG_PATH) against the app, or its parser
+
+Requests keep the gaps between them from the log, divided by --speed
+(2 = twice as fast, 0 = back to back), and are sent open-loop: a slow
+answer does not delay the next request. The report gives latency
+percentiles, status counts, how late requests were dispatched, and the
+difference from the latencies recorded in the log.
+
+--parse-only skips HTTP and runs each prompt through the parser and query
+builder in-process, to compare parser changes on a real workload shape.
+
+Usage:
+    python tests/load/replay_query_log.py queries.jsonl --app-url http://127.0.0.1:8000
+    python tests/load/replay_query_log.py queries.jsonl --app-url http://127.0.0.1:8000 --speed 10
+    python tests/load/replay_query_log.py queries.jsonl.gz --parse-only
+"""
+
+import sys
+import os
+import argparse
+import gzip
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../mtg-nlp-search'))
+
+
+def read_log(path: str, limit: int = 0) -> Iterator[dict]:
+    """Entries of a query log (plain or gzipped), skipping lines that don't parse"""
+    opener = gzip.open if path.endswith(".gz") else open
+    count = 0
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or "p" not in entry:
+                continue
+            yield entry
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+def search_params(entry: dict) -> dict:
+    params = {"prompt": entry["p"], "page": entry.get("pg", 1), "per_page": entry.get("pp", 20)}
+    if entry.get("cc"):
+        params["commander_colors"] = entry["cc"]
+    return params
+
+
+def schedule(entries: List[dict], speed: float) -> List[float]:
+    """Send offsets (seconds from the start) preserving the logged gaps at `speed`"""
+    if not entries:
+        return []
+    first = entries[0].get("t", 0)
+    if speed <= 0:
+        return [0.0] * len(entries)
+    return [max(0.0, (entry.get("t", first) - first) / speed) for entry in entries]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def latency_summary(latencies_ms: List[float]) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def replay_http(entries: List[dict], app_url: str, speed: float, workers: int, timeout: float = 30.0) -> dict:
+    offsets = schedule(entries, speed)
+    results = [None] * len(entries)
+    local = threading.local()
+
+    def send(index: int, due: float):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        lag = time.perf_counter() - due
+        start = time.perf_counter()
+        try:
+            status = session.get(f"{app_url}/search", params=search_params(entries[index]), timeout=timeout).status_code
+        except requests.RequestException:
+            status = 0
+        results[index] = (status, (time.perf_counter() - start) * 1000, lag * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for index, offset in enumerate(offsets):
+            due = started + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, index, due)
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(str(status) for status, _, _ in results)
+    report = {
+        "requests": len(entries),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(entries) / elapsed, 2) if elapsed else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "latency": latency_summary([latency for _, latency, _ in results]),
+        "dispatch_lag": latency_summary([lag for _, _, lag in results]),
+    }
+    logged = [entry["ms"] for entry in entries if "ms" in entry]
+    if logged:
+        report["logged_latency"] = latency_summary(logged)
+    return report
+
+
+def replay_parser(entries: List[dict]) -> dict:
+    """Time the parse and query-building stages in-process, per logged prompt"""
+    from app.query_builder import extract_filters
+    from app.scryfall import build_query
+
+    parse_ms, build_ms = [], []
+    for entry in entries:
+        start = time.perf_counter()
+        filters = extract_filters(entry["p"])
+        if entry.get("cc"):
+            filters.pop("colors", None)
+            filters["coloridentity"] = entry["cc"]
+            filters["is_commander_context"] = True
+        middle = time.perf_counter()
+        build_query(filters)
+        end = time.perf_counter()
+        parse_ms.append((middle - start) * 1000)
+        build_ms.append((end - middle) * 1000)
+
+    report = {"requests": len(entries), "parse": latency_summary(parse_ms), "build_query": latency_summary(build_ms)}
+    logged = [entry["st"]["parse"] for entry in entries if "parse" in entry.get("st", {})]
+    if logged:
+        report["logged_parse"] = latency_summary(logged)
+    return report
+
+
+def print_report(report: dict):
+    print(f"🔁 Replayed {report['requests']} queries")
+    for key in ("latency", "logged_latency", "dispatch_lag", "parse", "logged_parse", "build_query"):
+        if key in report:
+            s = report[key]
+            print(f"   {key:<15} p50 {s['p50_ms']:>9.2f} ms   p95 {s['p95_ms']:>9.2f} ms   "
+                  f"p99 {s['p99_ms']:>9.2f} ms   max {s['max_ms']:>9.2f} ms")
+    if "statuses" in report:
+        print(f"   {report['rps']} req/s over {report['elapsed_s']} s, statuses {report['statuses']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a sampled /search query log")
+    parser.add_argument("log", help="query log written with QUERY_LOG_PATH (.jsonl or .jsonl.gz)")
+    parser.add_argument("--app-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed: 1 keeps the logged gaps, 10 is ten times faster, 0 sends back to back")
+    parser.add_argument("--workers", type=int, default=32, help="most requests in flight at once")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N entries")
+    parser.add_argument("--parse-only", action="store_true", help="time the parser in-process instead of HTTP")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    entries = sorted(read_log(args.log, args.limit), key=lambda entry: entry.get("t", 0))
+    if args.parse_only:
+        report = replay_parser(entries)
+    else:
+        report = replay_http(entries, args.app_url.rstrip("/"), args.speed, args.workers)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
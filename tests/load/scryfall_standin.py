@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+"""
+Offline Scryfall stand-in for load tests
+
+A local server that answers the Scryfall endpoints the app uses, over
+fixture cards, so the whole stack can be load-tested reproducibly without
+touching api.scryfall.com:
+
+- GET  /cards/search          q (a subset of Scryfall syntax), page, order, dir;
+                              175 cards per page with has_more, next_page, total_cards
+- GET  /cards/named           exact= or fuzzy=
+- POST /cards/collection      {"identifiers": [{"name": ...} | {"id": ...} | {"oracle_id": ...}]}
+- GET  /catalog/card-names
+- GET  /bulk-data/oracle-cards (and its download_uri), so the commander loader works too
+
+Cards come from fixture files (a JSON list of cards, a Scryfall list object,
+or an /search response saved by this app like examples/full_chulane_results.json)
+plus optional synthetic cards. Every request can be given a latency drawn from
+a distribution, injected 429/5xx errors, and a token-bucket rate limit that
+answers 429 like Scryfall does. Counters are served at /_standin/stats.
+
+Point the app at it with SCRYFALL_API_URL:
+
+    python tests/load/scryfall_standin.py --port 8100 --synthetic 3000 \\
+        --latency search=lognormal:80,0.5 --latency fixed:20 --error-rate 0.01
+    SCRYFALL_API_URL=http://127.0.0.1:8100 uvicorn app.main:app --port 8000
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', '..', 'mtg-nlp-search'))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.color_identity import identity_mask, parse_identity
+
+PAGE_SIZE = 175
+COLLECTION_LIMIT = 75
+DEFAULT_FIXTURES = [os.path.join(HERE, '..', '..', 'examples', 'full_chulane_results.json')]
+
+# Path -> endpoint name used for latency settings and stats
+ENDPOINTS = {
+    '/cards/search': 'search',
+    '/cards/named': 'named',
+    '/cards/collection': 'collection',
+    '/catalog/card-names': 'catalog',
+    '/bulk-data/oracle-cards': 'bulk',
+    '/bulk-data/oracle-cards/download': 'bulk',
+}
+
+
+def error_body(status: int, code: str, details: str) -> dict:
+    return {"object": "error", "code": code, "status": status, "details": details}
+
+
+def error_response(status: int, code: str, details: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse(error_body(status, code, details), status_code=status, headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# Card pool
+
+def load_fixture_cards(path: str) -> List[dict]:
+    """Cards from a JSON list, a Scryfall list object ('data') or a saved /search response ('results')"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('data', data.get('results', []))
+    return [card for card in data if isinstance(card, dict) and card.get('name')]
+
+
+_NAME_WORDS = (
+    ['ancient', 'blazing', 'silent', 'hollow', 'gilded', 'feral', 'arcane', 'grim', 'radiant', 'sunken',
+     'verdant', 'shattered', 'wandering', 'iron', 'storm', 'ember', 'frost', 'shadow', 'crimson', 'thorn'],
+    ['oracle', 'warden', 'drake', 'golem', 'reckoning', 'bargain', 'charm', 'sentinel', 'rebuke', 'harvest',
+     'invoker', 'behemoth', 'familiar', 'vault', 'tutor', 'monolith', 'specter', 'hydra', 'archon', 'beacon'],
+    ['', '', '', ' of ash', ' of the deep', ' of dusk', ' of embers', ' of thorns', ' of storms', ' of bone'],
+)
+
+_EFFECT_TEXTS = [
+    "Counter target spell.",
+    "Counter target noncreature spell unless its controller pays {2}.",
+    "Destroy target creature.",
+    "Destroy target artifact or enchantment.",
+    "Exile target nonland permanent.",
+    "Draw two cards.",
+    "Search your library for a basic land card, put it onto the battlefield tapped, then shuffle.",
+    "Create a 1/1 white Soldier creature token.",
+    "{T}: Add one mana of any color.",
+    "This deals 3 damage to any target.",
+    "You gain 4 life.",
+    "Return target creature card from your graveyard to your hand.",
+    "Flashback {2}{R}",
+]
+_KEYWORDS = ['Flying', 'Trample', 'Haste', 'Vigilance', 'Defender', 'Lifelink', 'Deathtouch']
+_TYPES = [
+    ('Creature', 0.35), ('Legendary Creature', 0.08), ('Instant', 0.15), ('Sorcery', 0.12),
+    ('Artifact', 0.1), ('Enchantment', 0.1), ('Planeswalker', 0.03), ('Land', 0.07),
+]
+_SUBTYPES = ['Human Wizard', 'Elf Druid', 'Dragon', 'Zombie', 'Goblin Warrior', 'Angel', 'Beast', 'Elemental']
+
+
+def synthetic_cards(count: int, seed: int = 42) -> List[dict]:
+    """Deterministic Scryfall-shaped cards with varied types, colors, costs and effects"""
+    rng = random.Random(seed)
+    cards, names = [], set()
+    while len(cards) < count:
+        name = ' '.join(rng.choice(words) for words in _NAME_WORDS[:2]).title() + rng.choice(_NAME_WORDS[2])
+        if name in names:
+            name += f" {len(cards)}"
+        names.add(name)
+
+        card_type = rng.choices([t for t, _ in _TYPES], weights=[w for _, w in _TYPES])[0]
+        colors = [] if card_type == 'Land' else [c for c in 'WUBRG' if rng.random() < 0.3]
+        cmc = 0 if card_type == 'Land' else rng.choice([0, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 5, 6, 7, 8])
+        generic = max(cmc - len(colors), 0)
+        mana_cost = '' if card_type == 'Land' else (f"{{{generic}}}" if generic or not colors else '') + ''.join(
+            f"{{{c}}}" for c in colors)
+        type_line = card_type
+        texts = [rng.choice(_EFFECT_TEXTS)]
+        power = toughness = None
+        if 'Creature' in card_type:
+            type_line += f" — {rng.choice(_SUBTYPES)}"
+            texts.insert(0, rng.choice(_KEYWORDS))
+            power, toughness = str(rng.randint(0, 7)), str(rng.randint(1, 7))
+
+        card_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"standin:{name}"))
+        card = {
+            "object": "card",
+            "id": card_id,
+            "oracle_id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"standin-oracle:{name}")),
+            "name": name,
+            "lang": "en",
+            "layout": "normal",
+            "mana_cost": mana_cost,
+            "cmc": float(cmc),
+            "type_line": type_line,
+            "oracle_text": "\n".join(texts),
+            "colors": colors,
+            "color_identity": colors,
+            "legalities": {
+                "commander": "legal" if rng.random() < 0.95 else "banned",
+                "standard": "legal" if rng.random() < 0.2 else "not_legal",
+                "modern": "legal" if rng.random() < 0.6 else "not_legal",
+                "legacy": "legal",
+                "vintage": "legal",
+            },
+            "games": ["paper", "mtgo"] if rng.random() < 0.97 else ["arena"],
+            "edhrec_rank": rng.randint(1, 25000),
+            "image_uris": {size: f"https://cards.standin.invalid/{size}/{card_id}.jpg"
+                           for size in ("small", "normal", "large", "art_crop")},
+            "scryfall_uri": f"https://scryfall.standin.invalid/card/{card_id}",
+        }
+        if power is not None:
+            card["power"], card["toughness"] = power, toughness
+        cards.append(card)
+    return cards
+
+
+class CardPool:
+    """Cards indexed by name and id, sorted by name like Scryfall's default order"""
+
+    def __init__(self, cards: List[dict]):
+        unique = {}
+        for card in cards:
+            unique.setdefault(card.get('id') or card['name'], card)
+        self.cards = sorted(unique.values(), key=lambda c: c['name'].lower())
+        self.by_id = {c['id']: c for c in self.cards if c.get('id')}
+        self.by_oracle_id = {c['oracle_id']: c for c in self.cards if c.get('oracle_id')}
+        self.by_name = {}
+        for card in self.cards:
+            self.by_name.setdefault(card['name'].lower(), card)
+            for face in card['name'].split(' // ')[1:]:
+                self.by_name.setdefault(face.lower(), card)
+        self.names = sorted({card['name'] for card in self.cards})
+        self.updated_at = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "+00:00"
+
+    @classmethod
+    def from_sources(cls, fixtures: List[str], synthetic: int = 0, seed: int = 42) -> "CardPool":
+        cards = []
+        for path in fixtures:
+            cards.extend(load_fixture_cards(path))
+        cards.extend(synthetic_cards(synthetic, seed))
+        return cls(cards)
+
+    def named(self, exact: str = None, fuzzy: str = None):
+        """(card, None) or (None, error code) for /cards/named"""
+        if exact is not None:
+            card = self.by_name.get(exact.strip().lower())
+            return (card, None) if card else (None, 'not_found')
+
+        wanted = _normalize(fuzzy or '')
+        if not wanted:
+            return None, 'not_found'
+        for name_lower, card in self.by_name.items():
+            if _normalize(name_lower) == wanted:
+                return card, None
+        for test in (lambda n: n.startswith(wanted), lambda n: wanted in n):
+            matches = {card['id'] if card.get('id') else card['name']: card
+                       for name_lower, card in self.by_name.items() if test(_normalize(name_lower))}
+            if len(matches) == 1:
+                return next(iter(matches.values())), None
+            if len(matches) > 1:
+                return None, 'ambiguous'
+        return None, 'not_found'
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r'[^a-z0-9 ]', '', name.lower()).strip()
+
+
+# ---------------------------------------------------------------------------
+# Query matching: the subset of Scryfall syntax the app generates
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+_QUERY_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<open>\()
+      | (?P<close>\))
+      | (?P<neg>-)(?=[\w("])
+      | (?P<key>[A-Za-z]+)(?P<op><=|>=|!=|:|=|<|>)(?:"(?P<quoted_value>[^"]*)"|(?P<value>[^\s()]+))
+      | "(?P<phrase>[^"]*)"
+      | (?P<word>[^\s()"]+)
+    )''', re.VERBOSE)
+
+_COLOR_KEYS = {'c', 'color', 'colors'}
+_IDENTITY_KEYS = {'id', 'identity', 'ci', 'coloridentity', 'commander'}
+_NUMBER_KEYS = {'cmc': 'cmc', 'mv': 'cmc', 'manavalue': 'cmc', 'pow': 'power', 'power': 'power',
+                'tou': 'toughness', 'toughness': 'toughness'}
+_COMPARE = {
+    '=': lambda a, b: a == b, ':': lambda a, b: a == b, '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b, '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+}
+
+
+def _tokenize_query(query: str) -> list:
+    tokens, pos, query = [], 0, query.strip()
+    while pos < len(query):
+        match = _QUERY_TOKEN.match(query, pos)
+        if not match or match.end() == pos:
+            raise QuerySyntaxError(f"cannot parse query near {query[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup if match.lastgroup not in ('op', 'value', 'quoted_value') else 'key'
+        if kind == 'key':
+            value = match.group('quoted_value') if match.group('quoted_value') is not None else match.group('value')
+            tokens.append(('term', (match.group('key').lower(), match.group('op'), value)))
+        elif kind == 'word' and match.group('word').upper() in ('OR', 'AND'):
+            tokens.append((match.group('word').upper(), None))
+        else:
+            tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+def _oracle_text(card: dict) -> str:
+    texts = [card.get('oracle_text', '')] + [face.get('oracle_text', '') for face in card.get('card_faces', [])]
+    return '\n'.join(texts).lower()
+
+
+def _type_line(card: dict) -> str:
+    return card.get('type_line', '').lower()
+
+
+def _color_value(value: str):
+    """A mask, or ('count', n) for c=2, or 'multicolor'"""
+    value = value.lower()
+    if value.isdigit():
+        return ('count', int(value))
+    if value in ('m', 'multi', 'multicolor'):
+        return 'multicolor'
+    try:
+        return parse_identity(value)
+    except ValueError:
+        raise QuerySyntaxError(f"unknown colors {value!r}")
+
+
+def _color_term(field_name: str, op: str, value: str) -> Callable[[dict], bool]:
+    wanted = _color_value(value)
+    if op == ':':
+        op = '<=' if field_name == 'color_identity' else '>='
+
+    def colors_of(card):
+        return identity_mask(''.join(card.get(field_name) or []))
+
+    if wanted == 'multicolor':
+        return lambda card: bin(colors_of(card)).count('1') >= 2
+    if isinstance(wanted, tuple):
+        compare = _COMPARE[op]
+        return lambda card: compare(bin(colors_of(card)).count('1'), wanted[1])
+
+    def matches(card):
+        mask = colors_of(card)
+        subset, superset = mask & ~wanted == 0, wanted & ~mask == 0
+        return {
+            '=': mask == wanted, '!=': mask != wanted,
+            '<=': subset, '<': subset and mask != wanted,
+            '>=': superset, '>': superset and mask != wanted,
+        }[op]
+    return matches
+
+
+def _number_term(field_name: str, op: str, value: str) -> Callable[[dict], bool]:
+    try:
+        wanted = float(value)
+    except ValueError:
+        raise QuerySyntaxError(f"{field_name} needs a number, got {value!r}")
+    compare = _COMPARE[op]
+
+    def matches(card):
+        try:
+            return compare(float(card.get(field_name)), wanted)
+        except (TypeError, ValueError):
+            return False
+    return matches
+
+
+def _term(key: str, op: str, value: str) -> Callable[[dict], bool]:
+    text = value.lower()
+    if key in ('o', 'oracle'):
+        return lambda card: text in _oracle_text(card)
+    if key in ('t', 'type'):
+        return lambda card: text in _type_line(card)
+    if key == 'name':
+        return lambda card: text in card['name'].lower()
+    if key in _COLOR_KEYS:
+        return _color_term('colors', op, value)
+    if key in _IDENTITY_KEYS:
+        return _color_term('color_identity', ':' if key == 'commander' else op, value)
+    if key in _NUMBER_KEYS:
+        return _number_term(_NUMBER_KEYS[key], op, value)
+    if key in ('f', 'format', 'legal'):
+        return lambda card: card.get('legalities', {}).get(text) in ('legal', 'restricted')
+    if key == 'game':
+        return lambda card: text in card.get('games', ['paper'])
+    if key == 'is' and text == 'commander':
+        return lambda card: ('legendary' in _type_line(card) and 'creature' in _type_line(card)) \
+            or 'can be your commander' in _oracle_text(card)
+    return lambda card: True  # keys this stand-in does not model match everything
+
+
+def compile_query(query: str) -> Callable[[dict], bool]:
+    """Compile a Scryfall query into a card predicate (raises QuerySyntaxError)"""
+    tokens = _tokenize_query(query)
+    if not tokens:
+        raise QuerySyntaxError("empty query")
+    pos = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def parse_or():
+        nonlocal pos
+        options = [parse_and()]
+        while peek() == 'OR':
+            pos += 1
+            options.append(parse_and())
+        return options[0] if len(options) == 1 else (lambda card: any(p(card) for p in options))
+
+    def parse_and():
+        nonlocal pos
+        parts = [parse_unary()]
+        while peek() not in (None, 'OR', 'close'):
+            if peek() == 'AND':
+                pos += 1
+            parts.append(parse_unary())
+        return parts[0] if len(parts) == 1 else (lambda card: all(p(card) for p in parts))
+
+    def parse_unary():
+        nonlocal pos
+        if pos >= len(tokens):
+            raise QuerySyntaxError("query ends early")
+        kind, value = tokens[pos]
+        pos += 1
+        if kind == 'neg':
+            inner = parse_unary()
+            return lambda card: not inner(card)
+        if kind == 'open':
+            inner = parse_or()
+            if peek() != 'close':
+                raise QuerySyntaxError("unbalanced parentheses")
+            pos += 1
+            return inner
+        if kind == 'term':
+            return _term(*value)
+        if kind in ('word', 'phrase'):
+            text = value.lower()
+            return lambda card: text in card['name'].lower()
+        raise QuerySyntaxError(f"unexpected {value or kind!r}")
+
+    predicate = parse_or()
+    if pos != len(tokens):
+        raise QuerySyntaxError("unbalanced parentheses")
+    return predicate
+
+
+_ORDERS = {
+    'name': lambda card: card['name'].lower(),
+    'cmc': lambda card: card.get('cmc') or 0,
+    'edhrec': lambda card: card.get('edhrec_rank') or math.inf,
+    'released': lambda card: card.get('released_at') or '',
+}
+
+
+# ---------------------------------------------------------------------------
+# Latency, error injection and rate limiting
+
+class LatencyModel:
+    """
+    A latency distribution in milliseconds, parsed from a spec:
+
+    none | fixed:MS | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA | exponential:MEAN
+    """
+
+    def __init__(self, spec: str = 'none'):
+        self.spec = spec
+        kind, _, args = spec.partition(':')
+        try:
+            params = [float(a) for a in args.split(',')] if args else []
+        except ValueError:
+            raise ValueError(f"bad latency spec {spec!r}")
+        samplers = {
+            'none': (0, lambda rng: 0.0),
+            'fixed': (1, lambda rng: params[0]),
+            'uniform': (2, lambda rng: rng.uniform(params[0], params[1])),
+            'normal': (2, lambda rng: rng.gauss(params[0], params[1])),
+            'lognormal': (2, lambda rng: params[0] * math.exp(rng.gauss(0, params[1]))),
+            'exponential': (1, lambda rng: rng.expovariate(1 / params[0]) if params[0] else 0.0),
+        }
+        if kind not in samplers or len(params) != samplers[kind][0]:
+            raise ValueError(f"bad latency spec {spec!r}")
+        self._sample = samplers[kind][1]
+
+    def sample(self, rng: random.Random) -> float:
+        """One latency in seconds (never negative)"""
+        return max(self._sample(rng), 0.0) / 1000
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+@dataclass
+class StandinConfig:
+    latency: Dict[str, LatencyModel] = field(default_factory=dict)  # endpoint (or '*') -> model
+    error_rate: float = 0.0        # share of requests answered with a random 5xx
+    throttle_rate: float = 0.0     # share of requests answered with 429 regardless of the limiter
+    rate_limit: float = 0.0        # requests per second (0 disables the limiter)
+    burst: float = 10.0
+    per_client: bool = False       # one bucket per client address instead of one shared bucket
+    seed: int = 42
+
+    def latency_for(self, endpoint: str) -> Optional[LatencyModel]:
+        return self.latency.get(endpoint) or self.latency.get('*')
+
+
+class StandinStats:
+    """Request counts by endpoint and status, plus the latency injected"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.requests = defaultdict(lambda: defaultdict(int))
+            self.injected_latency = defaultdict(float)
+            self.rate_limited = 0
+            self.injected_errors = 0
+
+    def record(self, endpoint: str, status: int, delay: float = 0.0):
+        with self.lock:
+            self.requests[endpoint][str(status)] += 1
+            self.injected_latency[endpoint] += delay
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "requests": {endpoint: dict(statuses) for endpoint, statuses in self.requests.items()},
+                "totals": {endpoint: sum(statuses.values()) for endpoint, statuses in self.requests.items()},
+                "injected_latency_s": {k: round(v, 3) for k, v in self.injected_latency.items()},
+                "rate_limited": self.rate_limited,
+                "injected_errors": self.injected_errors,
+            }
+
+
+# ---------------------------------------------------------------------------
+# The app
+
+def create_app(pool: CardPool, config: StandinConfig = None) -> FastAPI:
+    config = config or StandinConfig()
+    rng = random.Random(config.seed)
+    stats = StandinStats()
+    buckets: Dict[str, TokenBucket] = {}
+    app = FastAPI(title="Scryfall stand-in")
+    app.state.pool, app.state.config, app.state.stats = pool, config, stats
+
+    def bucket_for(request: Request) -> Optional[TokenBucket]:
+        if config.rate_limit <= 0:
+            return None
+        key = request.client.host if (config.per_client and request.client) else '*'
+        if key not in buckets:
+            buckets[key] = TokenBucket(config.rate_limit, config.burst)
+        return buckets[key]
+
+    @app.middleware("http")
+    async def upstream_behaviour(request: Request, call_next):
+        endpoint = ENDPOINTS.get(request.url.path)
+        if endpoint is None:
+            return await call_next(request)
+
+        bucket = bucket_for(request)
+        if bucket and not bucket.take():
+            stats.rate_limited += 1
+            stats.record(endpoint, 429)
+            return error_response(429, "rate_limited", "Too many requests. Slow down.", {"Retry-After": "1"})
+
+        model = config.latency_for(endpoint)
+        delay = model.sample(rng) if model else 0.0
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = rng.random()
+        if roll < config.error_rate:
+            stats.injected_errors += 1
+            status = rng.choice([500, 502, 503])
+            stats.record(endpoint, status, delay)
+            return error_response(status, "internal_error", "Injected upstream failure")
+        if roll < config.error_rate + config.throttle_rate:
+            stats.injected_errors += 1
+            stats.record(endpoint, 429, delay)
+            return error_response(429, "rate_limited", "Too many requests. Slow down.", {"Retry-After": "1"})
+
+        response = await call_next(request)
+        stats.record(endpoint, response.status_code, delay)
+        return response
+
+    @app.get("/cards/search")
+    def cards_search(request: Request, q: str = '', page: int = 1, order: str = 'name', dir: str = 'auto'):
+        try:
+            predicate = compile_query(q)
+        except QuerySyntaxError as e:
+            return error_response(400, "bad_request", str(e))
+        matches = [card for card in pool.cards if predicate(card)]
+        if order in _ORDERS and order != 'name':
+            matches.sort(key=_ORDERS[order])
+        if dir == 'desc':
+            matches.reverse()
+        if not matches:
+            return error_response(404, "not_found", "Your query didn't match any cards.")
+
+        start = (page - 1) * PAGE_SIZE
+        if page < 1 or start >= len(matches):
+            return error_response(422, "bad_request", "You have paginated beyond the end of these results.")
+        has_more = start + PAGE_SIZE < len(matches)
+        body = {
+            "object": "list",
+            "total_cards": len(matches),
+            "has_more": has_more,
+            "data": matches[start:start + PAGE_SIZE],
+        }
+        if has_more:
+            body["next_page"] = str(request.url.include_query_params(page=page + 1))
+        return body
+
+    @app.get("/cards/named")
+    def cards_named(exact: str = None, fuzzy: str = None):
+        if exact is None and fuzzy is None:
+            return error_response(400, "bad_request", "Provide exact or fuzzy.")
+        card, error = pool.named(exact=exact, fuzzy=fuzzy)
+        if card is None:
+            details = ("Too many cards match ambiguous name" if error == 'ambiguous'
+                       else "No cards found matching the given name")
+            return error_response(404, error, details)
+        return card
+
+    @app.post("/cards/collection")
+    async def cards_collection(request: Request):
+        try:
+            identifiers = (await request.json())["identifiers"]
+        except (ValueError, KeyError, TypeError):
+            return error_response(400, "bad_request", "Expected {\"identifiers\": [...]}.")
+        if len(identifiers) > COLLECTION_LIMIT:
+            return error_response(422, "bad_request", f"At most {COLLECTION_LIMIT} identifiers per request.")
+
+        found, not_found = [], []
+        for identifier in identifiers:
+            card = None
+            if isinstance(identifier, dict):
+                if 'id' in identifier:
+                    card = pool.by_id.get(identifier['id'])
+                elif 'oracle_id' in identifier:
+                    card = pool.by_oracle_id.get(identifier['oracle_id'])
+                elif 'name' in identifier:
+                    card = pool.by_name.get(str(identifier['name']).lower())
+            (found if card else not_found).append(card or identifier)
+        return {"object": "list", "not_found": not_found, "data": found}
+
+    @app.get("/catalog/card-names")
+    def catalog_card_names():
+        return {"object": "catalog", "total_values": len(pool.names), "data": pool.names}
+
+    @app.get("/bulk-data/oracle-cards")
+    def bulk_oracle_cards(request: Request):
+        return {
+            "object": "bulk_data",
+            "type": "oracle_cards",
+            "updated_at": pool.updated_at,
+            "download_uri": str(request.url_for("bulk_oracle_cards_download")),
+            "content_type": "application/json",
+            "content_encoding": "identity",
+        }
+
+    @app.get("/bulk-data/oracle-cards/download")
+    def bulk_oracle_cards_download():
+        return pool.cards
+
+    @app.get("/_standin/stats")
+    def standin_stats():
+        return stats.snapshot()
+
+    @app.post("/_standin/reset")
+    def standin_reset():
+        stats.reset()
+        return {"reset": True}
+
+    return app
+
+
+def parse_latency(specs: List[str]) -> Dict[str, LatencyModel]:
+    """['search=lognormal:80,0.5', 'fixed:20'] -> {'search': ..., '*': ...}"""
+    models = {}
+    for spec in specs or []:
+        endpoint, _, distribution = spec.rpartition('=')
+        if endpoint and endpoint not in set(ENDPOINTS.values()):
+            raise ValueError(f"unknown endpoint {endpoint!r} in latency spec {spec!r}")
+        models[endpoint or '*'] = LatencyModel(distribution)
+    return models
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Scryfall stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--fixture', action='append', dest='fixtures',
+                        help="card fixture file (repeatable; default examples/full_chulane_results.json)")
+    parser.add_argument('--synthetic', type=int, default=1000, help="synthetic cards to add to the fixtures")
+    parser.add_argument('--latency', action='append', default=[],
+                        help="[endpoint=]distribution, e.g. 'fixed:20' or 'search=lognormal:80,0.5' (repeatable)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with a 5xx")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument('--rate-limit', type=float, default=10.0, help="requests per second, 0 to disable")
+    parser.add_argument('--burst', type=float, default=10.0, help="requests allowed at once before limiting")
+    parser.add_argument('--per-client', action='store_true', help="rate-limit each client address separately")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    pool = CardPool.from_sources(args.fixtures or DEFAULT_FIXTURES, args.synthetic, args.seed)
+    config = StandinConfig(
+        latency=parse_latency(args.latency),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        per_client=args.per_client,
+        seed=args.seed,
+    )
+    print(f"🃏 Scryfall stand-in with {len(pool.cards)} cards on http://{args.host}:{args.port}")
+    uvicorn.run(create_app(pool, config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Shared fakes for the unit tests
+
+Tests stub Scryfall by patching `requests.get` where the app calls it
+(app.scryfall, app.deck_analyzer) to return these responses.
+"""
+
+import json
+import time
+
+import requests
+
+# Admin endpoints: patch config.ADMIN_TOKEN to TOKEN and send ADMIN as headers
+TOKEN = "s3cret"
+ADMIN = {"X-Admin-Token": TOKEN}
+
+
+class FakeResponse:
+    """The parts of requests.Response the app uses"""
+
+    def __init__(self, payload=None, status_code=200):
+        self.payload = payload if payload is not None else {}
+        self.status_code = status_code
+        self.text = json.dumps(self.payload)
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+def list_page(data, has_more=False, total_cards=None, status_code=200):
+    """A /cards/search page"""
+    return FakeResponse({"object": "list", "data": list(data), "has_more": has_more,
+                         "total_cards": len(data) if total_cards is None else total_cards}, status_code)
+
+
+def search_page(count=175, total_cards=400):
+    """A full /cards/search page of placeholder cards"""
+    return list_page([{"name": f"Card {i}"} for i in range(count)], has_more=total_cards > count,
+                     total_cards=total_cards)
+
+
+def named_card(name="Some Card", edhrec_rank=500, status_code=200):
+    """A /cards/named result"""
+    return FakeResponse({"object": "card", "name": name, "edhrec_rank": edhrec_rank}, status_code)
+
+
+def catalog(names):
+    """A /catalog/card-names result"""
+    return FakeResponse({"object": "catalog", "data": list(names)})
+
+
+def bulk_metadata(updated_at):
+    """A /bulk-data/oracle-cards description"""
+    return FakeResponse({"object": "bulk_data", "type": "oracle_cards", "updated_at": updated_at})
+
+
+def slow(response, delay=0.05):
+    """A requests.get replacement answering `response` after `delay` seconds"""
+    def get(*args, **kwargs):
+        time.sleep(delay)
+        return response
+    return get
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Unit tests for streaming Scryfall bulk-data ingestion
+"""
+
+import sys
+import os
+import gzip
+import io
+import json
+import tempfile
+import tracemalloc
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+import app.commanders as commanders_module
+from app.bulk_ingest import iter_json_array, is_commander_eligible, maybe_gunzip
+from app.commanders import CommanderDatabase
+
+
+def make_card(i, eligible):
+    return {
+        "object": "card",
+        "id": f"card-{i}",
+        "name": f"Synthetic Card {i} — Ærsong",
+        "type_line": "Legendary Creature — Elf" if eligible else "Instant",
+        "oracle_text": "Draw a card. " * 20,
+        "color_identity": ["G", "U"] if eligible else ["R"],
+        "legalities": {fmt: "legal" for fmt in ["commander", "legacy", "vintage", "modern", "pauper"]},
+        "flavor_text": "x" * 3000,  # pad to roughly the size of a real bulk card
+    }
+
+
+def write_fixture(path, count, eligible_every=10):
+    """Write a gzip bulk file one card at a time (never holding it all in memory)"""
+    raw_size = 0
+    with gzip.open(path, "wb", compresslevel=1) as f:
+        f.write(b"[")
+        for i in range(count):
+            chunk = (b",\n" if i else b"\n") + json.dumps(make_card(i, i % eligible_every == 0), ensure_ascii=False).encode("utf-8")
+            f.write(chunk)
+            raw_size += len(chunk)
+        f.write(b"\n]")
+    return raw_size
+
+
+def test_iter_json_array_small_chunks():
+    """Elements split across chunk boundaries (including multi-byte characters) decode correctly"""
+    items = [{"name": "Æther Vial", "text": "a, b ] [ c"}, {"name": "Jötun Grunt", "n": [1, 2, {"x": None}]}, {}, "tail"]
+    data = json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8")
+
+    for chunk_size in [1, 3, 7, 64, 1 << 16]:
+        assert list(iter_json_array(io.BytesIO(data), chunk_size)) == items
+    assert list(iter_json_array(io.BytesIO(b"  [ ]  "))) == []
+
+    # gzip is detected from the magic bytes
+    assert list(iter_json_array(maybe_gunzip(io.BytesIO(gzip.compress(data))), 5)) == items
+
+    for broken in [b"{}", b"[{\"a\": 1}", b"[{\"a\": "]:
+        try:
+            list(iter_json_array(io.BytesIO(broken), 4))
+            assert False, f"{broken!r} should not parse"
+        except ValueError:
+            pass
+    print("✅ PASS: incremental JSON array parsing")
+
+
+def test_commander_eligibility():
+    """Legal in commander and legendary creature, or explicitly allowed to be a commander"""
+    legal = {"commander": "legal"}
+    assert is_commander_eligible({"type_line": "Legendary Creature — Angel", "legalities": legal})
+    assert not is_commander_eligible({"type_line": "Legendary Creature — Angel", "legalities": {"commander": "banned"}})
+    assert not is_commander_eligible({"type_line": "Creature — Angel", "legalities": legal})
+    assert not is_commander_eligible({"type_line": "Legendary Artifact", "legalities": legal})
+    assert is_commander_eligible({
+        "type_line": "Legendary Planeswalker — Teferi",
+        "oracle_text": "Teferi, Temporal Archmage can be your commander.",
+        "legalities": legal
+    })
+    assert is_commander_eligible({
+        "type_line": "Legendary Creature — Human // Legendary Planeswalker — Nissa",
+        "card_faces": [{"type_line": "Legendary Creature — Human Druid"}, {"type_line": "Legendary Planeswalker — Nissa"}],
+        "legalities": legal
+    })
+    print("✅ PASS: commander eligibility rules")
+
+
+def test_bulk_load_is_in_name_order():
+    """Commanders from an unsorted bulk file are served in name order, like the search loader's"""
+    names = ["Zur the Enchanter", "Atraxa, Praetors' Voice", "Muldrotha, the Gravetide", "Atraxa, Grand Unifier"]
+    identities = [["W", "U", "B"], ["W", "U", "B", "G"], ["U", "B", "G"], ["G", "U"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk_path = os.path.join(tmp, "oracle-cards.json")
+        cards = []
+        for i, (name, identity) in enumerate(zip(names, identities)):
+            card = make_card(i, True)
+            card.update(name=name, color_identity=identity)
+            cards.append(card)
+        with open(bulk_path, "w", encoding="utf-8") as f:
+            json.dump(cards, f)
+
+        db = CommanderDatabase(card_store_path=os.path.join(tmp, "commander_cards.jsonl"))
+        assert db.load_commanders_from_bulk(bulk_path)
+
+        assert list(db.commanders) == sorted(name.lower() for name in names)
+        assert list(db.commander_cards) == list(db.commanders)
+        # Partial-name lookups and searches return the first match in name order
+        assert db.table.get_colors("atraxa") == "GU"
+        assert [match["name"] for match in db.search_commanders("atraxa", limit=1)] == ["Atraxa, Grand Unifier"]
+    print("✅ PASS: bulk load in name order")
+
+
+def test_flushes_only_sort_what_they_publish():
+    """Partial flushes are sorted when served on a cold load, not during a refresh of a complete table"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk_path = os.path.join(tmp, "oracle-cards.json")
+        cards = [make_card(i, True) for i in range(20, 0, -1)]
+        with open(bulk_path, "w", encoding="utf-8") as f:
+            json.dump(cards, f)
+
+        db = CommanderDatabase()
+        installed = []
+        original_install, original_sort = db._install, CommanderDatabase._in_name_order
+        sorts = []
+
+        def install(commanders, commander_cards, *args):
+            installed.append(list(commanders))
+            original_install(commanders, commander_cards, *args)
+
+        def in_name_order(commanders, commander_cards):
+            sorts.append(len(commanders))
+            return original_sort(commanders, commander_cards)
+
+        with mock.patch.object(commanders_module, "PARTIAL_PUBLISH_EVERY", 5), \
+                mock.patch.object(db, "_install", install), \
+                mock.patch.object(CommanderDatabase, "_in_name_order", staticmethod(in_name_order)):
+            assert db.load_commanders_from_bulk(bulk_path)
+            assert sorts == [5, 10, 15, 20, 20]  # four partial tables served, then the final one
+            assert all(names == sorted(names) for names in installed)
+
+            sorts.clear()
+            assert db.load_commanders_from_bulk(bulk_path)
+            assert sorts == [20]  # the refresh's flushes are thrown away unsorted
+    print("✅ PASS: only published flushes are sorted")
+
+
+def test_bulk_load_has_bounded_memory():
+    """A large bulk file loads in one pass with memory far below the file size"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk_path = os.path.join(tmp, "oracle-cards.json.gz")
+        count = 12000
+        raw_size = write_fixture(bulk_path, count)
+        assert raw_size > 40_000_000
+
+        db = CommanderDatabase(card_store_path=os.path.join(tmp, "commander_cards.jsonl"))
+
+        tracemalloc.start()
+        try:
+            assert db.load_commanders_from_bulk(bulk_path)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        print(f"Bulk file: {raw_size / 1e6:.1f} MB uncompressed, peak traced memory: {peak / 1e6:.1f} MB")
+        assert peak < 8_000_000, f"peak {peak} bytes is not bounded"
+
+        assert len(db.commanders) == count // 10
+        assert db.complete
+        assert db.commanders["synthetic card 10 — ærsong"] == "GU"
+        assert "synthetic card 11 — ærsong" not in db.commanders
+        assert db.get_commander_info("Synthetic Card 20 — Ærsong")["flavor_text"] == "x" * 3000
+    print("✅ PASS: streaming bulk load with bounded memory")
+
+
+if __name__ == "__main__":
+    test_iter_json_array_small_chunks()
+    test_commander_eligibility()
+    test_bulk_load_is_in_name_order()
+    test_flushes_only_sort_what_they_publish()
+    test_bulk_load_has_bounded_memory()
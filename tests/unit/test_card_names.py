@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the card-name catalog cache and its /card-names/all download
+"""
+
+import sys
+import os
+import gzip
+import json
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+import app.scryfall as scryfall_module
+from app.card_names import CardNamesCache, card_names_cache
+from app.main import app
+from fakes import catalog
+
+CARD_NAMES = ["Lightning Bolt", "Sol Ring", "Æther Vial"]
+
+
+def test_download_built_once_per_catalog():
+    """The serialized and compressed catalog is built at load time with a content-derived ETag"""
+    cache = CardNamesCache()
+    cache._set_card_names(list(CARD_NAMES))
+    download = cache.download
+
+    assert json.loads(download.body)["data"] == CARD_NAMES
+    assert gzip.decompress(download.gzipped) == download.body
+
+    # Same contents -> same validator; different contents -> new validator
+    other = CardNamesCache()
+    other._set_card_names(list(CARD_NAMES))
+    assert other.download.etag == download.etag
+    other._set_card_names(CARD_NAMES + ["Counterspell"])
+    assert other.download.etag != download.etag
+    print("✅ PASS: catalog download is prebuilt with a strong ETag")
+
+
+def test_card_names_all_endpoint_revalidates():
+    """/card-names/all serves gzip with an ETag and answers revalidation with 304"""
+    original = card_names_cache.catalog
+    card_names_cache._set_card_names(list(CARD_NAMES))
+    client = TestClient(app)
+
+    try:
+        response = client.get("/card-names/all", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["data"] == CARD_NAMES
+
+        etag = response.headers["etag"]
+        revalidated = client.get("/card-names/all", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+
+        stale = client.get("/card-names/all", headers={"If-None-Match": '"stale"', "Accept-Encoding": "identity"})
+        assert stale.status_code == 200
+        assert "content-encoding" not in stale.headers
+
+        # Each encoding has its own strong validator; either one revalidates
+        assert stale.headers["etag"] == card_names_cache.download.etag != etag
+        assert etag == card_names_cache.download.gzip_etag
+        assert client.get("/card-names/all", headers={"If-None-Match": stale.headers["etag"]}).status_code == 304
+    finally:
+        card_names_cache.catalog = original
+    print("✅ PASS: /card-names/all revalidates with 304")
+
+
+def test_card_names_all_accept_encoding_qvalues():
+    """gzip is only sent when Accept-Encoding allows it with a q-value above 0"""
+    original = card_names_cache.catalog
+    card_names_cache._set_card_names(list(CARD_NAMES))
+    client = TestClient(app)
+
+    try:
+        for accept_encoding, gzipped in [("gzip", True), ("br, gzip;q=0.5", True), ("*", True),
+                                         ("gzip;q=0", False), ("gzip; q=0.0, identity", False),
+                                         ("*;q=0.1, gzip;q=0", False), ("br", False)]:
+            response = client.get("/card-names/all", headers={"Accept-Encoding": accept_encoding})
+            assert (response.headers.get("content-encoding") == "gzip") == gzipped, accept_encoding
+            assert response.json()["data"] == CARD_NAMES
+    finally:
+        card_names_cache.catalog = original
+    print("✅ PASS: /card-names/all honours Accept-Encoding q-values")
+
+
+def test_snapshot_round_trip_and_change_detection():
+    """A refreshed catalog is persisted, reloaded from disk, and only swapped when it changed"""
+    original_get = scryfall_module.requests.get
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "card_names.json.gz")
+        try:
+            scryfall_module.requests.get = lambda *args, **kwargs: catalog(CARD_NAMES)
+            cache = CardNamesCache(snapshot_path=path)
+            assert cache.load_snapshot() is False  # nothing on disk yet
+            assert cache.load_card_names() is True
+            assert os.path.exists(path)
+
+            # A fresh process warm-starts from the snapshot without any network call
+            scryfall_module.requests.get = None
+            warm = CardNamesCache(snapshot_path=path)
+            assert warm.load_snapshot() is True
+            assert warm.loaded and warm.card_names == CARD_NAMES
+            assert warm.download.etag == cache.download.etag
+            assert warm.fetched_at == cache.fetched_at
+            assert warm.search_card_names("sol") == ["Sol Ring"]
+
+            # Unchanged refresh keeps the same catalog object
+            scryfall_module.requests.get = lambda *args, **kwargs: catalog(CARD_NAMES)
+            before = warm.card_names
+            version = warm.catalog.version
+            assert warm.load_card_names(source_signal="bulk:1") is True
+            assert warm.card_names is before
+            assert warm.catalog.version == version
+            assert warm.source_signal == "bulk:1"
+
+            # Changed refresh publishes a new catalog version, freshness included; a
+            # reader holding the old one keeps a consistent view of it
+            pinned = warm.catalog
+            scryfall_module.requests.get = lambda *args, **kwargs: catalog(CARD_NAMES + ["Counterspell"])
+            assert warm.load_card_names(source_signal="bulk:2") is True
+            assert warm.card_names[-1] == "Counterspell"
+            assert warm.catalog.version > pinned.version
+            assert "Counterspell" not in pinned.name_set and len(pinned.card_names) == 3
+            assert pinned.source_signal == "bulk:1" and warm.catalog.source_signal == "bulk:2"
+            assert warm.catalog.fetched_at >= pinned.fetched_at
+            assert warm.is_exact_card_name("Counterspell")
+
+            # A failed refresh keeps serving what is loaded
+            def failing_get(*args, **kwargs):
+                raise ConnectionError("scryfall down")
+            scryfall_module.requests.get = failing_get
+            assert warm.load_card_names() is False
+            assert warm.loaded and len(warm.card_names) == 4
+        finally:
+            scryfall_module.requests.get = original_get
+    print("✅ PASS: card name snapshots and change detection")
+
+
+if __name__ == "__main__":
+    test_download_built_once_per_catalog()
+    test_card_names_all_endpoint_revalidates()
+    test_card_names_all_accept_encoding_qvalues()
+    test_snapshot_round_trip_and_change_detection()
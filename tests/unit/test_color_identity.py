@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for color-identity masks and the commander identity buckets
+"""
+
+import sys
+import os
+import random
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app.color_identity import identity_mask, mask_colors, parse_identity, submasks
+from app.commanders import CommanderTable, commander_db
+from app.main import app
+
+
+def test_masks_and_parsing():
+    """Letters, color words and guild/shard/wedge names all parse to the same masks"""
+    assert identity_mask("WUBG") == identity_mask("GBUW") == 0b10111
+    assert mask_colors(identity_mask("GUW")) == "WUG"
+    assert parse_identity("esper") == parse_identity("wub") == parse_identity("white, blue black")
+    assert parse_identity("sultai") == identity_mask("BGU")
+    assert parse_identity("colorless") == parse_identity("c") == 0
+    assert sorted(submasks(identity_mask("WU"))) == [0, 1, 2, 3]
+    assert len(list(submasks(31))) == 32
+
+    for bad in ["", "purple", "wx"]:
+        try:
+            parse_identity(bad)
+            assert False, f"{bad!r} should not parse"
+        except ValueError:
+            pass
+    print("✅ PASS: color identity masks")
+
+
+def random_table(size=3000, seed=7):
+    rng = random.Random(seed)
+    commanders = {}
+    for i in range(size):
+        colors = "".join(c for c in "WUBRG" if rng.random() < 0.4)
+        commanders[f"commander {i:04d}"] = colors
+    return CommanderTable(1, commanders, {})
+
+
+def test_buckets_match_full_scan():
+    """Bucket queries return exactly what comparing every identity string would"""
+    table = random_table()
+    assert sum(table.bucket_counts) == 3000
+
+    for mask in range(32):
+        allowed = set(mask_colors(mask))
+        subset = sorted(k for k, c in table.commanders.items() if set(c) <= allowed)
+        exact = sorted(k for k, c in table.commanders.items() if identity_mask(c) == mask)
+        assert table.commanders_by_identity(mask, "subset") == subset
+        assert table.commanders_by_identity(mask, "exact") == exact
+        assert table.count_by_identity(mask, "subset") == len(subset)
+
+    four_color = sorted(k for k, c in table.commanders.items() if len(c) == 4)
+    assert table.commanders_by_identity(4, "count") == four_color
+    print("✅ PASS: identity buckets match a full scan")
+
+
+def test_commanders_identity_endpoint():
+    """/commanders answers identity_subset, identity_exact and color_count"""
+    original = commander_db.table
+    commander_db._install({
+        "atraxa, praetors' voice": "WUBG",
+        "sen triplets": "WUB",
+        "teferi, temporal archmage": "U",
+        "karn, silver golem": "",
+        "tatyova, benthic druid": "GU",
+    }, {})
+    client = TestClient(app)
+
+    try:
+        esper = client.get("/commanders", params={"identity_subset": "esper"}).json()
+        assert esper["mode"] == "subset" and esper["identity"] == "WUB"
+        assert [r["colors"] for r in esper["results"]] == ["", "WUB", "U"]
+        assert esper["total"] == 3
+
+        simic = client.get("/commanders", params={"identity_exact": "simic"}).json()
+        assert [r["colors"] for r in simic["results"]] == ["GU"]
+
+        four = client.get("/commanders", params={"color_count": 4}).json()
+        assert [r["colors"] for r in four["results"]] == ["WUBG"]
+
+        assert client.get("/commanders", params={"identity_subset": "purple"}).status_code == 400
+        assert client.get("/commanders").json()["identity_counts"][""] == 1
+    finally:
+        commander_db.table = original
+    print("✅ PASS: /commanders identity queries")
+
+
+if __name__ == "__main__":
+    test_masks_and_parsing()
+    test_buckets_match_full_scan()
+    test_commanders_identity_endpoint()
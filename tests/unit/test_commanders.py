@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the commander database: Scryfall paging, snapshots and warm start
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+import app.commanders as commanders_module
+from app.commander_records import CommanderRecord
+from app.commanders import CommanderDatabase, CommanderTable, SLIM_CARD_FIELDS
+from fakes import list_page
+
+
+def make_card(name, color_identity):
+    return {
+        "object": "card",
+        "id": f"id-{name}",
+        "name": name,
+        "mana_cost": "{1}",
+        "cmc": 1.0,
+        "type_line": "Legendary Creature",
+        "color_identity": list(color_identity),
+        "image_uris": {"small": "s.jpg", "normal": "n.jpg", "large": "l.jpg", "png": "p.png"},
+        "prices": {"usd": "1.00"},
+        "legalities": {"commander": "legal"},
+    }
+
+
+PAGES = [
+    [make_card("Atraxa, Praetors' Voice", "WUBG"), make_card("Chulane, Teller of Tales", "WUG")],
+    [make_card("Krenko, Mob Boss", "R")],
+]
+
+
+def fake_scryfall(pages, failing=False):
+    def get(url, params=None, **kwargs):
+        if failing:
+            return list_page([], status_code=503)
+        page = params["page"]
+        return list_page(pages[page - 1], has_more=page < len(pages), total_cards=sum(len(p) for p in pages))
+    return get
+
+
+def with_fake_scryfall(get, fn):
+    original_get, original_sleep = commanders_module.requests.get, commanders_module.time.sleep
+    commanders_module.requests.get = get
+    commanders_module.time.sleep = lambda seconds: None
+    try:
+        return fn()
+    finally:
+        commanders_module.requests.get = original_get
+        commanders_module.time.sleep = original_sleep
+
+
+def test_cards_are_slimmed():
+    """The table keeps only the exposed fields; without a disk store the full card stays in memory"""
+    db = CommanderDatabase()
+    assert with_fake_scryfall(fake_scryfall(PAGES), db.load_commanders_at_startup)
+
+    card = db.commander_cards["atraxa, praetors' voice"].to_dict()
+    assert set(card) <= set(SLIM_CARD_FIELDS)
+    assert "prices" not in card and "legalities" not in card
+    assert set(card["image_uris"]) == {"small", "normal"}
+    assert db.commanders["krenko, mob boss"] == "R"
+
+    full = db.get_commander_info("Atraxa, Praetors' Voice")
+    assert full["prices"] == {"usd": "1.00"} and full["legalities"] == {"commander": "legal"}
+    print("✅ PASS: commander cards keep only slim fields")
+
+
+def test_snapshot_warm_start_and_change_detection():
+    """A loaded table is persisted, warm-started from disk, and only swapped when it changed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "commanders.json.gz")
+
+        db = CommanderDatabase(snapshot_path=path)
+        assert db.load_snapshot() is False
+        assert with_fake_scryfall(fake_scryfall(PAGES), db.load_commanders_at_startup)
+
+        warm = CommanderDatabase(snapshot_path=path)
+        assert warm.load_snapshot() is True
+        assert warm.loaded
+        assert warm.commanders == db.commanders
+        assert warm.commander_cards == db.commander_cards
+        assert warm.get_commander_colors("atraxa") == "WUBG"
+        
+        # The cheap freshness signal is kept with the snapshot and matches the source
+        assert warm.source_signal == db.source_signal == "search:3"
+        assert with_fake_scryfall(fake_scryfall(PAGES), warm.fetch_source_signal) == warm.source_signal
+
+        # Unchanged refresh keeps the same table objects
+        before = warm.commanders
+        assert with_fake_scryfall(fake_scryfall(PAGES), warm.load_commanders_at_startup)
+        assert warm.commanders is before
+
+        # Changed refresh swaps, and cached lookups see the new data
+        changed = [PAGES[0], [make_card("Krenko, Mob Boss", "BR")]]
+        assert with_fake_scryfall(fake_scryfall(changed), warm.load_commanders_at_startup)
+        assert warm.commanders is not before
+        assert warm.get_commander_colors("krenko, mob boss") == "BR"
+
+        # A failing refresh keeps the loaded table instead of replacing it with nothing
+        assert with_fake_scryfall(fake_scryfall(changed, failing=True), warm.load_commanders_at_startup) is False
+        assert len(warm.commanders) == 3
+    print("✅ PASS: commander snapshot warm start and change detection")
+
+
+def test_full_card_read_lazily_from_store():
+    """/commanders/{name} gets the full card JSON from the disk store, not from memory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CommanderDatabase(
+            snapshot_path=os.path.join(tmp, "commanders.json.gz"),
+            card_store_path=os.path.join(tmp, "commander_cards.jsonl")
+        )
+        assert with_fake_scryfall(fake_scryfall(PAGES), db.load_commanders_at_startup)
+
+        record = db.commander_cards["atraxa, praetors' voice"]
+        assert not hasattr(record, "__dict__")
+        assert record.color_identity == "WUBG"
+
+        full = db.get_commander_info("Atraxa, Praetors' Voice")
+        assert full["prices"] == {"usd": "1.00"}
+        assert full["legalities"] == {"commander": "legal"}
+
+        # A restarted worker finds the store through the snapshot
+        warm = CommanderDatabase(
+            snapshot_path=os.path.join(tmp, "commanders.json.gz"),
+            card_store_path=os.path.join(tmp, "commander_cards.jsonl")
+        )
+        assert warm.load_snapshot()
+        assert warm.get_commander_info("krenko, mob boss")["prices"] == {"usd": "1.00"}
+        assert warm.get_commander_info("nobody") is None
+    print("✅ PASS: full commander cards are read lazily from disk")
+
+
+def test_paged_load_streams_full_cards_to_store():
+    """Each page's full cards are written as it arrives; an abandoned refresh keeps the old store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CommanderDatabase(card_store_path=os.path.join(tmp, "commander_cards.jsonl"))
+        stored = []
+        writer = db.card_store.writer
+        
+        @contextmanager
+        def spy_writer():
+            with writer() as add:
+                yield lambda name_key, card: (stored.append(name_key), add(name_key, card))
+        
+        db.card_store.writer = spy_writer
+        seen = []
+        
+        def get(url, params=None, **kwargs):
+            seen.append(len(stored))
+            return fake_scryfall(PAGES)(url, params=params, **kwargs)
+        
+        assert with_fake_scryfall(get, db.load_commanders_at_startup)
+        # Page 1 was already on its way to disk before page 2 was fetched
+        assert seen == [0, 2]
+        assert db.get_commander_info("krenko, mob boss")["prices"] == {"usd": "1.00"}
+
+        # A refresh that stops part way doesn't replace the store of the table still served
+        def failing_after_first_page(url, params=None, **kwargs):
+            if params["page"] > 1:
+                return list_page([], status_code=503)
+            cheaper = [dict(card, prices={"usd": "0.10"}) for card in PAGES[0]]
+            return list_page(cheaper, has_more=True, total_cards=3)
+        
+        assert with_fake_scryfall(failing_after_first_page, db.load_commanders_at_startup) is False
+        assert db.get_commander_info("Atraxa, Praetors' Voice")["prices"] == {"usd": "1.00"}
+        assert db.get_commander_info("krenko, mob boss")["prices"] == {"usd": "1.00"}
+    print("✅ PASS: paged loads stream full cards to the store")
+
+
+def test_partial_table_served_while_loading():
+    """Pages are published as they arrive on a cold start, with a coverage fraction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "commanders.json.gz")
+        db = CommanderDatabase(snapshot_path=path)
+        seen = []
+        
+        def get(url, params=None, **kwargs):
+            seen.append((db.loaded, db.complete, db.coverage, dict(db.commanders)))
+            return fake_scryfall(PAGES)(url, params=params, **kwargs)
+        
+        assert with_fake_scryfall(get, db.load_commanders_at_startup)
+        
+        # Before page 2 is fetched, page 1 is already being served
+        loaded, complete, coverage, commanders = seen[1]
+        assert loaded and not complete
+        assert abs(coverage - 2 / 3) < 1e-9
+        assert set(commanders) == {"atraxa, praetors' voice", "chulane, teller of tales"}
+        assert db.complete and db.coverage == 1.0 and len(db.commanders) == 3
+        
+        # A refresh of a complete table is built off to the side
+        seen.clear()
+        before = db.commanders
+        assert with_fake_scryfall(get, db.load_commanders_at_startup)
+        assert all(entry[1] and entry[2] == 1.0 for entry in seen)
+        assert db.commanders is before
+    
+    # A load that dies half way keeps serving the partial table but never snapshots it
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "commanders.json.gz")
+        db = CommanderDatabase(snapshot_path=path)
+        
+        def flaky(url, params=None, **kwargs):
+            if params["page"] > 1:
+                return list_page([], status_code=503)
+            return fake_scryfall(PAGES)(url, params=params, **kwargs)
+        
+        with_fake_scryfall(flaky, db.load_commanders_at_startup)
+        assert db.loaded and not db.complete
+        assert len(db.commanders) == 2
+        assert db.get_commander_colors("chulane") == "WUG"
+        assert not os.path.exists(path)
+    print("✅ PASS: partial commander table served while loading")
+
+
+def test_versioned_tables_swap_atomically():
+    """Readers keep a consistent table version while refreshes publish new ones"""
+    db = CommanderDatabase()
+    assert db.table.version == 0 and not db.loaded
+    assert with_fake_scryfall(fake_scryfall(PAGES), db.load_commanders_at_startup)
+    
+    pinned = db.table
+    assert pinned.get_colors("krenko") == "R"
+    assert pinned.source_signal == "search:3" and pinned.fetched_at is not None
+    
+    # An unchanged reload republishes the same version with the new fetch time
+    assert with_fake_scryfall(fake_scryfall(PAGES), db.load_commanders_at_startup)
+    confirmed = db.table
+    assert confirmed is not pinned and confirmed.version == pinned.version
+    assert confirmed.commanders is pinned.commanders and confirmed.fetched_at >= pinned.fetched_at
+    
+    changed = [PAGES[0], [make_card("Krenko, Mob Boss", "BR"), make_card("Zur the Enchanter", "WUB")]]
+    assert with_fake_scryfall(fake_scryfall(changed), db.load_commanders_at_startup)
+    
+    # The old version is untouched, including its memoized lookups and freshness
+    assert db.table.version > pinned.version
+    assert pinned.get_colors("krenko") == "R"
+    assert pinned.source_signal == "search:3" and db.table.source_signal == "search:4"
+    assert db.get_commander_colors("krenko") == "BR"
+    try:
+        db.commanders["new"] = "W"
+        assert False, "published tables must be read-only"
+    except TypeError:
+        pass
+    
+    # Concurrent readers never see commanders and records from different versions
+    tables = [CommanderTable(0, {"a": "W"}, {"a": CommanderRecord({"name": "A"})}),
+              CommanderTable(0, {"b": "U", "c": "G"}, {"b": CommanderRecord({"name": "B"}), "c": CommanderRecord({"name": "C"})})]
+    stop = threading.Event()
+    torn = []
+    
+    def read():
+        while not stop.is_set():
+            table = db.table
+            if set(table.commanders) != set(table.commander_cards):
+                torn.append(table.version)
+    
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(2000):
+        source = tables[i % 2]
+        db._install(dict(source.commanders), dict(source.commander_cards))
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert torn == []
+    print("✅ PASS: commander tables are versioned and swapped atomically")
+
+
+def test_snapshot_version_mismatch_is_ignored():
+    """Snapshots written with another layout are not loaded"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "commanders.json.gz")
+        db = CommanderDatabase(snapshot_path=path)
+        assert with_fake_scryfall(fake_scryfall(PAGES), db.load_commanders_at_startup)
+
+        original_version = commanders_module.SNAPSHOT_VERSION
+        commanders_module.SNAPSHOT_VERSION = original_version + 1
+        try:
+            assert CommanderDatabase(snapshot_path=path).load_snapshot() is False
+        finally:
+            commanders_module.SNAPSHOT_VERSION = original_version
+    print("✅ PASS: stale snapshot versions are ignored")
+
+
+if __name__ == "__main__":
+    test_cards_are_slimmed()
+    test_snapshot_warm_start_and_change_detection()
+    test_full_card_read_lazily_from_store()
+    test_paged_load_streams_full_cards_to_store()
+    test_partial_table_served_while_loading()
+    test_versioned_tables_swap_atomically()
+    test_snapshot_version_mismatch_is_ignored()
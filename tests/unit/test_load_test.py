@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the load-test harness (tests/load/load_test.py)
+"""
+
+import sys
+import os
+import json
+import random
+import socket
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../load'))
+
+import uvicorn
+from fastapi import FastAPI
+
+from load_test import (DEFAULT_MIX, Workload, load_prompts, parse_mix, run_level, run_sweep, save_report,
+                       summarize, upstream_diff)
+
+
+def test_summarize():
+    """Per-endpoint RPS, percentiles and error rate from raw samples"""
+    samples = [("search", (i + 1) / 1000, 200) for i in range(100)]
+    samples += [("card-names", 0.002, 200), ("card-names", 0.004, 503), ("card-names", 0.5, 0)]
+    summary = summarize(samples, elapsed=2.0)
+
+    search = summary["search"]
+    assert search["requests"] == 100 and search["rps"] == 50.0
+    assert search["p50_ms"] == 51.0 and search["p95_ms"] == 95.0 and search["p99_ms"] == 99.0
+    assert search["error_rate"] == 0
+    assert summary["card-names"]["error_rate"] == round(2 / 3, 4)
+    print("✅ PASS: summarize")
+
+
+def test_upstream_diff():
+    """Upstream calls are the stand-in counters' change over the level"""
+    before = {"requests": {"search": {"200": 10}, "named": {"200": 4}}}
+    after = {"requests": {"search": {"200": 25, "429": 2}, "named": {"200": 4}, "catalog": {"200": 1}}}
+    assert upstream_diff(before, after) == {
+        "search": {"calls": 17, "by_status": {"200": 15, "429": 2}},
+        "catalog": {"calls": 1, "by_status": {"200": 1}},
+    }
+    assert upstream_diff({}, {}) == {}
+    print("✅ PASS: upstream diff")
+
+
+def test_workload_mix():
+    """Requests follow the endpoint weights and are reproducible per seed"""
+    assert parse_mix("search=3,analyze-deck=1") == {"search": 3.0, "analyze-deck": 1.0}
+    try:
+        parse_mix("search=1,nowhere=1")
+        assert False, "unknown endpoint should be rejected"
+    except ValueError:
+        pass
+
+    prompts = load_prompts()
+    assert len(prompts) > 20 and len(set(prompts)) == len(prompts)
+    workload = Workload(DEFAULT_MIX, prompts, ["Abjure", "Counterspell", "Sol Ring", "Arcane Signet",
+                                                "Command Tower", "Cultivate", "Swords to Plowshares",
+                                                "Path to Exile", "Rhystic Study", "Cyclonic Rift"])
+    rng = random.Random(1)
+    drawn = [workload.next_request(rng, 0, i) for i in range(2000)]
+    counts = {e: sum(1 for d in drawn if d[0] == e) / len(drawn) for e in DEFAULT_MIX}
+    assert 0.65 < counts["search"] < 0.75 and 0.15 < counts["card-names"] < 0.25
+
+    deck = next(d for d in drawn if d[0] == "analyze-deck")
+    assert deck[1:3] == ("POST", "/analyze-deck") and len(deck[4]) == 10
+    prefix = next(d for d in drawn if d[0] == "card-names")[3]["query"]
+    assert 2 <= len(prefix) <= 6
+
+    again = Workload(DEFAULT_MIX, prompts, workload.card_names)
+    assert [again.next_request(random.Random(1), 0, 0)] == [workload.next_request(random.Random(1), 0, 0)]
+    print("✅ PASS: workload mix")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_sweep_against_server():
+    """A short sweep against a live server records every level and saves a report"""
+    app = FastAPI()
+
+    @app.get("/search")
+    def search(prompt: str):
+        return {"prompt": prompt}
+
+    @app.get("/card-names")
+    def card_names(query: str):
+        time.sleep(0.002)
+        return {"card_names": []}
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        workload = Workload({"search": 1, "card-names": 1, "analyze-deck": 1}, load_prompts(), ["Abjure"] * 10)
+        samples, _ = run_level(f"http://127.0.0.1:{port}", workload, 2, 0.3, seed=1)
+        assert samples and {s[0] for s in samples} == {"search", "card-names", "analyze-deck"}
+        assert all(s[2] == 404 for s in samples if s[0] == "analyze-deck")  # no such route: counted as errors
+
+        levels = run_sweep(f"http://127.0.0.1:{port}", None, workload, [1, 2], 0.3, 0, seed=1)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    assert [level["concurrency"] for level in levels] == [1, 2]
+    assert levels[0]["endpoints"]["analyze-deck"]["error_rate"] == 1.0
+    assert levels[0]["endpoints"]["search"]["error_rate"] == 0 and levels[0]["total_rps"] > 0
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        path = save_report({"started_at": "2026-01-02T03:04:05Z", "git_commit": "abc1234", "levels": levels},
+                           output_dir)
+        assert os.path.basename(path) == "20260102T030405_abc1234.json"
+        with open(path) as f:
+            assert json.load(f)["levels"][1]["concurrency"] == 2
+    print("✅ PASS: sweep against a live server")
+
+
+if __name__ == "__main__":
+    test_summarize()
+    test_upstream_diff()
+    test_workload_mix()
+    test_sweep_against_server()
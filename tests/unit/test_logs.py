@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for leveled, queued logging on the parse and search paths
+"""
+
+import sys
+import os
+import io
+import json
+import logging
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app.logs import configure_logging, shutdown_logging
+from app.main import app
+from app.nlp import extract_filters_fallback
+from app.query_builder import QueryBuilder
+
+
+class CountingPayload:
+    """Counts how often a log call turned it into text"""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "payload"
+
+
+def capture(level, json_lines=False):
+    stream = io.StringIO()
+    configure_logging(level=level, json_lines=json_lines, stream=stream)
+    return stream
+
+
+def test_debug_payloads_are_lazy():
+    """Disabled debug calls never format their arguments; enabled ones do"""
+    payload = CountingPayload()
+    try:
+        stream = capture("INFO")
+        logging.getLogger("app.nlp").debug("🔍 %s", payload)
+        shutdown_logging()
+        assert payload.formatted == 0 and stream.getvalue() == ""
+
+        stream = capture("DEBUG")
+        logging.getLogger("app.nlp").debug("🔍 %s", payload)
+        shutdown_logging()
+        assert payload.formatted == 1 and "🔍 payload" in stream.getvalue()
+    finally:
+        configure_logging()
+    print("✅ PASS: debug payloads are built only when enabled")
+
+
+def test_parsers_log_only_at_debug():
+    """Parsing writes nothing at INFO and traces both parsers at DEBUG"""
+    try:
+        stream = capture("INFO")
+        extract_filters_fallback("azorius counterspell")
+        QueryBuilder().parse("azorius counterspell")
+        shutdown_logging()
+        assert stream.getvalue() == ""
+
+        stream = capture("DEBUG")
+        extract_filters_fallback("azorius counterspell")
+        QueryBuilder().parse("azorius counterspell")
+        shutdown_logging()
+        output = stream.getvalue()
+        assert "🎨 extract_color_identity called with: 'azorius counterspell'" in output
+        assert "🔧 QueryBuilder parsing: 'azorius counterspell'" in output
+        assert " DEBUG   app.query_builder: " in output
+    finally:
+        configure_logging()
+    print("✅ PASS: parser traces are DEBUG records")
+
+
+def test_json_lines_with_fields():
+    """JSON output has one object per record with the structured fields merged in"""
+    filters = {"colors": "U"}
+    try:
+        stream = capture("DEBUG", json_lines=True)
+        logging.getLogger("app.main").debug("API: Scryfall query: %s", "c=U", extra={"fields": {"filters": filters}})
+        filters["colors"] = "R"  # changed after the call; the record keeps what was logged
+        shutdown_logging()
+        entry = json.loads(stream.getvalue())
+        assert entry["level"] == "DEBUG" and entry["logger"] == "app.main"
+        assert entry["msg"] == "API: Scryfall query: c=U"
+        assert entry["filters"] == {"colors": "U"}
+    finally:
+        configure_logging()
+    print("✅ PASS: structured JSON log lines")
+
+
+def test_color_debug_only_on_request():
+    """_debug_color is attached only for debug callers such as /debug-nlp"""
+    assert "_debug_color" not in extract_filters_fallback("red creature")
+    assert extract_filters_fallback("red creature", debug=True)["_debug_color"]["input"] == "red creature"
+
+    response = TestClient(app).get("/debug-nlp", params={"prompt": "red creature"})
+    assert "_debug_color" in response.json()["filters"]
+    print("✅ PASS: color diagnostics only when requested")
+
+
+if __name__ == "__main__":
+    test_debug_payloads_are_lazy()
+    test_parsers_log_only_at_debug()
+    test_json_lines_with_fields()
+    test_color_debug_only_on_request()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for memory accounting, /admin/memory and the memory metrics
+"""
+
+import sys
+import os
+import tracemalloc
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app import config
+from app.commander_records import CommanderRecord
+from app.commanders import CommanderTable, commander_db
+from app.main import app
+from app.memory import MemorySampler, deep_sizeof, measure, memory_sampler
+from fakes import ADMIN, TOKEN
+
+STRUCTURES = {
+    "commander_db.commanders", "commander_db.commander_cards", "card_names_cache.card_names",
+    "commander_db.identity_buckets", "commander_db.name_index", "card_names_cache.prefix_index",
+    "suggest_index", "card_names_cache.download", "suggest_index.results", "typeahead_sessions",
+    "commander_db.colors_memo",
+}
+
+
+def commander_table(count):
+    commanders = {f"commander {i}": "WUBRG"[:1 + i % 5] for i in range(count)}
+    cards = {name: CommanderRecord({"name": name.title(), "oracle_text": f"Ability number {i} " * 10})
+             for i, name in enumerate(commanders)}
+    return CommanderTable(1, commanders, cards)
+
+
+def by_name(report):
+    return {entry["name"]: entry for entry in report["retained"]}
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    """Objects reachable from several structures are counted for the first one measured"""
+    shared = "x" * 10000
+    first, second = [shared], {"key": shared}
+    alone = deep_sizeof(second)
+    assert alone > 10000 and deep_sizeof(first) > 10000
+
+    seen = set()
+    assert deep_sizeof(first, seen) > 10000
+    assert deep_sizeof(second, seen) < alone - 10000
+    assert deep_sizeof(CommanderRecord({"name": "Atraxa", "oracle_text": "y" * 5000})) > 5000
+    print("✅ PASS: deep_sizeof counts shared objects once")
+
+
+def test_measure_reports_every_structure():
+    """A report covers every structure by kind, and grows with the data"""
+    with mock.patch.object(commander_db, "table", commander_table(10)):
+        small = by_name(measure())
+    with mock.patch.object(commander_db, "table", commander_table(1000)):
+        report = measure()
+    large = by_name(report)
+
+    assert set(large) == STRUCTURES
+    assert large["commander_db.commander_cards"]["kind"] == "data"
+    assert large["commander_db.name_index"]["kind"] == "index"
+    assert large["typeahead_sessions"]["kind"] == "cache"
+    assert large["commander_db.commander_cards"]["bytes"] > 50 * small["commander_db.commander_cards"]["bytes"]
+    assert large["commander_db.commanders"]["bytes"] > 50 * small["commander_db.commanders"]["bytes"]
+    assert report["retained_total_bytes"] == sum(entry["bytes"] for entry in report["retained"])
+    if report["rss_bytes"] is not None:
+        assert report["rss_bytes"] > report["retained_total_bytes"]
+    assert report["tracemalloc"] == {"tracing": False, "top": []} or report["tracemalloc"]["tracing"]
+    print("✅ PASS: memory report")
+
+
+def test_tracemalloc_top_allocators():
+    """With tracemalloc on, the report lists the source lines holding the most memory"""
+    was_tracing = tracemalloc.is_tracing()
+    sampler = MemorySampler(interval=0, tracemalloc_frames=1)
+    sampler.start()
+    try:
+        hoard = [bytes(1000) + bytes([i % 256]) for i in range(2000)]
+        report = sampler.sample()
+        top = report["tracemalloc"]
+        assert top["tracing"] and top["traced_bytes"] >= 2_000_000
+        assert any("test_memory.py:" in entry["where"] for entry in top["top"])
+        assert sampler.last is report and sampler.samples == 1
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    print("✅ PASS: tracemalloc top allocators")
+
+
+def test_admin_endpoint_health_and_metrics():
+    """/admin/memory needs the admin token; /health-check and /metrics report the last sample"""
+    client = TestClient(app)
+    with mock.patch.object(config, "ADMIN_TOKEN", TOKEN), \
+            mock.patch.object(memory_sampler, "last", None), mock.patch.object(memory_sampler, "samples", 0):
+        assert client.get("/admin/memory").status_code == 403
+        fresh = client.get("/admin/memory", headers=ADMIN).json()
+        assert set(by_name(fresh)) == STRUCTURES and fresh["samples"] == 0
+        assert client.get("/health-check").json()["memory"]["retained_total_bytes"] is None
+
+        sample = memory_sampler.sample()
+        assert client.get("/admin/memory", headers=ADMIN).json()["sampled_at"] == sample["sampled_at"]
+        memory = client.get("/health-check").json()["memory"]
+        assert memory["retained_total_bytes"] == sample["retained_total_bytes"]
+
+        metrics = client.get("/metrics").text
+        assert 'mtgnlp_memory_retained_bytes{structure="commander_db.commander_cards",kind="data"}' in metrics
+        if sample["rss_bytes"] is not None:
+            assert "mtgnlp_process_resident_memory_bytes " in metrics
+    with mock.patch.object(config, "ADMIN_TOKEN", ""):
+        assert client.get("/admin/memory", headers=ADMIN).status_code == 404
+    print("✅ PASS: /admin/memory, /health-check and /metrics")
+
+
+if __name__ == "__main__":
+    test_deep_sizeof_counts_shared_objects_once()
+    test_measure_reports_every_structure()
+    test_tracemalloc_top_allocators()
+    test_admin_endpoint_health_and_metrics()
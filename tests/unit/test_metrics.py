@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Prometheus-style metrics and /metrics
+"""
+
+import sys
+import os
+import threading
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.deck_analyzer import DeckAnalyzer
+from app.main import app
+from app.metrics import Counter, Histogram, render
+from app.scryfall import scryfall_get
+from app.typeahead import TypeaheadSessions
+from fakes import named_card
+
+
+def unregister(*created):
+    for metric in created:
+        metrics.REGISTRY.remove(metric)
+
+
+def test_thread_shards_add_up():
+    """Counts recorded without locks from many threads sum exactly"""
+    counter = Counter("test_events_total", "Events", ["kind"])
+    histogram = Histogram("test_seconds", "Durations", ["kind"], buckets=(0.1, 1.0))
+    try:
+        def work():
+            for i in range(10000):
+                counter.inc("a")
+                histogram.observe(0.05 if i % 2 else 0.5, "a")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.values() == {("a",): 80000}
+        buckets = histogram.values()[("a",)]
+        assert buckets[:3] == [40000, 40000, 0] and abs(buckets[-1] - 22000) < 1e-6
+    finally:
+        unregister(counter, histogram)
+    print("✅ PASS: per-thread shards add up")
+
+
+def test_exited_threads_are_folded():
+    """Shards of finished threads are folded into a retired total, so they don't pile up"""
+    counter = Counter("test_retired_total", "Events", ["kind"])
+    histogram = Histogram("test_retired_seconds", "Durations", ["kind"], buckets=(0.1, 1.0))
+    try:
+        def work():
+            counter.inc("a")
+            histogram.observe(0.5, "a")
+
+        for batch in range(20):
+            threads = [threading.Thread(target=work) for _ in range(100)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert len(counter._shards) <= 100 and len(histogram._shards) <= 100
+
+        counter.inc("a")  # from this (live) thread
+        assert counter.values() == {("a",): 2001}
+        assert histogram.values()[("a",)][:3] == [0, 2000, 0]
+        assert len(counter._shards) == 1 and len(histogram._shards) == 0
+        assert counter.values() == {("a",): 2001}  # folding twice doesn't double count
+    finally:
+        unregister(counter, histogram)
+    print("✅ PASS: exited threads are folded into the retired total")
+
+
+def test_exposition_format():
+    """Histograms render cumulative buckets, sum and count; labels are escaped"""
+    counter = Counter("test_calls_total", "Calls", ["caller", "status"])
+    histogram = Histogram("test_latency_seconds", "Latency", ["caller"], buckets=(0.1, 1.0))
+    try:
+        counter.inc("say \"hi\"", "200", amount=3)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, "search")
+        text = render()
+        assert '# TYPE test_calls_total counter' in text
+        assert 'test_calls_total{caller="say \\"hi\\"",status="200"} 3' in text
+        assert '# TYPE test_latency_seconds histogram' in text
+        assert 'test_latency_seconds_bucket{caller="search",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{caller="search",le="1.0"} 2' in text
+        assert 'test_latency_seconds_bucket{caller="search",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_sum{caller="search"} 5.55' in text
+        assert 'test_latency_seconds_count{caller="search"} 3' in text
+    finally:
+        unregister(counter, histogram)
+    print("✅ PASS: exposition format")
+
+
+def test_scryfall_calls_by_caller():
+    """Every Scryfall call is counted and timed under its caller, failures included"""
+    before = dict(metrics.SCRYFALL_REQUESTS.values())
+
+    def delta(caller, status):
+        return metrics.SCRYFALL_REQUESTS.values().get((caller, status), 0) - before.get((caller, status), 0)
+
+    with mock.patch("requests.get", return_value=named_card("Sol Ring", 1, status_code=404)):
+        scryfall_get("catalog", "http://scryfall.invalid/catalog/card-names")
+    with mock.patch("requests.get", side_effect=ConnectionError("down")):
+        try:
+            scryfall_get("catalog", "http://scryfall.invalid/catalog/card-names")
+        except ConnectionError:
+            pass
+    with mock.patch("requests.get", return_value=named_card("Sol Ring", 1)), mock.patch("time.sleep"):
+        DeckAnalyzer().analyze_deck_list(["Sol Ring"])
+
+    assert delta("catalog", "404") == 1 and delta("catalog", "error") == 1
+    assert delta("deck_analyzer", "200") == 1
+    assert metrics.RATE_LIMIT_WAIT_SECONDS.values()[("deck_analyzer",)][-1] >= 0.1
+    print("✅ PASS: Scryfall calls by caller")
+
+
+def test_caches_count_events():
+    """Typeahead sessions report hits, misses and evictions"""
+    events = metrics.CACHE_EVENTS
+    before = dict(events.values())
+    sessions = TypeaheadSessions(max_sessions=1)
+    source = object()
+    sessions.get("a", source)
+    sessions.put("a", source, "q", [1])
+    sessions.get("a", source)
+    sessions.put("b", source, "q", [1])
+    after = events.values()
+    for event in ("hit", "miss", "eviction"):
+        assert after[("typeahead", event)] - before.get(("typeahead", event), 0) == 1
+    print("✅ PASS: cache events")
+
+
+def test_metrics_endpoint():
+    """/metrics reports per-route latency, parse time (/debug-nlp runs the nlp parser) and in-flight gauges"""
+    client = TestClient(app)
+    client.get("/debug-nlp", params={"prompt": "azorius counterspell"})
+    client.get("/commanders/atraxa")
+    client.get("/no-such-page")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'mtgnlp_http_requests_total{endpoint="/debug-nlp",status="200"}' in text
+    assert 'mtgnlp_http_request_duration_seconds_count{endpoint="/commanders/{commander_name}"}' in text
+    assert 'endpoint="other",status="404"' in text
+    assert 'mtgnlp_http_requests_in_flight{endpoint="/metrics"} 1' in text  # the scrape itself
+    assert 'mtgnlp_parse_duration_seconds_count{parser="nlp"}' in text
+    assert 'mtgnlp_cache_entries{cache="typeahead"}' in text
+    print("✅ PASS: /metrics endpoint")
+
+
+if __name__ == "__main__":
+    test_thread_shards_add_up()
+    test_exited_threads_are_folded()
+    test_exposition_format()
+    test_scryfall_calls_by_caller()
+    test_caches_count_events()
+    test_metrics_endpoint()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the precompiled single-pass lexer behind extract_filters_fallback
+
+fixtures/nlp_fallback_golden.json holds the output of the per-pattern parser
+(one re.search per pattern) for every prompt string in the unit tests plus
+edge cases, with and without a small commander database loaded.
+"""
+
+import sys
+import os
+import io
+import json
+import re
+import time
+import contextlib
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from app.commanders import CommanderTable, commander_db
+from app.nlp import _lexer_patterns, extract_filters_fallback, lex
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'nlp_fallback_golden.json')
+
+
+def load_golden():
+    with open(GOLDEN_PATH) as f:
+        return json.load(f)
+
+
+def run_parser(prompts):
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for prompt in prompts:
+            results.append(extract_filters_fallback(prompt, debug=True))
+    return json.loads(json.dumps(results))  # same normalisation as the fixture
+
+
+def assert_matches_golden(prompts, expected):
+    mismatches = [(p, got, want) for p, got, want in zip(prompts, run_parser(prompts), expected) if got != want]
+    assert not mismatches, f"{len(mismatches)} prompts changed, first: {mismatches[0]}"
+
+
+def test_parity_without_commander_database():
+    """Every corpus prompt parses exactly as before when no commanders are loaded"""
+    golden = load_golden()
+    original = commander_db.table
+    try:
+        commander_db.table = CommanderTable(0, {}, {}, coverage=0.0)
+        assert_matches_golden(golden["prompts"], golden["no_db"])
+    finally:
+        commander_db.table = original
+    print(f"✅ PASS: {len(golden['prompts'])} prompts unchanged without commanders")
+
+
+def test_parity_with_commander_database():
+    """Every corpus prompt parses exactly as before with commanders loaded"""
+    golden = load_golden()
+    original = commander_db.table
+    try:
+        commander_db._install(golden["small_db_commanders"], {})
+        assert_matches_golden(golden["prompts"], golden["small_db"])
+    finally:
+        commander_db.table = original
+    print(f"✅ PASS: {len(golden['prompts'])} prompts unchanged with commanders")
+
+
+def test_first_match_equals_search():
+    """Each token records the same first match re.search finds for its pattern"""
+    prompts = [p.lower() for p in load_golden()["prompts"]]
+    patterns = [(key, re.compile(pattern)) for key, pattern in _lexer_patterns()]
+
+    for prompt in prompts:
+        tokens = lex(prompt)
+        for key, pattern in patterns:
+            match = pattern.search(prompt)
+            assert (key in tokens) == bool(match), (prompt, key)
+            if match:
+                assert tokens[key] == tuple(int(g) for g in match.groups()), (prompt, key)
+    print("✅ PASS: lexer tokens equal per-pattern searches")
+
+
+def test_throughput():
+    """Parse the corpus with a large commander table and report prompts/second"""
+    prompts = load_golden()["prompts"]
+    original = commander_db.table
+    try:
+        commander_db._install({f"synthetic commander {i:04d}": "WU" for i in range(3000)}, {})
+        start = time.perf_counter()
+        run_parser(prompts)
+        elapsed = time.perf_counter() - start
+    finally:
+        commander_db.table = original
+
+    per_prompt = elapsed / len(prompts)
+    print(f"📊 {len(prompts) / elapsed:,.0f} prompts/s ({per_prompt * 1e6:.0f} us/prompt, 3000 commanders)")
+    # Compiling a word-boundary pattern per commander per prompt took >500 ms
+    assert per_prompt < 0.005
+    print("✅ PASS: fallback parser throughput")
+
+
+if __name__ == "__main__":
+    test_parity_without_commander_database()
+    test_parity_with_commander_database()
+    test_first_match_equals_search()
+    test_throughput()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the parser benchmark suite (tests/benchmarks/bench_parsers.py)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../benchmarks'))
+
+from bench_parsers import COMPARED_METRICS, METRICS, compare, load_corpus, load_fixture, run_suite
+
+
+def test_suite_reports_every_scenario():
+    """One quick round covers both parsers with and without the 3k commanders"""
+    assert len(load_fixture()) == 3000
+    results = run_suite(rounds=1)
+    assert results['prompts'] == len(load_corpus()) > 40
+    assert sorted(results['scenarios']) == ['nlp/db_3k', 'nlp/no_db', 'query_builder/db_3k', 'query_builder/no_db']
+    for metrics in results['scenarios'].values():
+        assert set(metrics) == set(METRICS)
+        assert metrics['ops_per_sec'] > 0 and metrics['p99_us'] >= metrics['p50_us'] > 0
+        assert metrics['alloc_kib'] > 0 and metrics['relative_cost'] > 0
+    print("✅ PASS: benchmark suite reports all scenarios")
+
+
+def test_regressions_beyond_threshold_fail():
+    """Only compared metrics worse than the baseline by more than the threshold are reported"""
+    assert set(COMPARED_METRICS) == {'relative_cost', 'alloc_kib'}
+    baseline = {'scenarios': {'nlp/no_db': {'relative_cost': 30.0, 'ops_per_sec': 1000, 'p50_us': 100,
+                                            'p99_us': 200, 'alloc_kib': 10}}}
+    within = {'scenarios': {'nlp/no_db': {'relative_cost': 36.0, 'ops_per_sec': 800, 'p50_us': 120,
+                                          'p99_us': 150, 'alloc_kib': 12}}}
+    beyond = {'scenarios': {'nlp/no_db': {'relative_cost': 40.0, 'ops_per_sec': 500, 'p50_us': 200,
+                                          'p99_us': 400, 'alloc_kib': 13},
+                            'nlp/db_3k': {'relative_cost': 1, 'ops_per_sec': 1, 'p50_us': 1, 'p99_us': 1, 'alloc_kib': 1}}}
+
+    assert compare(within, baseline, threshold=0.25) == []
+    regressions = compare(beyond, baseline, threshold=0.25)
+    # Absolute timings depend on the machine, so they're reported but never fail the run
+    assert len(regressions) == 2
+    assert regressions[0].startswith('nlp/no_db relative_cost') and regressions[1].startswith('nlp/no_db alloc_kib')
+    assert compare(beyond, baseline, threshold=0.5) == []
+    print("✅ PASS: regressions beyond the threshold are reported")
+
+
+if __name__ == "__main__":
+    test_suite_reports_every_scenario()
+    test_regressions_beyond_threshold_fail()
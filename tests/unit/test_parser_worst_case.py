@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Worst-case tests for prompt parsing
+
+Prompts are user input, so both parsers must stay linear in the prompt
+length no matter how adversarial it is. The linear scanners that replace
+backtracking regexes are checked against `re` on random inputs, and
+adversarial prompts are timed against a per-prompt bound, with a commander
+table whose names are shaped like real ones.
+"""
+
+import sys
+import os
+import io
+import random
+import re
+import time
+import contextlib
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app.commanders import commander_db
+from app.config import MAX_PROMPT_LENGTH
+from app.lexer import Sequence, word_run_captures
+from app.main import app
+from app.nlp import COMMANDER_PATTERNS, extract_filters_fallback
+from app.query_builder import QueryBuilder
+
+# Old parsers needed over a second for some 2,000-character prompts
+CAP_BOUND = 0.05        # seconds per prompt at MAX_PROMPT_LENGTH
+LONG_BOUND = 1.0        # seconds per prompt at 20x MAX_PROMPT_LENGTH
+
+
+def adversarial_prompts(length):
+    """Repetitions that made the per-pattern regexes backtrack or rescan"""
+    pieces = ['for ', 'for my a ', 'a ', 'counter ', 'counter on ', 'create ',
+              'search land ', '1', '1 ', 'high ', 'x', '0', 'exile ', 'my ']
+    prompts = {piece.strip() or repr(piece): (piece * (length // len(piece) + 1))[:length] for piece in pieces}
+    prompts['for my deck'] = ('for my ' + 'a ' * length)[:length - 5] + ' deck'
+    prompts['counter cannot'] = ('counter ' * length)[:length - 7] + ' cannot'
+    return prompts
+
+
+REAL_NAMES = [
+    "Atraxa, Praetors' Voice", "Chulane, Teller of Tales", "Kenrith, the Returned King",
+    "The Ur-Dragon", "The Wandering Emperor", "The Gitrog Monster", "The Scarab God",
+    "Lord Windgrace", "Lord of Tresserhorn", "Lord Xander, the Collector", "Edgar Markov",
+    "Korvold, Fae-Cursed King", "Muldrotha, the Gravetide", "Meren of Clan Nel Toth",
+    "Omnath, Locus of Creation", "Yuriko, the Tiger's Shadow", "Krenko, Mob Boss",
+]
+
+
+def real_shaped_commanders(count=3000, seed=38):
+    """
+    Names shaped like Scryfall's: many distinct first words, plus the big
+    "the ..." and "lord ..." groups that share one (The Ur-Dragon, Lord Windgrace)
+    """
+    rng = random.Random(seed)
+    syllables = ['ka', 'ro', 'vel', 'tha', 'mir', 'zan', 'el', 'dra', 'quo', 'syl', 'bri', 'os', 'ne', 'lu', 'gar', 'ith']
+    adjectives = ['wandering', 'scarab', 'returned', 'gravetide', 'ur', 'first', 'last', 'hollow', 'gilded', 'ashen']
+    nouns = ['emperor', 'god', 'king', 'monster', 'dragon', 'sliver', 'tyrant', 'collector', 'warden', 'oracle']
+    places = ['tales', 'the tides', 'clan nel toth', 'the wilds', 'creation', 'tresserhorn', 'the vault', 'embers']
+    forms = [
+        lambda given: f"{given}, {rng.choice(nouns)} of {rng.choice(places)}",
+        lambda given: f"{given}, the {rng.choice(adjectives)} {rng.choice(nouns)}",
+        lambda given: f"{given} the {rng.choice(adjectives)}",
+        lambda given: f"the {rng.choice(adjectives)}-{rng.choice(nouns)} {given}",
+        lambda given: f"lord {given}, {rng.choice(nouns)} of {rng.choice(places)}",
+        lambda given: f"lord of {rng.choice(places)} {given}",
+        lambda given: f"{given} {rng.choice(syllables)}{rng.choice(syllables)}",
+    ]
+    commanders = {name.lower(): 'WUBRG' for name in REAL_NAMES}
+    while len(commanders) < count:
+        given = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3)))
+        commanders[rng.choice(forms)(given)] = ''.join(c for c in 'WUBRG' if rng.random() < 0.4)
+    return commanders
+
+
+def name_prompts(length, commanders):
+    """Prompts that hit the commander name index as hard as possible"""
+    first_words = sorted({name.split()[0].strip(',') for name in commanders})
+    pieces = {
+        'the': 'the ',
+        'lord of the': 'lord of the ',
+        'the ur-drago': 'the ur-drago ',  # a near miss on every "the" name
+        'lord windgrac': 'lord windgrac ',
+    }
+    prompts = {name: (piece * (length // len(piece) + 1))[:length] for name, piece in pieces.items()}
+    # Every first word in the table, so every name is a candidate
+    prompts['every first word'] = (' '.join(first_words) + ' ') * (length // len(first_words) + 1)
+    prompts['every first word'] = prompts['every first word'][:length]
+    return prompts
+
+
+def time_parsers(prompt):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        extract_filters_fallback(prompt)
+        nlp_time = time.perf_counter() - start
+        start = time.perf_counter()
+        QueryBuilder().parse(prompt)
+        qb_time = time.perf_counter() - start
+    return nlp_time, qb_time
+
+
+def test_word_run_captures_match_re():
+    """word_run_captures returns what re.findall would for random texts"""
+    rng = random.Random(39)
+    alphabet = ['a', 'b', ' ', ' ', ',', '\n', 'for', 'my', 'deck', 'in', 'colors', 'commander']
+    for _ in range(3000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 25)))
+        for prefix, suffix in COMMANDER_PATTERNS:
+            expected = re.findall(re.escape(prefix) + r'(\w+(?:\s+\w+)*)' + re.escape(suffix), text)
+            assert word_run_captures(text, prefix, suffix) == expected, (text, prefix, suffix)
+    print("✅ PASS: word_run_captures equals re.findall")
+
+
+def test_sequences_match_re():
+    """Sequences agree with re.search for random texts"""
+    rng = random.Random(39)
+    patterns = [r'exile.*graveyard', r'\bcounter\b(?!.*cannot)(?!.*counter.*on)', r'a.*b.*a(?!.*b)']
+    alphabet = ['a', 'b', ' ', '\n', 'counter', 'cannot', 'on', 'exile', 'graveyard', 'x']
+    for pattern in patterns:
+        sequence, regex = Sequence(pattern), re.compile(pattern)
+        for _ in range(3000):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert sequence.search(text) == bool(regex.search(text)), (pattern, text)
+    print("✅ PASS: Sequence equals re.search")
+
+
+def test_adversarial_prompt_time():
+    """Every adversarial prompt parses within the per-prompt bound, and in time linear in its length"""
+    commanders = real_shaped_commanders()
+    first_words = {name.split()[0].strip(',') for name in commanders}
+    assert len(commanders) == 3000 and len(first_words) > 1000
+    assert sum(name.startswith('the ') for name in commanders) > 200
+    assert sum(name.startswith('lord ') for name in commanders) > 200
+
+    original = commander_db.table
+    try:
+        commander_db._install(commanders, {})
+        times = {}
+        for length, bound in ((MAX_PROMPT_LENGTH, CAP_BOUND), (MAX_PROMPT_LENGTH * 20, LONG_BOUND)):
+            worst = (0.0, None)
+            prompts = {**adversarial_prompts(length), **name_prompts(length, commanders)}
+            for name, prompt in prompts.items():
+                nlp_time, qb_time = time_parsers(prompt)
+                assert nlp_time < bound, f"nlp parser took {nlp_time:.3f}s on {name!r} x{length}"
+                assert qb_time < bound, f"QueryBuilder took {qb_time:.3f}s on {name!r} x{length}"
+                times[name, length] = max(nlp_time, qb_time)
+                worst = max(worst, (max(nlp_time, qb_time), name))
+            print(f"📊 {length} chars: slowest {worst[1]!r} at {worst[0] * 1000:.1f} ms")
+
+        # 20x the length may cost 20x the time (with room for noise), not 400x.
+        # Short times are floored so timer jitter can't fail the check.
+        for name in prompts:
+            short, long = times[name, MAX_PROMPT_LENGTH], times[name, MAX_PROMPT_LENGTH * 20]
+            assert long < 60 * max(short, 0.002), f"{name!r}: {short * 1000:.1f} ms -> {long * 1000:.1f} ms at 20x"
+    finally:
+        commander_db.table = original
+    print("✅ PASS: adversarial prompts parse in bounded, linear time")
+
+
+def test_search_rejects_long_prompts():
+    """/search answers 422 for prompts over MAX_PROMPT_LENGTH without parsing them"""
+    client = TestClient(app)
+    response = client.get("/search", params={"prompt": "a" * (MAX_PROMPT_LENGTH + 1)})
+    assert response.status_code == 422
+    print("✅ PASS: over-long prompts rejected")
+
+
+if __name__ == "__main__":
+    test_word_run_captures_match_re()
+    test_sequences_match_re()
+    test_adversarial_prompt_time()
+    test_search_rejects_long_prompts()
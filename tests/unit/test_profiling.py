@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for on-demand request profiling and /admin/profiles
+"""
+
+import sys
+import os
+import pstats
+import tempfile
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.profiling import Profile, ProfileStore, Profiler, profiler
+from fakes import ADMIN, TOKEN, named_card, slow
+
+
+def analyze(client, headers):
+    with mock.patch("app.deck_analyzer.requests.get", side_effect=slow(named_card())):
+        response = client.post("/analyze-deck", json=["Card A", "Card B"], headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_choose_requests():
+    """Sampled fraction, or the admin token in X-Profile; wrong tokens are ignored"""
+    with mock.patch.object(config, "ADMIN_TOKEN", TOKEN):
+        never = Profiler(sample_rate=0.0)
+        assert never.choose({}) is None and never.choose({"x-profile": "guess"}) is None
+        assert never.choose({"x-profile": TOKEN}) == ("sampling", "header")
+        assert never.choose({"x-profile": TOKEN, "x-profile-mode": "cprofile"}) == ("cprofile", "header")
+        assert Profiler(sample_rate=1.0, mode="cprofile").choose({}) == ("cprofile", "sample")
+    with mock.patch.object(config, "ADMIN_TOKEN", ""):
+        assert Profiler().choose({"x-profile": ""}) is None
+    print("✅ PASS: choosing requests to profile")
+
+
+def test_store_keeps_latest():
+    """Only the last N profiles are kept, newest listed first"""
+    store = ProfileStore(keep=3)
+    for _ in range(5):
+        store.add(Profile(id=store.next_id(), mode="sampling", trigger="sample", endpoint="search",
+                          path="/search", query="", started_at=0))
+    assert [p.id for p in store.list()] == [5, 4, 3]
+    assert store.get(2) is None and store.get(4).id == 4
+    print("✅ PASS: profile store")
+
+
+def test_sampling_profile_download():
+    """A header-triggered request is sampled and downloadable as collapsed stacks"""
+    client = TestClient(app)
+    with mock.patch.object(config, "ADMIN_TOKEN", TOKEN):
+        analyze(client, {"X-Profile": TOKEN})
+        listing = client.get("/admin/profiles", headers=ADMIN).json()
+        latest = listing["profiles"][0]
+        assert latest["endpoint"] == "analyze_deck" and latest["trigger"] == "header"
+        assert latest["mode"] == "sampling" and latest["samples"] > 0 and latest["duration_ms"] >= 100
+
+        collapsed = client.get(f"/admin/profiles/{latest['id']}", params={"format": "collapsed"}, headers=ADMIN)
+        assert "attachment" in collapsed.headers["content-disposition"]
+        lines = collapsed.text.splitlines()
+        assert all(line.startswith("main.py:analyze_deck") for line in lines)
+        assert any("deck_analyzer.py:analyze_deck_list" in line for line in lines)
+        assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == latest["samples"]
+
+        wrong = client.get(f"/admin/profiles/{latest['id']}", params={"format": "pstats"}, headers=ADMIN)
+        assert wrong.status_code == 400 and wrong.json()["detail"]["formats"] == ["collapsed", "text"]
+    print("✅ PASS: sampling profile as collapsed stacks")
+
+
+def test_cprofile_download():
+    """X-Profile-Mode: cprofile gives a pstats file pstats can open"""
+    client = TestClient(app)
+    with mock.patch.object(config, "ADMIN_TOKEN", TOKEN):
+        analyze(client, {"X-Profile": TOKEN, "X-Profile-Mode": "cprofile"})
+        latest = client.get("/admin/profiles", headers=ADMIN).json()["profiles"][0]
+        assert latest["mode"] == "cprofile" and latest["formats"] == ["pstats", "text"]
+
+        data = client.get(f"/admin/profiles/{latest['id']}", params={"format": "pstats"}, headers=ADMIN).content
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.pstats")
+            with open(path, "wb") as f:
+                f.write(data)
+            functions = {name for _, _, name in pstats.Stats(path).stats}
+        assert "analyze_deck_list" in functions and "get_card_data" in functions
+
+        text = client.get(f"/admin/profiles/{latest['id']}", headers=ADMIN).text
+        assert "function calls" in text and "analyze_deck_list" in text
+    print("✅ PASS: cProfile profile as pstats")
+
+
+def test_unprofiled_and_protected():
+    """Without a valid token nothing is profiled and the admin endpoints refuse"""
+    client = TestClient(app)
+    count = len(profiler.store.list())
+    with mock.patch.object(config, "ADMIN_TOKEN", TOKEN):
+        analyze(client, {"X-Profile": "guess"})
+        assert len(profiler.store.list()) == count
+        assert client.get("/admin/profiles", headers={"X-Admin-Token": "guess"}).status_code == 403
+        assert client.get("/admin/profiles").status_code == 403
+        assert client.get("/admin/profiles/999999", headers=ADMIN).status_code == 404
+    with mock.patch.object(config, "ADMIN_TOKEN", ""):
+        assert client.get("/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 404
+    print("✅ PASS: profiling is opt-in and protected")
+
+
+if __name__ == "__main__":
+    test_choose_requests()
+    test_store_keeps_latest()
+    test_sampling_profile_download()
+    test_cprofile_download()
+    test_unprofiled_and_protected()
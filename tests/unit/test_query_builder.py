@@ -6,6 +6,9 @@ Plus additional tests for the builder pattern approach
 
 import sys
 import os
+import io
+import json
+import contextlib
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
 
 from app.query_builder import extract_filters, QueryBuilder
@@ -345,6 +348,23 @@ class TestQueryBuilder:
             
             print(f"✅ PASS: '{query}' handled correctly")
     
+    def test_golden_parity(self):
+        """Test that every corpus prompt tokenizes and parses exactly as recorded"""
+        
+        # Recorded from the per-check parser (joined prompt, re.search per pattern)
+        path = os.path.join(os.path.dirname(__file__), 'fixtures', 'query_builder_golden.json')
+        with open(path) as f:
+            golden = json.load(f)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            for query, expected in zip(golden["prompts"], golden["results"]):
+                builder = QueryBuilder()
+                result = json.loads(json.dumps(builder.parse(query)))
+                assert builder.state.tokens == expected["tokens"], f"'{query}' tokens changed"
+                assert result == expected["filters"], f"'{query}' -> {result}, expected {expected['filters']}"
+        
+        print(f"✅ PASS: {len(golden['prompts'])} prompts parse as recorded")
+    
     def test_sample_queries_compatibility(self):
         """Test compatibility with frontend sample queries"""
         
@@ -428,6 +448,9 @@ def run_all_tests():
         test_suite.test_tricky_edge_cases()
         print()
         
+        test_suite.test_golden_parity()
+        print()
+        
         test_suite.test_sample_queries_compatibility()
         
         print("=" * 60)
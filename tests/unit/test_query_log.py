@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the sampled query log and its replay tool
+"""
+
+import sys
+import os
+import json
+import tempfile
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../load'))
+
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.main import app
+from app.query_log import QueryLog, anonymize_prompt
+from app.timing import RequestTiming, stage, start_request
+from fakes import search_page
+from replay_query_log import read_log, replay_parser, schedule, search_params
+
+
+def test_anonymize_prompt():
+    """Addresses, links and long numbers are masked; card prompts are untouched"""
+    assert anonymize_prompt("  1 mana   counterspell ") == "1 mana counterspell"
+    assert anonymize_prompt("2/2 for 3 cmc") == "2/2 for 3 cmc"
+    assert anonymize_prompt("mail me@example.com deck https://moxfield.com/decks/abc") == "mail <email> deck <url>"
+    assert anonymize_prompt("call 5551234567 about sol ring") == "call <number> about sol ring"
+    print("✅ PASS: prompt anonymization")
+
+
+def test_stage_timing():
+    """Stages record into the current request only, repeated stages summed"""
+    with stage("parse"):
+        pass  # no request in progress: nothing to record into
+
+    timing = start_request()
+    with stage("scryfall"):
+        pass
+    with stage("scryfall"):
+        pass
+    assert [name for name, _, _ in timing.stages] == ["scryfall", "scryfall"]
+    assert list(timing.totals_ms()) == ["scryfall"]
+    print("✅ PASS: stage timing")
+
+
+def test_sampling_and_format():
+    """Only sampled requests are written, as compact lines with defaults omitted"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl")
+        log = QueryLog(path, sample_rate=0.25, seed=4)
+        timing = RequestTiming()
+        timing.record("parse", 0.0012)
+        sampled = sum(log.record("blue creature", None, 1, 20, 200, timing) for _ in range(400))
+        log.close()
+        assert 60 < sampled < 140
+
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == sampled and log.written == sampled
+        entry = json.loads(lines[0])
+        assert set(entry) == {"t", "p", "s", "ms", "st"}
+        assert entry["p"] == "blue creature" and entry["st"] == {"parse": 1.2}
+        assert " " not in lines[0].replace("blue creature", "")
+
+        again = QueryLog(path, sample_rate=1.0)
+        again.record("x", "WU", 3, 50, 503, timing)
+        again.close()
+        with open(path) as f:
+            assert json.loads(f.read().splitlines()[-1]) == {**entry, "t": mock.ANY, "p": "x", "cc": "WU",
+                                                           "pg": 3, "pp": 50, "s": 503, "ms": mock.ANY}
+        disabled = QueryLog("", sample_rate=1.0)
+        assert not disabled.enabled and not disabled.record("x", None, 1, 20, 200, timing)
+    print("✅ PASS: sampling and compact format")
+
+
+def test_search_writes_breakdown():
+    """/search logs its parameters, status and per-stage breakdown"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl")
+        log = QueryLog(path, sample_rate=1.0)
+        with mock.patch.object(main_module, "query_log", log), \
+                mock.patch("app.scryfall.requests.get", return_value=search_page()):
+            client = TestClient(app)
+            assert client.get("/search", params={"prompt": "azorius counterspell", "page": 9,
+                                                 "per_page": 20, "commander_colors": "WU"}).status_code == 200
+            assert client.get("/search", params={"prompt": "x" * 10000}).status_code == 422
+        log.close()
+
+        entries = list(read_log(path))
+        assert len(entries) == 1  # rejected before the endpoint ran
+        entry = entries[0]
+        assert entry["p"] == "azorius counterspell" and entry["cc"] == "WU" and entry["pg"] == 9
+        assert entry["s"] == 200
+        # page 9 spans two Scryfall pages: both fetches are summed into one stage
+        assert list(entry["st"]) == ["parse", "build_query", "limiter", "scryfall", "slice", "serialize"]
+        assert entry["st"]["limiter"] >= 190
+        assert entry["ms"] >= sum(entry["st"].values()) - 1
+    print("✅ PASS: /search writes a timing breakdown")
+
+
+def test_replay_helpers():
+    """The replay tool reads logs, keeps logged gaps at any speed and parses prompts"""
+    entries = [{"t": 100.0, "p": "blue creature"}, {"t": 101.5, "p": "simic ramp", "cc": "GU", "pp": 50},
+               {"t": 104.0, "p": "fetchland", "st": {"parse": 0.3}}]
+    assert schedule(entries, 1) == [0.0, 1.5, 4.0]
+    assert schedule(entries, 2) == [0.0, 0.75, 2.0]
+    assert schedule(entries, 0) == [0.0, 0.0, 0.0]
+    assert search_params(entries[1]) == {"prompt": "simic ramp", "page": 1, "per_page": 50, "commander_colors": "GU"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl")
+        with open(path, "w") as f:
+            f.write("\n".join(json.dumps(e) for e in entries) + "\nnot json\n")
+        assert [e["p"] for e in read_log(path)] == ["blue creature", "simic ramp", "fetchland"]
+        assert len(list(read_log(path, limit=2))) == 2
+
+    report = replay_parser(entries)
+    assert report["requests"] == 3 and report["parse"]["count"] == 3 and report["logged_parse"]["count"] == 1
+    print("✅ PASS: replay helpers")
+
+
+if __name__ == "__main__":
+    test_anonymize_prompt()
+    test_stage_timing()
+    test_sampling_and_format()
+    test_search_writes_breakdown()
+    test_replay_helpers()
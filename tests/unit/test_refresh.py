@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the scheduled reference-data refresh
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+import app.scryfall as scryfall_module
+from app.card_names import CardNamesCache
+from app.commanders import CommanderDatabase
+from app.refresh import RefreshScheduler, RefreshTarget
+from fakes import bulk_metadata, catalog, list_page
+
+
+class FakeDataset:
+    def __init__(self, remote_signal, complete=True):
+        self.remote_signal = remote_signal
+        self.signal = remote_signal
+        self.complete = complete
+        self.reloads = 0
+
+    def fetch_signal(self):
+        if isinstance(self.remote_signal, Exception):
+            raise self.remote_signal
+        return self.remote_signal
+
+    def reload(self, signal):
+        self.reloads += 1
+        self.signal = signal
+        self.complete = True
+        return "reloaded"
+
+    def target(self, name):
+        return RefreshTarget(
+            name=name,
+            fetch_signal=self.fetch_signal,
+            current_signal=lambda: self.signal,
+            is_complete=lambda: self.complete,
+            reload=self.reload,
+        )
+
+
+def test_reload_only_when_signal_changes():
+    """Unchanged signals skip the reload; changed or incomplete data reloads"""
+    names, commanders = FakeDataset("bulk:1"), FakeDataset("search:100", complete=False)
+    warmed = []
+    scheduler = RefreshScheduler([names.target("card_names"), commanders.target("commanders")],
+                                 interval=60, on_reload=lambda: warmed.append(True))
+
+    assert scheduler.refresh_once() == {"card_names": "unchanged", "commanders": "reloaded"}
+    assert (names.reloads, commanders.reloads) == (0, 1)
+    assert warmed == [True]
+
+    assert scheduler.refresh_once() == {"card_names": "unchanged", "commanders": "unchanged"}
+    assert len(warmed) == 1
+
+    names.remote_signal = "bulk:2"
+    assert scheduler.refresh_once()["card_names"] == "reloaded"
+    assert names.signal == "bulk:2"
+
+    names.remote_signal = ConnectionError("scryfall down")
+    assert scheduler.refresh_once()["card_names"] == "failed"
+
+    stats = scheduler.metrics()["datasets"]["card_names"]
+    assert stats["checks"] == 4 and stats["reloads"] == 1 and stats["unchanged"] == 2 and stats["failures"] == 1
+    assert stats["signal"] == "bulk:2" and "scryfall down" in stats["last_error"]
+    assert scheduler.metrics()["runs"] == 4
+    print("✅ PASS: refresh reloads only on changed signals")
+
+
+def test_jitter_spreads_runs():
+    """Waits stay within interval ± jitter and are not all identical"""
+    scheduler = RefreshScheduler([], interval=100, jitter=0.2)
+    delays = [scheduler.next_delay() for _ in range(200)]
+    assert all(80 <= d <= 120 for d in delays)
+    assert len(set(delays)) > 1
+    assert RefreshScheduler([], interval=0).metrics()["enabled"] is False
+    print("✅ PASS: refresh runs are jittered")
+
+
+def test_card_name_signal_survives_restart():
+    """The signal recorded with a refresh is saved with the snapshot"""
+    original_get = scryfall_module.requests.get
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "card_names.json.gz")
+        try:
+            scryfall_module.requests.get = lambda *args, **kwargs: catalog(["Sol Ring"])
+            cache = CardNamesCache(snapshot_path=path)
+            assert cache.load_card_names(source_signal="bulk:2026-10-19")
+
+            warm = CardNamesCache(snapshot_path=path)
+            assert warm.load_snapshot()
+            assert warm.source_signal == "bulk:2026-10-19"
+        finally:
+            scryfall_module.requests.get = original_get
+    print("✅ PASS: card name freshness signal persisted")
+
+
+def test_startup_load_records_signal():
+    """A load without a signal (startup) fetches one, so the first refresh finds nothing changed"""
+    def fake_get(url, *args, **kwargs):
+        if "/bulk-data/" in url:
+            return bulk_metadata("2026-10-19T09:00:00")
+        return catalog(["Sol Ring"])
+
+    original_get = scryfall_module.requests.get
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            scryfall_module.requests.get = fake_get
+            cache = CardNamesCache(snapshot_path=os.path.join(tmp, "card_names.json.gz"))
+            cache._set_card_names(["Sol Ring"], source_signal="bulk:stale-snapshot")
+            assert cache.load_card_names()
+            assert cache.source_signal == "bulk:2026-10-19T09:00:00"
+
+            reloads = []
+            scheduler = RefreshScheduler([RefreshTarget(
+                name="card_names",
+                fetch_signal=cache.fetch_source_signal,
+                current_signal=lambda: cache.source_signal,
+                is_complete=lambda: cache.complete,
+                reload=lambda signal: reloads.append(signal) or True,
+            )], interval=60)
+            assert scheduler.refresh_once() == {"card_names": "unchanged"} and reloads == []
+        finally:
+            scryfall_module.requests.get = original_get
+    print("✅ PASS: startup load records the freshness signal")
+
+
+def test_reload_that_finds_nothing_new():
+    """A reload on a new signal that publishes the same data counts as unchanged, not as a reload"""
+    card = {"name": "Krenko, Mob Boss", "color_identity": ["R"], "type_line": "Legendary Creature"}
+    original_get = scryfall_module.requests.get
+    try:
+        scryfall_module.requests.get = lambda *args, **kwargs: list_page([card], total_cards=1)
+        db = CommanderDatabase()
+        remote = {"signal": "search:1"}
+        warmed = []
+        scheduler = RefreshScheduler([RefreshTarget(
+            name="commanders",
+            fetch_signal=lambda: remote["signal"],
+            current_signal=lambda: db.table.source_signal,
+            is_complete=lambda: db.table.complete,
+            reload=db.reload,
+        )], interval=60, on_reload=lambda: warmed.append(True))
+
+        assert scheduler.refresh_once() == {"commanders": "reloaded"} and len(warmed) == 1
+        version = db.table.version
+
+        # The signal moved but the commanders didn't: same version, no rebuild
+        remote["signal"] = "search:moved"
+        assert scheduler.refresh_once() == {"commanders": "unchanged"}
+        assert db.table.version == version and len(warmed) == 1
+        stats = scheduler.metrics()["datasets"]["commanders"]
+        assert stats["reloads"] == 1 and stats["reloads_unchanged"] == 1 and stats["unchanged"] == 0
+    finally:
+        scryfall_module.requests.get = original_get
+    print("✅ PASS: reloads that find nothing new are counted separately")
+
+
+def test_reload_records_the_fetched_signal():
+    """The signal the scheduler fetched is recorded when the loaded data has none of its own"""
+    card = {"name": "Krenko, Mob Boss", "color_identity": ["R"], "type_line": "Legendary Creature"}
+    original_get = scryfall_module.requests.get
+    try:
+        scryfall_module.requests.get = lambda *args, **kwargs: list_page([card], total_cards=0)
+        db = CommanderDatabase()
+        assert db.reload("search:from-check") == "reloaded"
+        assert db.table.source_signal == "search:from-check"
+        assert db.reload("search:from-check") == "unchanged"
+    finally:
+        scryfall_module.requests.get = original_get
+    print("✅ PASS: the fetched signal is passed through to the reload")
+
+
+if __name__ == "__main__":
+    test_reload_only_when_signal_changes()
+    test_jitter_spreads_runs()
+    test_card_name_signal_survives_restart()
+    test_startup_load_records_signal()
+    test_reload_that_finds_nothing_new()
+    test_reload_records_the_fetched_signal()
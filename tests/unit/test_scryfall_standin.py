@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the offline Scryfall stand-in (tests/load/scryfall_standin.py)
+"""
+
+import sys
+import os
+import random
+import socket
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../load'))
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+import app.scryfall as scryfall_module
+from app.deck_analyzer import DeckAnalyzer
+from scryfall_standin import (CardPool, DEFAULT_FIXTURES, LatencyModel, PAGE_SIZE, StandinConfig,
+                              compile_query, create_app, parse_latency)
+
+
+def make_pool(synthetic=500):
+    return CardPool.from_sources(DEFAULT_FIXTURES, synthetic=synthetic)
+
+
+def test_search_paging():
+    """/cards/search pages 175 cards at a time with has_more, next_page and total_cards"""
+    client = TestClient(create_app(make_pool()))
+    first = client.get("/cards/search", params={"q": "game:paper"}).json()
+    total = first["total_cards"]
+    assert total > PAGE_SIZE and len(first["data"]) == PAGE_SIZE and first["has_more"]
+    assert "page=2" in first["next_page"]
+
+    last_page = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    last = client.get("/cards/search", params={"q": "game:paper", "page": last_page}).json()
+    assert not last["has_more"] and len(last["data"]) == total - (last_page - 1) * PAGE_SIZE
+    assert client.get("/cards/search", params={"q": "game:paper", "page": last_page + 1}).status_code == 422
+
+    names = [c["name"].lower() for c in first["data"]]
+    assert names == sorted(names)
+    assert client.get("/cards/search", params={"q": "name:zzzznotacard"}).status_code == 404
+    print("✅ PASS: search paging")
+
+
+def test_query_subset():
+    """The app's generated queries filter the fixture cards like Scryfall would"""
+    pool = make_pool(0)
+    abjure = pool.by_name["abjure"]
+
+    def matches(query):
+        return compile_query(query)(abjure)
+
+    assert matches('game:paper (o:"counter target" OR o:"counter that") CMC=1 commander:GWU')
+    assert matches('COLOR=U type:instant') and matches('c:u') and not matches('COLOR=WU')
+    assert matches('COLOR<=WU') and not matches('COLOR>=WU') and matches('id:esper') and not matches('id:gruul')
+    assert not matches('-type:instant') and matches('-(type:creature OR CMC>=3)')
+    assert matches('abjure') and matches('"abj"') and not matches('cmc>1')
+    try:
+        compile_query('(o:"unbalanced"')
+        assert False, "unbalanced query should not compile"
+    except ValueError:
+        pass
+    print("✅ PASS: query subset")
+
+
+def test_named_collection_and_catalog():
+    """/cards/named, /cards/collection and /catalog/card-names answer like Scryfall"""
+    pool = make_pool()
+    client = TestClient(create_app(pool))
+
+    assert client.get("/cards/named", params={"exact": "ABJURE"}).json()["name"] == "Abjure"
+    assert client.get("/cards/named", params={"fuzzy": "abju"}).json()["name"] == "Abjure"
+    assert client.get("/cards/named", params={"exact": "Not A Card"}).json()["code"] == "not_found"
+
+    body = client.post("/cards/collection", json={"identifiers": [
+        {"name": "Abjure"}, {"id": pool.cards[0]["id"]}, {"name": "Not A Card"}]}).json()
+    assert [c["name"] for c in body["data"]] == ["Abjure", pool.cards[0]["name"]]
+    assert body["not_found"] == [{"name": "Not A Card"}]
+    too_many = {"identifiers": [{"name": "Abjure"}] * 76}
+    assert client.post("/cards/collection", json=too_many).status_code == 422
+
+    catalog = client.get("/catalog/card-names").json()
+    assert catalog["total_values"] == len(pool.names) and "Abjure" in catalog["data"]
+    print("✅ PASS: named, collection and catalog")
+
+
+def test_rate_limit_and_injection():
+    """The token bucket answers 429 once exhausted; injected errors follow their rates"""
+    limited = TestClient(create_app(make_pool(0), StandinConfig(rate_limit=1, burst=3)))
+    statuses = [limited.get("/catalog/card-names").status_code for _ in range(6)]
+    assert statuses[:3] == [200, 200, 200] and statuses[3:] == [429, 429, 429]
+    stats = limited.get("/_standin/stats").json()
+    assert stats["rate_limited"] == 3 and stats["requests"]["catalog"] == {"200": 3, "429": 3}
+
+    flaky = TestClient(create_app(make_pool(0), StandinConfig(error_rate=0.2, throttle_rate=0.1, seed=1)))
+    statuses = [flaky.get("/catalog/card-names").status_code for _ in range(500)]
+    errors = sum(s >= 500 for s in statuses) / 500
+    throttled = statuses.count(429) / 500
+    assert 0.14 < errors < 0.26 and 0.05 < throttled < 0.15
+    print("✅ PASS: rate limiting and error injection")
+
+
+def test_latency_models():
+    """Latency specs parse per endpoint and sample the requested distributions"""
+    rng = random.Random(3)
+    assert LatencyModel("fixed:20").sample(rng) == 0.02
+    uniform = [LatencyModel("uniform:10,30").sample(rng) for _ in range(200)]
+    assert all(0.01 <= s <= 0.03 for s in uniform)
+    lognormal = sorted(LatencyModel("lognormal:80,0.5").sample(rng) for _ in range(2001))
+    assert 0.07 < lognormal[1000] < 0.09  # median
+    assert LatencyModel("normal:5,50").sample(random.Random(0)) >= 0
+
+    models = parse_latency(["search=lognormal:80,0.5", "fixed:20"])
+    assert set(models) == {"search", "*"}
+    for bad in ["gamma:1", "fixed", "nowhere=fixed:1"]:
+        try:
+            parse_latency([bad])
+            assert False, f"{bad!r} should be rejected"
+        except ValueError:
+            pass
+
+    client = TestClient(create_app(make_pool(0), StandinConfig(latency=parse_latency(["named=fixed:50"]))))
+    start = time.perf_counter()
+    client.get("/cards/named", params={"exact": "Abjure"})
+    assert time.perf_counter() - start >= 0.05
+    print("✅ PASS: latency models")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_app_points_at_standin():
+    """With its base URL pointed at the stand-in, the app searches offline"""
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(make_pool()), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{port}"
+    original = scryfall_module.SCRYFALL_API_URL
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        scryfall_module.SCRYFALL_API_URL = base_url
+        result = scryfall_module.search_scryfall({"coloridentity": "GWU", "is_commander_context": True,
+                                                  "effects": ["counter"]})
+        assert result["total_cards"] >= 1
+        assert "Abjure" in [card["name"] for card in result["cards"]]
+
+        analyzer = DeckAnalyzer()
+        analyzer.scryfall_base = base_url
+        assert analyzer.get_card_data("abjure")["name"] == "Abjure"
+    finally:
+        scryfall_module.SCRYFALL_API_URL = original
+        server.should_exit = True
+        thread.join(timeout=5)
+    print("✅ PASS: app searches against the stand-in")
+
+
+if __name__ == "__main__":
+    test_search_paging()
+    test_query_subset()
+    test_named_collection_and_catalog()
+    test_rate_limit_and_injection()
+    test_latency_models()
+    test_app_points_at_standin()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Server-Timing breakdown on /search and /analyze-deck
+"""
+
+import sys
+import os
+import re
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.timing import RequestTiming
+from fakes import named_card, search_page
+
+
+def parse_header(value):
+    """[(name, dur, desc)] from a Server-Timing header value"""
+    entries = []
+    for entry in value.split(", "):
+        name, _, params = entry.partition(";")
+        dur = float(re.search(r"dur=([\d.]+)", params).group(1))
+        desc = re.search(r'desc="((?:[^"\\]|\\.)*)"', params)
+        entries.append((name, dur, desc.group(1) if desc else None))
+    return entries
+
+
+def test_search_server_timing():
+    """Every /search stage is in the header, each upstream fetch separately"""
+    with mock.patch("app.scryfall.requests.get", return_value=search_page()):
+        response = TestClient(app).get("/search", params={"prompt": "azorius counterspell", "page": 9})
+    assert response.status_code == 200 and "timing" not in response.json()
+
+    entries = parse_header(response.headers["Server-Timing"])
+    names = [name for name, _, _ in entries]
+    assert names == ["parse", "build_query", "limiter", "scryfall", "slice",
+                     "build_query", "limiter", "scryfall", "serialize", "total"]
+    assert [desc for name, _, desc in entries if name == "scryfall"] == ["page 1", "page 2"]
+    assert all(dur >= 99 for name, dur, _ in entries if name == "limiter")
+    total = entries[-1][1]
+    assert total >= sum(dur for _, dur, _ in entries[:-1]) - 1
+    print("✅ PASS: /search Server-Timing")
+
+
+def test_search_timing_block():
+    """?timing=true adds the stages measured before serialization to the body"""
+    with mock.patch("app.scryfall.requests.get", return_value=search_page()):
+        body = TestClient(app).get("/search", params={"prompt": "blue creature", "timing": "true"}).json()
+    block = body["timing"]
+    assert [stage["name"] for stage in block["stages"]] == ["parse", "build_query", "limiter", "scryfall", "slice"]
+    assert block["stages"][3]["desc"] == "page 1"
+    assert block["total_ms"] >= sum(stage["ms"] for stage in block["stages"]) - 1
+    print("✅ PASS: /search timing block")
+
+
+def test_analyze_deck_server_timing():
+    """Per-card lookups in /analyze-deck are summed once they repeat"""
+    deck = ["Card A", "Card B", "Card C", "Card D", "Murder"]
+    with mock.patch("app.deck_analyzer.requests.get", return_value=named_card()), mock.patch("time.sleep"):
+        response = TestClient(app).post("/analyze-deck", params={"timing": "true"}, json=deck)
+    assert response.status_code == 200 and response.json()["success"]
+
+    entries = parse_header(response.headers["Server-Timing"])
+    assert ("scryfall", "4 calls") in [(name, desc) for name, _, desc in entries]
+    assert [name for name, _, _ in entries] == ["scryfall", "limiter", "serialize", "total"]
+    stages = response.json()["timing"]["stages"]
+    assert [stage["desc"] for stage in stages if stage["name"] == "scryfall"] == deck[:4]
+    print("✅ PASS: /analyze-deck Server-Timing")
+
+
+def test_descriptions_are_header_safe():
+    """Card names with quotes, backslashes or non-ASCII text stay inside their quotes"""
+    timing = RequestTiming()
+    timing.record("scryfall", 0.01, 'Jötun "Grunt"\\\n')
+    value = timing.server_timing()
+    assert value.startswith('scryfall;dur=10.0;desc="J?tun \\"Grunt\\"\\\\"')
+    assert parse_header(value)[0][2] == 'J?tun \\"Grunt\\"\\\\'
+    print("✅ PASS: header-safe descriptions")
+
+
+if __name__ == "__main__":
+    test_search_server_timing()
+    test_search_timing_block()
+    test_analyze_deck_server_timing()
+    test_descriptions_are_header_safe()
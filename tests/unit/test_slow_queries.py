@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the slow-query log and /admin/slow-queries
+"""
+
+import sys
+import os
+import json
+import tempfile
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.slow_queries import SlowQueryLog
+from app.timing import RequestTiming
+from fakes import ADMIN, TOKEN, search_page, slow
+
+
+def timing_of(ms):
+    timing = RequestTiming()
+    timing.started -= ms / 1000
+    return timing
+
+
+def test_threshold_and_ranking():
+    """Only requests over the threshold are kept, the last N of them, listed slowest first"""
+    log = SlowQueryLog(threshold_ms=100, keep=3)
+    assert not log.record("fast", None, 1, 20, 200, timing_of(20))
+    for ms in (150, 900, 300, 500):
+        assert log.record(f"took {ms}", None, 1, 20, 200, timing_of(ms))
+    assert log.recorded == 4
+    assert [entry["prompt"] for entry in log.slowest()] == ["took 900", "took 500", "took 300"]
+    assert [entry["prompt"] for entry in log.slowest(limit=1)] == ["took 900"]
+
+    disabled = SlowQueryLog(threshold_ms=0)
+    assert not disabled.enabled and not disabled.record("slow", None, 1, 20, 200, timing_of(5000))
+    print("✅ PASS: threshold and ranking")
+
+
+def test_slow_search_entry():
+    """A slow /search is logged with filters, query, upstream pages and stages"""
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    log = SlowQueryLog(threshold_ms=50, path=path)
+    try:
+        with mock.patch("app.main.slow_query_log", log), \
+                mock.patch("app.scryfall.requests.get", side_effect=slow(search_page())):
+            client = TestClient(app)
+            response = client.get("/search", params={"prompt": "blue counterspell contact me@example.com",
+                                                     "page": 9, "commander_colors": "WU"})
+        assert response.status_code == 200
+        log.close()
+        with open(path) as f:
+            (entry,) = [json.loads(line) for line in f]
+    finally:
+        os.remove(path)
+
+    assert entry == log.slowest()[0]
+    assert entry["status"] == 200 and entry["ms"] >= 100
+    assert entry["prompt"] == "blue counterspell contact <email>"
+    assert entry["page"] == 9 and entry["per_page"] == 20 and entry["commander_colors"] == "WU"
+    assert entry["filters"]["coloridentity"] == "WU"
+    assert entry["scryfall_query"] == response.json()["scryfall_query"]
+    assert entry["upstream_pages"] == 2
+    stages = [stage["name"] for stage in entry["stages"]]
+    assert stages.count("scryfall") == 2 and stages[0] == "parse" and stages[-1] == "serialize"
+    assert {"name": "scryfall", "ms": mock.ANY, "desc": "page 2"} in entry["stages"]
+    print("✅ PASS: slow /search entry")
+
+
+def test_admin_endpoint():
+    """/admin/slow-queries lists the top N and needs the admin token"""
+    log = SlowQueryLog(threshold_ms=100)
+    for ms in (200, 700, 400):
+        log.record(f"took {ms}", None, 1, 20, 200, timing_of(ms))
+    client = TestClient(app)
+    with mock.patch("app.main.slow_query_log", log), mock.patch.object(config, "ADMIN_TOKEN", TOKEN):
+        listing = client.get("/admin/slow-queries", params={"limit": 2}, headers=ADMIN).json()
+        assert listing["threshold_ms"] == 100 and listing["recorded"] == 3
+        assert [entry["prompt"] for entry in listing["queries"]] == ["took 700", "took 400"]
+        assert client.get("/admin/slow-queries").status_code == 403
+    with mock.patch.object(config, "ADMIN_TOKEN", ""):
+        assert client.get("/admin/slow-queries", headers=ADMIN).status_code == 404
+    print("✅ PASS: /admin/slow-queries")
+
+
+if __name__ == "__main__":
+    test_threshold_and_ranking()
+    test_slow_search_entry()
+    test_admin_endpoint()
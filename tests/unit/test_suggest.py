@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the unified /suggest typeahead index
+"""
+
+import sys
+import os
+import threading
+import time
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from app.card_names import CardNamesCache, card_names_cache
+from app.commander_records import CommanderRecord
+from app.commanders import CommanderTable, commander_db
+from app.suggest import SuggestIndex, SuggestIndexHolder, KINDS
+
+CARD_NAMES = ["Boros Charm", "Boros Signet", "Bounce", "Counterspell", "Dual Nature", "Sol Ring"]
+COMMANDERS = {"boros reckoner": "R", "chulane, teller of tales": "GWU"}
+COMMANDER_CARDS = {"chulane, teller of tales": CommanderRecord({"name": "Chulane, Teller of Tales"})}
+
+
+def make_index():
+    return SuggestIndex(CARD_NAMES, COMMANDERS, COMMANDER_CARDS)
+
+
+def test_results_grouped_by_kind():
+    """One lookup returns vocabulary, commanders and cards grouped by kind"""
+    results = make_index().suggest("bo", limit=5)
+
+    assert set(results) == set(KINDS)
+    assert [s["text"] for s in results["color"]] == ["Boros"]
+    assert results["color"][0]["colors"] == "RW"
+    assert [s["text"] for s in results["land"]] == ["bounceland"]
+    assert [s["text"] for s in results["commander"]] == ["Boros Reckoner"]
+    assert [s["text"] for s in results["card"]] == ["Bounce", "Boros Charm", "Boros Signet"]
+    print("✅ PASS: suggestions grouped by kind")
+
+
+def test_vocabulary_sources():
+    """Guilds, shards, wedges, land cycles and effect triggers are all indexed"""
+    index = make_index()
+
+    assert index.suggest("esper")["color"][0]["group"] == "shard"
+    assert index.suggest("temur")["color"][0]["group"] == "wedge"
+    assert [s["text"] for s in index.suggest("fetch")["land"]] == ["fetchland"]
+    assert [s["text"] for s in index.suggest("dual")["land"]] == ["dual land"]
+    assert index.suggest("counters")["effect"][0]["effect"] == "counterspell"
+    assert index.suggest("graveyard h")["effect"][0]["effect"] == "graveyard_hate"
+    print("✅ PASS: parser vocabulary is suggested")
+
+
+def test_ranking_and_limits():
+    """Exact matches rank first, then shorter names; limit applies per kind"""
+    index = make_index()
+
+    cards = index.suggest("boros charm", limit=5)["card"]
+    assert cards[0]["text"] == "Boros Charm"
+
+    assert len(index.suggest("bo", limit=1)["card"]) == 1
+    assert index.suggest("   ") == {kind: [] for kind in KINDS}
+    print("✅ PASS: shared ranking and per-kind limits")
+
+
+def test_commander_display_name():
+    """Commanders use the card's printed name when we have it"""
+    results = make_index().suggest("chul")
+    assert results["commander"][0]["text"] == "Chulane, Teller of Tales"
+    assert results["commander"][0]["colors"] == "GWU"
+    print("✅ PASS: commander display names")
+
+
+def test_holder_rebuilds_off_the_request_path():
+    """After the first build, get() serves the last index while a new version is built in the background"""
+    cache = CardNamesCache()
+    cache._set_card_names(list(CARD_NAMES))
+    holder = SuggestIndexHolder()
+    builds = []
+
+    def slow_build(*args):
+        builds.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return SuggestIndex(*args)
+
+    with mock.patch.object(card_names_cache, "catalog", cache.catalog), \
+            mock.patch.object(commander_db, "table", CommanderTable(1, COMMANDERS, COMMANDER_CARDS)):
+        first = holder.get()  # nothing built yet: the first build happens here
+        assert holder.get() is first and holder.current() is first
+
+        with mock.patch.object(commander_db, "table", CommanderTable(2, {**COMMANDERS, "bruse tarl": "RW"}, COMMANDER_CARDS)), \
+                mock.patch("app.suggest.SuggestIndex", side_effect=slow_build):
+            start = time.perf_counter()
+            assert [holder.get() for _ in range(5)] == [first] * 5
+            assert time.perf_counter() - start < 0.1
+            holder.wait(timeout=5)
+            assert builds == ["suggest-rebuild"]
+            rebuilt = holder.get()
+            assert rebuilt is not first
+            assert [s["text"] for s in rebuilt.suggest("bru")["commander"]] == ["Bruse Tarl"]
+    print("✅ PASS: the suggest index is rebuilt off the request path")
+
+
+if __name__ == "__main__":
+    test_results_grouped_by_kind()
+    test_vocabulary_sources()
+    test_ranking_and_limits()
+    test_commander_display_name()
+    test_holder_rebuilds_off_the_request_path()
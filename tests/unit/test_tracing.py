@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Unit tests for in-process tracing, its exporters and the collector stand-in
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import threading
+from unittest import mock
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../load'))
+
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.tracing import exporter, in_context, root_span, span, traced
+from fakes import search_page
+from otlp_collector import create_app as create_collector, format_trace, group_traces, read_spans
+
+
+def traced_requests(path, sample_rate=1.0, **kwargs):
+    """Spans exported while making GET requests to `path`, grouped by trace"""
+    fd, trace_file = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        with mock.patch.object(exporter, "target", trace_file), \
+                mock.patch.object(config, "TRACE_SAMPLE_RATE", sample_rate), \
+                mock.patch("app.scryfall.requests.get", return_value=search_page()):
+            client = TestClient(app)
+            responses = [client.get(path, **kwargs) for _ in range(3)]
+            exporter.flush()
+        return responses, group_traces(read_spans(trace_file))
+    finally:
+        os.remove(trace_file)
+
+
+def by_name(spans):
+    return {span["name"]: span for span in spans}
+
+
+def test_search_trace_nesting():
+    """A /search trace nests parsing, the limiter and the HTTP call under the request"""
+    responses, traces = traced_requests("/search", params={"prompt": "blue counterspell"})
+    assert len(traces) == 3
+    trace_id = responses[0].headers["x-trace-id"]
+    spans = by_name(traces[trace_id])
+
+    request = spans["GET /search"]
+    assert "parentSpanId" not in request
+    assert spans["extract_filters"]["parentSpanId"] == request["spanId"]
+    assert spans["extract_color_identity"]["parentSpanId"] == spans["extract_filters"]["spanId"]
+    assert spans["search_scryfall"]["parentSpanId"] == request["spanId"]
+    assert spans["rate_limit"]["parentSpanId"] == spans["search_scryfall"]["spanId"]
+    assert spans["scryfall.http"]["parentSpanId"] == spans["search_scryfall"]["spanId"]
+
+    attributes = {a["key"]: a["value"] for a in request["attributes"]}
+    assert attributes["http.route"] == {"stringValue": "/search"}
+    assert attributes["http.status_code"] == {"intValue": "200"}
+    assert {"key": "caller", "value": {"stringValue": "search"}} in spans["scryfall.http"]["attributes"]
+    assert "GET /search" in format_trace(traces[trace_id]).splitlines()[0]
+    print("✅ PASS: /search trace nesting")
+
+
+def test_commander_lookup_span():
+    """The NLP parser traces its commander lookups under extract_color_identity"""
+    _, traces = traced_requests("/debug-nlp", params={"prompt": "removal for my atraxa deck"})
+    spans = by_name(next(iter(traces.values())))
+    assert spans["extract_filters"]["parentSpanId"] == spans["GET /debug-nlp"]["spanId"]
+    assert spans["commander_lookup"]["parentSpanId"] == spans["extract_color_identity"]["spanId"]
+    print("✅ PASS: commander lookup span")
+
+
+def test_unsampled_requests_export_nothing():
+    """Head sampling drops whole traces, and nothing is traced without TRACE_EXPORT"""
+    responses, traces = traced_requests("/search", sample_rate=0.0, params={"prompt": "blue counterspell"})
+    assert traces == {} and "x-trace-id" not in responses[0].headers
+
+    with mock.patch.object(exporter, "target", ""):
+        with root_span("job", sampled=True) as job:
+            with span("child") as child:
+                pass
+    assert "x-trace-id" not in TestClient(app).get("/").headers
+    assert not hasattr(job, "span_id") and not hasattr(child, "span_id")
+    print("✅ PASS: unsampled traces export nothing")
+
+
+def test_context_propagation():
+    """in_context() carries the current span through executor and thread hops"""
+    seen = {}
+
+    @traced("work")
+    def work(label):
+        with span("inner"):
+            seen[label] = threading.current_thread().name
+
+    async def startup_load():
+        loop = asyncio.get_event_loop()
+        with root_span("startup.load", sampled=True):
+            await loop.run_in_executor(None, in_context(work, "executor"))
+            await loop.run_in_executor(None, work, "no context")
+
+    fd, trace_file = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        with mock.patch.object(exporter, "target", trace_file):
+            asyncio.run(startup_load())
+            exporter.flush()
+        spans = read_spans(trace_file)
+    finally:
+        os.remove(trace_file)
+
+    assert set(seen) == {"executor", "no context"}
+    names = [s["name"] for s in spans]
+    assert sorted(names) == ["inner", "startup.load", "work"]
+    spans = by_name(spans)
+    assert spans["work"]["parentSpanId"] == spans["startup.load"]["spanId"]
+    assert spans["inner"]["parentSpanId"] == spans["work"]["spanId"]
+    assert len({s["traceId"] for s in spans.values()}) == 1
+    print("✅ PASS: context propagation")
+
+
+def test_error_status():
+    """A span that raises is exported with an error status"""
+    fd, trace_file = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        with mock.patch.object(exporter, "target", trace_file):
+            try:
+                with root_span("refresh", sampled=True):
+                    raise RuntimeError("boom")
+            except RuntimeError:
+                pass
+            exporter.flush()
+        (exported,) = read_spans(trace_file)
+    finally:
+        os.remove(trace_file)
+    assert exported["status"] == {"code": 2, "message": "RuntimeError: boom"}
+    print("✅ PASS: error status")
+
+
+def test_otlp_export_to_collector():
+    """With a URL target, spans are POSTed as OTLP JSON and the collector writes them out"""
+    fd, collected = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    collector = TestClient(create_collector(collected))
+    posted = []
+
+    def post(url, json=None, timeout=None):
+        posted.append(url)
+        return collector.post("/v1/traces", json=json)
+
+    try:
+        with mock.patch.object(exporter, "target", "http://127.0.0.1:4318"), \
+                mock.patch("app.tracing.requests.post", side_effect=post):
+            with root_span("startup.load_card_names", sampled=True, cards=3):
+                with span("scryfall.http"):
+                    pass
+            exporter.flush()
+        spans = read_spans(collected)
+    finally:
+        os.remove(collected)
+
+    assert posted == ["http://127.0.0.1:4318/v1/traces"]
+    assert collector.get("/_collector/stats").json() == {"requests": 1, "spans": 2}
+    spans = by_name(spans)
+    assert spans["scryfall.http"]["parentSpanId"] == spans["startup.load_card_names"]["spanId"]
+    assert json.dumps({"key": "cards", "value": {"intValue": "3"}}) in json.dumps(spans["startup.load_card_names"])
+    print("✅ PASS: OTLP export to the collector stand-in")
+
+
+if __name__ == "__main__":
+    test_search_trace_nesting()
+    test_commander_lookup_span()
+    test_unsampled_requests_export_nothing()
+    test_context_propagation()
+    test_error_status()
+    test_otlp_export_to_collector()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for typeahead sessions on /card-names and /commanders/search
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../mtg-nlp-search'))
+
+from app.typeahead import TypeaheadSessions, typeahead_sessions
+from app.card_names import CardNamesCache
+from app.commanders import CommanderDatabase
+
+CARD_NAMES = [
+    "Atraxa, Grand Unifier",
+    "Atraxa, Praetors' Voice",
+    "Atrocious Experiment",
+    "Lightning Bolt",
+    "Lightning Greaves",
+    "atrium test card",
+]
+
+
+def make_card_cache():
+    cache = CardNamesCache()
+    cache._set_card_names(list(CARD_NAMES))
+    return cache
+
+
+def naive_search(names, query, limit):
+    return [n for n in names if n.lower().startswith(query.lower())][:limit]
+
+
+def test_card_name_search_matches_linear_scan():
+    """Indexed prefix search returns the same names, in catalog order, as a full scan"""
+    cache = make_card_cache()
+    for query in ["a", "at", "atr", "ATRAXA", "light", "lightning g", "zzz", "atrium"]:
+        for limit in [1, 2, 10]:
+            assert cache.search_card_names(query, limit) == naive_search(CARD_NAMES, query, limit), query
+    print("✅ PASS: indexed prefix search matches linear scan")
+
+
+def test_card_name_session_refines_previous_range():
+    """Each keystroke in a session narrows the stored candidate range"""
+    cache = make_card_cache()
+    session = "test-card-session"
+
+    for query in ["a", "at", "atr", "atra", "atrax"]:
+        assert cache.search_card_names(query, 10, session=session) == naive_search(CARD_NAMES, query, 10)
+
+    previous_query, (lo, hi) = typeahead_sessions.get(("card-names", session), cache.card_names)
+    assert previous_query == "atrax"
+    assert hi - lo == 2
+
+    # Backspacing to a shorter query must not be limited to the narrowed range
+    assert cache.search_card_names("l", 10, session=session) == naive_search(CARD_NAMES, "l", 10)
+    print("✅ PASS: card name sessions refine and reset correctly")
+
+
+def test_commander_session_refines_previous_matches():
+    """Commander substring search reuses the previous matches when the query grows"""
+    db = CommanderDatabase()
+    db._install({"atraxa, praetors' voice": "WUBG", "chulane, teller of tales": "GWU", "tatyova, benthic druid": "GU"}, {})
+    session = "test-commander-session"
+
+    first = db.search_commanders("a", session=session)
+    assert [m["color_identity"] for m in first] == ["WUBG", "GWU", "GU"]
+
+    second = db.search_commanders("ta", session=session)
+    assert [m["color_identity"] for m in second] == ["GWU", "GU"]
+
+    third = db.search_commanders("tat", session=session)
+    assert [m["color_identity"] for m in third] == ["GU"]
+
+    previous_query, candidates = typeahead_sessions.get(("commanders", session), db.commanders)
+    assert previous_query == "tat"
+    assert candidates == ["tatyova, benthic druid"]
+    print("✅ PASS: commander sessions refine previous matches")
+
+
+def test_session_expiry_and_eviction():
+    """Sessions expire after the TTL, and the oldest sessions are evicted first"""
+    source = object()
+    sessions = TypeaheadSessions(ttl=0.05, max_sessions=2, max_candidates=10)
+
+    sessions.put("a", source, "x", [1])
+    sessions.put("b", source, "x", [2])
+    sessions.put("c", source, "x", [3])
+    assert sessions.get("a", source) is None
+    assert sessions.evictions == 1
+    assert sessions.get("c", source) == ("x", [3])
+
+    # Data reload invalidates the session
+    assert sessions.get("c", object()) is None
+
+    sessions.put("d", source, "x", [4])
+    time.sleep(0.06)
+    assert sessions.get("d", source) is None
+
+    # Oversized candidate sets are not retained
+    sessions.put("e", source, "x", list(range(50)), size=50)
+    assert sessions.get("e", source) is None
+    print("✅ PASS: session TTL, eviction and size bounds")
+
+
+if __name__ == "__main__":
+    test_card_name_search_matches_linear_scan()
+    test_card_name_session_refines_previous_range()
+    test_commander_session_refines_previous_matches()
+    test_session_expiry_and_eviction()